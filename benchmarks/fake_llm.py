@@ -0,0 +1,140 @@
+"""Fake OpenAI-compatible chat completions server for benchmarks
+
+Streams a fixed number of tokens after a configurable time to first token, so LLM time is
+known exactly and everything else measured is host overhead.
+
+Run standalone:
+    python -m benchmarks.fake_llm --port 18080 --ttft-ms 200 --tokens 100
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class FakeLLMServer:
+    """Threaded HTTP server answering /v1/chat/completions with a streamed reply"""
+
+    def __init__(
+        self,
+        port: int = 0,
+        ttft_ms: float = 0,
+        tokens: int = 20,
+        token_interval_ms: float = 0,
+        token_text: str = "word",
+    ):
+        """Initialize fake LLM server
+
+        Args:
+            port: Port to bind, 0 picks a free one
+            ttft_ms: Delay before the first token
+            tokens: Tokens per reply
+            token_interval_ms: Delay between tokens
+            token_text: Text of each token
+        """
+        self.ttft_ms = ttft_ms
+        self.tokens = tokens
+        self.token_interval_ms = token_interval_ms
+        self.token_text = token_text
+        self.requests = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def llm_config(self, model: str = "bench-chat") -> dict:
+        """think-llm-client configuration pointing at this server"""
+        return {
+            "llm": {
+                "providers": {
+                    "bench": {
+                        "api_key": "bench",
+                        "api_url": self.url,
+                        "model": {model: {"max_completion_tokens": 4096}},
+                    }
+                }
+            }
+        }
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                server.requests += 1
+                time.sleep(server.ttft_ms / 1000)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i in range(server.tokens):
+                    if i and server.token_interval_ms:
+                        time.sleep(server.token_interval_ms / 1000)
+                    self._send(
+                        json.dumps(
+                            {
+                                "id": "bench",
+                                "object": "chat.completion.chunk",
+                                "created": 0,
+                                "model": body.get("model"),
+                                "choices": [
+                                    {
+                                        "index": 0,
+                                        "delta": {"content": f"{server.token_text} "},
+                                        "finish_reason": None,
+                                    }
+                                ],
+                            }
+                        )
+                    )
+                self._send("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+            def _send(self, data: str) -> None:
+                payload = f"data: {data}\n\n".encode()
+                self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible streaming server")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--ttft-ms", type=float, default=0)
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--token-interval-ms", type=float, default=0)
+    args = parser.parse_args()
+    server = FakeLLMServer(args.port, args.ttft_ms, args.tokens, args.token_interval_ms)
+    print(f"Fake LLM listening on {server.url}")
+    server._server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
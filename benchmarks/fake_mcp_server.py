@@ -0,0 +1,52 @@
+"""Scripted stdio MCP server for benchmarks
+
+Every request waits --latency-ms and returns --payload-bytes of text, so MCP time is known
+exactly. Exposes the tool "payload", the resource "bench://payload" and the prompt "bench".
+
+    python benchmarks/fake_mcp_server.py --latency-ms 20 --payload-bytes 4096
+"""
+
+import argparse
+import asyncio
+
+from mcp.server.fastmcp import FastMCP
+
+
+def build_server(latency_ms: float, payload_bytes: int) -> FastMCP:
+    server = FastMCP("bench")
+    payload = ("x" * 63 + "\n") * (payload_bytes // 64) + "x" * (payload_bytes % 64)
+
+    @server.tool(name="payload")
+    async def payload_tool(key: str = "") -> str:
+        """Return the configured payload"""
+        await asyncio.sleep(latency_ms / 1000)
+        return payload
+
+    @server.resource("bench://payload")
+    async def payload_resource() -> str:
+        await asyncio.sleep(latency_ms / 1000)
+        return payload
+
+    @server.resource("bench://item/{key}")
+    async def item_resource(key: str) -> str:
+        await asyncio.sleep(latency_ms / 1000)
+        return f"{key}:{payload}"
+
+    @server.prompt()
+    async def bench(topic: str = "") -> str:
+        await asyncio.sleep(latency_ms / 1000)
+        return f"{topic} {payload}"
+
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scripted MCP server for benchmarks")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--payload-bytes", type=int, default=1024)
+    args = parser.parse_args()
+    build_server(args.latency_ms, args.payload_bytes).run()
+
+
+if __name__ == "__main__":
+    main()
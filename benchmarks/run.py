@@ -0,0 +1,510 @@
+"""Offline benchmarks of the host's own overhead
+
+Everything runs against local fakes (benchmarks/fake_llm.py and fake_mcp_server.py) inside
+a temporary HOME, so results don't depend on the network and don't touch ~/.think-mcp-host.
+
+    python -m benchmarks.run                       # all suites, JSON to benchmarks/results/
+    python -m benchmarks.run --quick --only expand,turn
+    python -m benchmarks.run --compare benchmarks/results/old.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / "results"
+
+SUITES = ("startup", "init", "expand", "turn", "history")
+
+# Relative change beyond which --compare reports a regression
+REGRESSION_THRESHOLD = 0.10
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """Summary statistics of timings in milliseconds"""
+    ordered = sorted(samples_ms)
+    return {
+        "n": len(ordered),
+        "mean_ms": statistics.fmean(ordered),
+        "median_ms": statistics.median(ordered),
+        "p95_ms": ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)],
+        "min_ms": ordered[0],
+        "max_ms": ordered[-1],
+    }
+
+
+async def timed(repeat: int, run: Callable, setup: Optional[Callable] = None) -> Dict[str, float]:
+    """Time an async callable repeat times, setup runs untimed before each call"""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            await setup()
+        start = time.perf_counter()
+        await run()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+class BenchEnv:
+    """Temporary HOME with the configuration files of the fakes"""
+
+    def __init__(self, root: Path, llm_server):
+        self.root = root
+        self.llm_server = llm_server
+        self.llm_config = root / "llm_config.json"
+        self.llm_config.write_text(json.dumps(llm_server.llm_config()), encoding="utf-8")
+        self.host_config = root / "host_config.json"
+        # Measure the uncached paths unless a benchmark enables caching explicitly
+        self.write_host_config({"result_cache": {"enabled": False}})
+
+    def write_host_config(self, settings: Dict[str, Any]) -> Path:
+        self.host_config.write_text(json.dumps(settings), encoding="utf-8")
+        return self.host_config
+
+    def mcp_config(
+        self,
+        servers: int,
+        latency_ms: float = 0,
+        payload_bytes: int = 1024,
+        cache: bool = False,
+    ) -> Path:
+        """MCP configuration with servers fake MCP servers named s0, s1, ..."""
+        config = {"mcpServers": {}}
+        for i in range(servers):
+            server = {
+                "command": sys.executable,
+                "args": [
+                    str(BENCH_DIR / "fake_mcp_server.py"),
+                    "--latency-ms",
+                    str(latency_ms),
+                    "--payload-bytes",
+                    str(payload_bytes),
+                ],
+            }
+            if cache:
+                server["cache"] = {"resources": True, "tools": ["payload"], "ttl": 3600}
+            config["mcpServers"][f"s{i}"] = server
+        path = self.root / f"mcp_{servers}_{latency_ms:g}_{payload_bytes}_{int(cache)}.json"
+        path.write_text(json.dumps(config), encoding="utf-8")
+        return path
+
+    def host(self, mcp_config: Path, warmup: bool = True):
+        from think_mcp_host.destiny_host import DestinyHost
+
+        return DestinyHost(
+            llm_config_path=str(self.llm_config),
+            mcp_config_path=str(mcp_config),
+            host_config_path=str(self.host_config),
+            warmup=warmup,
+            # Servers start one after another on small machines, don't time them out
+            warmup_timeout=120,
+        )
+
+
+# Suites
+
+
+def bench_startup(env: BenchEnv, repeat: int) -> Dict[str, Any]:
+    """Wall time of fresh processes: --version, and main's startup up to init_clients
+
+    Cold runs compile every module (empty bytecode cache), warm runs reuse the cache.
+    """
+    commands = {
+        "version": [sys.executable, "-c", _STARTUP_VERSION],
+        "init": [sys.executable, "-m", "benchmarks.run", "--child", "startup"],
+    }
+    results = {}
+    warm_cache = tempfile.mkdtemp(prefix="pycache-", dir=env.root)
+    for name, command in commands.items():
+        for mode in ("cold", "warm"):
+            samples = []
+            for i in range(repeat + (mode == "warm")):
+                cache_dir = tempfile.mkdtemp(prefix="pycache-", dir=env.root)
+                environment = dict(os.environ, PYTHONPYCACHEPREFIX=cache_dir)
+                # Warm runs need the bytecode written by the previous ones
+                environment.pop("PYTHONDONTWRITEBYTECODE", None)
+                if mode == "warm":
+                    environment["PYTHONPYCACHEPREFIX"] = warm_cache
+                start = time.perf_counter()
+                subprocess.run(
+                    command,
+                    cwd=REPO_DIR,
+                    env=environment,
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    check=True,
+                )
+                elapsed = (time.perf_counter() - start) * 1000
+                # The first warm run fills the bytecode cache
+                if mode == "cold" or i > 0:
+                    samples.append(elapsed)
+            results[f"{name}_{mode}"] = summarize(samples)
+    return results
+
+
+_STARTUP_VERSION = (
+    "import sys; sys.argv = ['think-mcp-host', '--version']\n"
+    "from think_mcp_host import main\n"
+    "try:\n    main()\nexcept SystemExit:\n    pass\n"
+)
+
+
+async def _child_startup() -> None:
+    """Startup path of main without the interactive prompts"""
+    from think_mcp_host.startup import StartupProfiler, build_parser, preload_modules
+
+    args = build_parser().parse_args([])
+    preload_modules(StartupProfiler())
+    from think_mcp_host.destiny_host import DestinyHost
+
+    host = DestinyHost(
+        llm_config_path=os.environ["BENCH_LLM_CONFIG"],
+        mcp_config_path=os.environ["BENCH_MCP_CONFIG"],
+        host_config_path=os.environ["BENCH_HOST_CONFIG"],
+        warmup=args.warmup,
+    )
+    await host.init_clients()
+    await host.cleanup_resources()
+
+
+async def bench_init(env: BenchEnv, repeat: int) -> Dict[str, Any]:
+    """init_clients time and time until every server is ready, versus server count"""
+    results = {}
+    for servers in (1, 2, 4, 8):
+        mcp_config = env.mcp_config(servers)
+        init_ms, ready_ms = [], []
+        for _ in range(repeat):
+            host = env.host(mcp_config)
+            start = time.perf_counter()
+            await host.init_clients()
+            init_ms.append((time.perf_counter() - start) * 1000)
+            await host.mcp_warmup.wait()
+            ready_ms.append((time.perf_counter() - start) * 1000)
+            not_ready = [s.name for s in host.mcp_warmup.servers.values() if s.status != "ready"]
+            await host.cleanup_resources()
+            if not_ready:
+                raise RuntimeError(f"MCP servers not ready: {not_ready}")
+        results[f"servers_{servers}"] = {
+            "init_clients": summarize(init_ms),
+            "all_ready": summarize(ready_ms),
+        }
+    return results
+
+
+async def bench_expand(env: BenchEnv, repeat: int) -> Dict[str, Any]:
+    """Placeholder expansion throughput over 2 servers with 5 ms latency and 4 KB payloads"""
+    results = {}
+    for cache in (False, True):
+        env.write_host_config({"result_cache": {"enabled": cache}})
+        host = env.host(env.mcp_config(2, latency_ms=5, payload_bytes=4096, cache=cache))
+        await host.init_clients()
+        host.placeholder_expander.require_connected = True
+        await host.mcp_warmup.wait()
+        try:
+            for count in (1, 8, 32):
+                message = " ".join(
+                    f"->mcp_resources[s{i % 2}]:bench://item/{i}" for i in range(count)
+                )
+                expanded = await host.placeholder_expander.expand(message, preview=False)
+                if "->mcp_resources" in expanded:
+                    raise RuntimeError("Placeholders were not expanded")
+                stats = await timed(
+                    repeat, lambda: host.placeholder_expander.expand(message, preview=False)
+                )
+                stats["placeholders_per_s"] = count / (stats["mean_ms"] / 1000)
+                results[f"{'cached' if cache else 'uncached'}_{count}"] = stats
+        finally:
+            await host.cleanup_resources()
+            if host.result_cache:
+                host.result_cache.close()
+    env.write_host_config({"result_cache": {"enabled": False}})
+    return results
+
+
+def _synthetic_history(messages: int) -> List[Dict[str, str]]:
+    return [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"Message {i}: " + "lorem ipsum dolor sit amet " * 8,
+        }
+        for i in range(messages)
+    ]
+
+
+async def bench_turn(env: BenchEnv, repeat: int) -> Dict[str, Any]:
+    """Turn latency against an instant fake LLM, with and without the context window"""
+    from think_llm_client import LLMClient
+
+    from think_mcp_host.context_manager import ContextManager
+    from think_mcp_host.utils.llm_stream import stream_chat
+
+    llm_client = LLMClient(config_path=str(env.llm_config))
+    model_type, provider, model = llm_client.get_available_models()[0]
+    llm_client.set_model(model_type, provider, model)
+
+    async def turn():
+        async for _ in stream_chat(llm_client, "benchmark message"):
+            pass
+
+    results = {}
+    for length in (0, 20, 200, 1000):
+        history = _synthetic_history(length)
+
+        async def reset():
+            llm_client.messages = list(history)
+
+        raw = await timed(repeat, turn, setup=reset)
+
+        context_manager = ContextManager(default_budget=8000, summarize=False)
+
+        async def windowed_turn():
+            async with context_manager.window(llm_client, "benchmark message"):
+                await turn()
+
+        windowed = await timed(repeat, windowed_turn, setup=reset)
+        results[f"history_{length}"] = {"raw": raw, "context_window": windowed}
+    return results
+
+
+async def bench_history(env: BenchEnv, repeat: int) -> Dict[str, Any]:
+    """Save/load of history files, journal appends and replay, history index sync/search"""
+    from think_llm_client import LLMClient
+
+    from think_mcp_host.history_index import HistoryIndex
+    from think_mcp_host.history_journal import HistoryJournal, replay_journal
+
+    llm_client = LLMClient(config_path=str(env.llm_config))
+    model_type, provider, model = llm_client.get_available_models()[0]
+    llm_client.set_model(model_type, provider, model)
+    results = {}
+
+    for length in (20, 200, 2000):
+        history = _synthetic_history(length)
+        llm_client.messages = list(history)
+        saved = {}
+
+        async def save():
+            saved["path"] = llm_client.save_chat_history()[1]
+
+        async def load():
+            llm_client.load_chat_history_from_file(saved["path"])
+
+        save_stats = await timed(repeat, save)
+        load_stats = await timed(repeat, load)
+
+        journal_dir = env.root / f"journal_{length}"
+
+        async def journal_session():
+            journal = HistoryJournal(llm_client, journal_dir=journal_dir, compact_every=0)
+            llm_client.messages = []
+            journal.start(journal_dir / f"chat_{length}.json")
+            for i in range(0, length, 2):
+                llm_client.messages.extend(history[i : i + 2])
+                journal.append_turn(history[i : i + 2])
+            await journal.close()
+
+        async def cleanup_journal():
+            for path in journal_dir.glob("*"):
+                path.unlink()
+
+        journal_stats = await timed(repeat, journal_session, setup=cleanup_journal)
+        journal_path = journal_dir / f"chat_{length}.jsonl"
+
+        async def replay():
+            replay_journal(journal_path)
+
+        replay_stats = await timed(repeat, replay)
+        results[f"messages_{length}"] = {
+            "save": save_stats,
+            "load": load_stats,
+            "journal_all_turns": journal_stats,
+            "journal_replay": replay_stats,
+        }
+
+    # Index of many saved conversations
+    index_dir = env.root / "index_histories"
+    index_dir.mkdir(exist_ok=True)
+    llm_client.history_dir = index_dir
+    for i in range(500):
+        llm_client.messages = _synthetic_history(10)
+        llm_client.messages[0]["content"] += f" topic{i}"
+        llm_client.save_chat_history(index_dir / f"chat_20250101_{i:06d}.json")
+    db_path = env.root / "history_index.sqlite3"
+    index = HistoryIndex(db_path)
+    start = time.perf_counter()
+    index.sync(index_dir)
+    first_sync_ms = (time.perf_counter() - start) * 1000
+
+    async def resync():
+        index.sync(index_dir)
+
+    async def search():
+        index.search("topic42 lorem")
+
+    async def page():
+        index.page(100, 10)
+
+    results["index_500_files"] = {
+        "first_sync_ms": first_sync_ms,
+        "resync": await timed(repeat, resync),
+        "page": await timed(repeat, page),
+        "search": await timed(repeat, search),
+    }
+    index.close()
+    return results
+
+
+# Runner
+
+
+def _version() -> Dict[str, Optional[str]]:
+    from think_mcp_host.startup import get_version
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        commit = None
+    return {"version": get_version(), "commit": commit}
+
+
+async def run_suites(env: BenchEnv, suites: List[str], repeat: int) -> Dict[str, Any]:
+    results = {}
+    for suite in suites:
+        print(f"Running {suite}...", file=sys.stderr)
+        start = time.perf_counter()
+        if suite == "startup":
+            mcp_config = env.mcp_config(1)
+            os.environ.update(
+                BENCH_LLM_CONFIG=str(env.llm_config),
+                BENCH_MCP_CONFIG=str(mcp_config),
+                BENCH_HOST_CONFIG=str(env.host_config),
+            )
+            results[suite] = await asyncio.to_thread(bench_startup, env, max(repeat // 4, 2))
+        elif suite == "init":
+            results[suite] = await bench_init(env, max(repeat // 4, 2))
+        else:
+            results[suite] = await globals()[f"bench_{suite}"](env, repeat)
+        print(f"  {suite} done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return results
+
+
+def _flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Comparable metrics: every *_ms and *_per_s leaf"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif key in ("median_ms", "first_sync_ms", "placeholders_per_s"):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """Print current results against a baseline
+
+    Returns:
+        List[str]: Metrics that regressed beyond REGRESSION_THRESHOLD
+    """
+    old, new = _flatten(baseline["results"]), _flatten(current["results"])
+    regressions = []
+    print(f"\n{'metric':<60} {'baseline':>11} {'current':>11} {'change':>8}")
+    for name in sorted(old.keys() & new.keys()):
+        if not old[name]:
+            continue
+        change = new[name] / old[name] - 1
+        # Throughputs regress downwards, timings upwards
+        worse = -change if name.endswith("_per_s") else change
+        flag = "  REGRESSION" if worse > REGRESSION_THRESHOLD else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<60} {old[name]:>11.2f} {new[name]:>11.2f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the host's own overhead offline")
+    parser.add_argument("--only", help=f"Comma-separated suites (default: {','.join(SUITES)})")
+    parser.add_argument("--quick", action="store_true", help="Fewer repetitions")
+    parser.add_argument("--repeat", type=int, help="Repetitions per measurement (default: 20)")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<ts>.json)")
+    parser.add_argument("--compare", help="Baseline results file to compare against")
+    parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help=f"Exit with 1 if a metric is more than {REGRESSION_THRESHOLD:.0%} worse",
+    )
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == "startup":
+        asyncio.run(_child_startup())
+        return
+
+    suites = args.only.split(",") if args.only else list(SUITES)
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"Unknown suite(s): {', '.join(sorted(unknown))}")
+    repeat = args.repeat or (5 if args.quick else 20)
+
+    with tempfile.TemporaryDirectory(prefix="think-mcp-host-bench-") as root:
+        # Settings, caches, histories and logs of the host all live under HOME
+        os.environ["HOME"] = root
+        from benchmarks.fake_llm import FakeLLMServer
+
+        llm_server = FakeLLMServer(ttft_ms=0, tokens=20).start()
+        try:
+            env = BenchEnv(Path(root), llm_server)
+            start = time.perf_counter()
+            results = asyncio.run(run_suites(env, suites, repeat))
+        finally:
+            llm_server.stop()
+
+    report = {
+        "meta": {
+            **_version(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "elapsed_s": time.perf_counter() - start,
+        },
+        "results": results,
+    }
+    output = (
+        Path(args.output)
+        if args.output
+        else (RESULTS_DIR / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(baseline, report)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
-from think_llm_client.utils.logger import setup_logger
+def main():
+    """Console entry point, heavy modules are imported only after arguments are parsed"""
+    from .startup import main as startup_main
 
-from .destiny_host import main
+    startup_main()
 
-# Initialize project-specific logging configuration
-setup_logger("think-mcp-host")
 
 __all__ = ["main"]
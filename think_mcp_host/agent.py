@@ -0,0 +1,407 @@
+import asyncio
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from rich.markdown import Markdown
+from think_llm_client.utils.logger import logging
+from think_llm_client.utils.terminal_config import TABLE_STYLE, console
+
+from think_mcp_host.llm_scheduler import llm_scheduler
+from think_mcp_host.tracing import tracer
+from think_mcp_host.utils.tokens import MESSAGE_OVERHEAD_TOKENS, estimate_tokens
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+# Function names of the chat completions API: letters, digits, "_" and "-", up to 64 characters
+_INVALID_FUNCTION_CHARS = re.compile(r"[^a-zA-Z0-9_-]")
+_MAX_FUNCTION_NAME = 64
+
+
+def tool_result_text(result) -> str:
+    """Text of a CallToolResult, non-text parts are replaced by their type"""
+    content = getattr(result, "content", result)
+    if isinstance(content, list):
+        return "\n".join(
+            part.text if hasattr(part, "text") else f"[{getattr(part, 'type', 'content')}]"
+            for part in content
+        )
+    return str(content)
+
+
+class AgentError(Exception):
+    """The agent loop can't run with the current model"""
+
+
+@dataclass
+class ToolCall:
+    """A tool call requested by the model"""
+
+    id: str
+    function: str
+    server: Optional[str]
+    tool: Optional[str]
+    arguments: Dict[str, Any]
+    result: str = ""
+    error: Optional[str] = None
+    elapsed_ms: float = 0
+
+
+@dataclass
+class AgentStep:
+    """One model step: an LLM call and the tool calls it requested"""
+
+    number: int
+    llm_ms: float = 0
+    tools_ms: float = 0
+    tool_calls: List[ToolCall] = field(default_factory=list)
+
+
+class AgentLoop:
+    """Let the model call MCP tools itself
+
+    The tools of all MCP servers are advertised to the model as functions. All tool calls of
+    one model step run concurrently (with a per-server limit), their results are sent back,
+    and the loop repeats until the model answers without calling tools. Bounded by a maximum
+    number of steps, a timeout per tool call and a deadline for the whole turn.
+
+    Uses the function calling of OpenAI-compatible chat completions APIs.
+    """
+
+    def __init__(
+        self,
+        llm_client,
+        mcp_manager,
+        supervisor=None,
+        max_steps: int = 8,
+        tool_timeout: float = 30,
+        deadline: float = 300,
+        max_result_chars: int = 20000,
+        max_concurrency_per_server: int = 4,
+        payload_store=None,
+        expander=None,
+    ):
+        """Initialize agent loop
+
+        Args:
+            llm_client: LLM client with the model set, its history is updated with the turn
+            mcp_manager: MCP client manager whose servers' tools are offered to the model
+            supervisor: Optional MCPSupervisor, calls to supervised servers wait out reconnects
+            max_steps: Maximum model steps per turn before an answer is forced
+            tool_timeout: Timeout in seconds of a single tool call
+            deadline: Timeout in seconds of the whole turn
+            max_result_chars: Tool results are truncated to this length before being sent back
+            max_concurrency_per_server: Maximum tool calls in flight per server
+            payload_store: Optional PayloadStore, large results are spilled instead of truncated
+            expander: Optional PlaceholderExpander, connects servers that aren't connected yet
+                in the turn's task, without it only connected servers are offered
+        """
+        self.llm_client = llm_client
+        self.mcp_manager = mcp_manager
+        self.supervisor = supervisor
+        self.max_steps = max_steps
+        self.tool_timeout = tool_timeout
+        self.deadline = deadline
+        self.max_result_chars = max_result_chars
+        self.max_concurrency_per_server = max_concurrency_per_server
+        self.payload_store = payload_store
+        self.expander = expander
+        # Function name -> (server, tool), rebuilt with the schemas on every turn
+        self._functions: Dict[str, Tuple[str, str]] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _semaphore(self, server: str) -> asyncio.Semaphore:
+        if server not in self._semaphores:
+            self._semaphores[server] = asyncio.Semaphore(self.max_concurrency_per_server)
+        return self._semaphores[server]
+
+    @staticmethod
+    def function_name(server: str, tool: str) -> str:
+        """Function name of a server's tool, unique across servers"""
+        name = _INVALID_FUNCTION_CHARS.sub("_", f"{server}__{tool}")
+        return name[:_MAX_FUNCTION_NAME]
+
+    async def tool_schemas(self) -> List[Dict[str, Any]]:
+        """Pool the tools of all MCP servers as function schemas
+
+        Servers are listed concurrently, servers that are down or fail are left out. Servers
+        are connected beforehand in this task, a connection opened by one of the listing
+        tasks couldn't be closed later.
+        """
+        clients = self.mcp_manager.get_all_clients()
+        if self.expander:
+            await self.expander.connect(clients)
+
+        async def list_tools(server: str, client):
+            if self.supervisor and self.supervisor.supervises(server):
+                # Down servers are left out instead of delaying every turn by wait_timeout
+                if not self.supervisor.servers[server].up.is_set():
+                    logger.info(f"Tools of {server} not offered, the server is down")
+                    return server, []
+            elif not client.session:
+                logger.info(f"Tools of {server} not offered, the server is not connected")
+                return server, []
+            try:
+                return server, await asyncio.wait_for(client.list_tools(), self.tool_timeout)
+            except Exception as e:
+                logger.error(f"Failed to list tools of {server}: {e}")
+                return server, []
+
+        self._functions = {}
+        schemas = []
+        for server, tools in await asyncio.gather(*(list_tools(*item) for item in clients.items())):
+            for tool in tools:
+                name = self.function_name(server, tool.name)
+                if name in self._functions:
+                    logger.warning(f"Tool {server}/{tool.name} is shadowed by {name}")
+                    continue
+                self._functions[name] = (server, tool.name)
+                schemas.append(
+                    {
+                        "type": "function",
+                        "function": {
+                            "name": name,
+                            "description": f"[{server}] {tool.description or tool.name}",
+                            "parameters": tool.input_schema or {"type": "object", "properties": {}},
+                        },
+                    }
+                )
+        return schemas
+
+    def _check_model(self):
+        """Model settings of the current model
+
+        Raises:
+            AgentError: No model set, or its provider has no function calling API here
+        """
+        client = self.llm_client
+        if not client.current_model or not client.client:
+            raise AgentError("No model selected")
+        if client.current_provider.lower() == "anthropic":
+            raise AgentError("Agent mode needs an OpenAI-compatible provider")
+        provider = client.model_types[client.current_model_type].providers[client.current_provider]
+        return provider.model[client.current_model]
+
+    async def run(self, message: str) -> Tuple[Optional[str], List[AgentStep]]:
+        """Run a chat turn in which the model may call tools
+
+        Args:
+            message: User message
+
+        Returns:
+            Tuple[Optional[str], List[AgentStep]]: (answer, steps), the user message and the
+            answer are added to the client's history
+
+        Raises:
+            AgentError: The model can't call tools here
+            asyncio.TimeoutError: The turn exceeded its deadline
+        """
+        model_config = self._check_model()
+        start = time.perf_counter()
+        steps: List[AgentStep] = []
+        with tracer.span("agent", category="agent") as span:
+            async with asyncio.timeout(self.deadline):
+                tools = await self.tool_schemas()
+                messages = self._prompt_messages(message)
+                answer = None
+                for number in range(1, self.max_steps + 2):
+                    step = AgentStep(number)
+                    steps.append(step)
+                    # The step after the last allowed one must answer
+                    final = number > self.max_steps
+                    with tracer.span("agent.step", category="agent", step=number):
+                        reply = await self._complete(model_config, messages, tools, final, step)
+                        calls = reply.tool_calls if tools and not final else None
+                        if not calls:
+                            answer = reply.content
+                            self._log_step(step)
+                            break
+                        messages.append(
+                            {
+                                "role": "assistant",
+                                "content": reply.content,
+                                "tool_calls": [
+                                    {
+                                        "id": call.id,
+                                        "type": "function",
+                                        "function": {
+                                            "name": call.function.name,
+                                            "arguments": call.function.arguments,
+                                        },
+                                    }
+                                    for call in calls
+                                ],
+                            }
+                        )
+                        await self._run_tools(calls, step)
+                        for call in step.tool_calls:
+                            messages.append(
+                                {"role": "tool", "tool_call_id": call.id, "content": call.result}
+                            )
+                    self._log_step(step)
+            span.set(steps=len(steps), tool_calls=sum(len(s.tool_calls) for s in steps))
+
+        total_ms = (time.perf_counter() - start) * 1000
+        llm_ms = sum(step.llm_ms for step in steps)
+        tools_ms = sum(step.tools_ms for step in steps)
+        logger.info(
+            f"Agent finished in {len(steps)} step(s), {total_ms:.0f} ms "
+            f"(LLM {llm_ms:.0f} ms, tools {tools_ms:.0f} ms)"
+        )
+        if answer:
+            self.llm_client.messages.append({"role": "user", "content": message})
+            self.llm_client.messages.append({"role": "assistant", "content": answer})
+        return answer, steps
+
+    def _prompt_messages(self, message: str) -> List[Dict[str, Any]]:
+        """System prompt, history and the user message in the chat completions format"""
+        messages = []
+        if self.llm_client.system_prompt:
+            messages.append({"role": "system", "content": self.llm_client.system_prompt})
+        for msg in self.llm_client.messages:
+            messages.append({k: v for k, v in msg.items() if k != "reasoning_content"})
+        messages.append({"role": "user", "content": message})
+        return messages
+
+    async def _complete(self, model_config, messages, tools, final: bool, step: AgentStep):
+        """One non-streaming chat completion, tool calls are only complete at the end"""
+        params = {
+            "model": self.llm_client.current_model,
+            "messages": messages,
+            "max_completion_tokens": model_config.max_completion_tokens,
+        }
+        if model_config.temperature is not None:
+            params["temperature"] = model_config.temperature
+        if tools:
+            params["tools"] = tools
+            if final:
+                params["tool_choice"] = "none"
+
+        start = time.perf_counter()
+        with tracer.span("agent.llm", category="llm", model=self.llm_client.current_model):
+            tokens = sum(
+                estimate_tokens(msg.get("content")) + MESSAGE_OVERHEAD_TOKENS for msg in messages
+            )
+            response = await llm_scheduler.call(
+                self.llm_client,
+                tokens,
+                # Looked up on every attempt, the scheduler wraps the provider client
+                lambda: asyncio.to_thread(self.llm_client.client.chat.completions.create, **params),
+            )
+        step.llm_ms = (time.perf_counter() - start) * 1000
+        return response.choices[0].message
+
+    async def _run_tools(self, calls, step: AgentStep) -> None:
+        """Run all tool calls of a step concurrently"""
+        for call in calls:
+            server, tool = self._functions.get(call.function.name, (None, None))
+            try:
+                arguments = json.loads(call.function.arguments or "{}")
+            except json.JSONDecodeError:
+                arguments = None
+            tool_call = ToolCall(call.id, call.function.name, server, tool, arguments or {})
+            if arguments is None:
+                tool_call.error = "Arguments are not valid JSON"
+            elif server is None:
+                tool_call.error = f"Unknown tool: {call.function.name}"
+            step.tool_calls.append(tool_call)
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(self._run_tool(call) for call in step.tool_calls if call.error is None)
+        )
+        step.tools_ms = (time.perf_counter() - start) * 1000
+        for call in step.tool_calls:
+            if call.error is not None:
+                call.result = f"Error: {call.error}"
+            self._print_call(call)
+
+    async def _run_tool(self, call: ToolCall) -> None:
+        """Run a tool call, errors are recorded on the call and sent back to the model"""
+        start = time.perf_counter()
+        with tracer.span(
+            "agent.tool", category="mcp", server=call.server, target=call.tool
+        ) as span:
+            try:
+                client = self.mcp_manager.get_client(call.server)
+                supervised = self.supervisor and self.supervisor.supervises(call.server)
+                async with self._semaphore(call.server):
+                    if supervised:
+                        request = self.supervisor.call(
+                            call.server,
+                            lambda: client.call_tool(call.tool, call.arguments),
+                            idempotent=self.supervisor.is_idempotent(
+                                call.server, "tool", call.tool
+                            ),
+                        )
+                    elif not client.session:
+                        raise ConnectionError(f"MCP server {call.server} is not connected")
+                    else:
+                        request = client.call_tool(call.tool, call.arguments)
+                    result = await asyncio.wait_for(request, timeout=self.tool_timeout)
+                text = tool_result_text(result)
+                if getattr(result, "isError", False):
+                    text = f"Error: {text}"
+                if self.payload_store:
+                    text = await asyncio.to_thread(
+                        self.payload_store.spill, text, f"tool {call.tool} on {call.server}"
+                    )
+                call.result = self._truncate(text)
+            except asyncio.TimeoutError:
+                call.error = f"Timed out after {self.tool_timeout:g}s"
+            except Exception as e:
+                call.error = str(e) or type(e).__name__
+                logger.error(f"Tool call {call.server}/{call.tool} failed: {e}")
+            if call.error:
+                span.set(error=call.error)
+        call.elapsed_ms = (time.perf_counter() - start) * 1000
+
+    def _truncate(self, text: str) -> str:
+        """Tool result truncated to max_result_chars"""
+        if len(text) > self.max_result_chars:
+            text = text[: self.max_result_chars] + f"\n[truncated, {len(text)} characters]"
+        return text
+
+    def _print_call(self, call: ToolCall) -> None:
+        arguments = json.dumps(call.arguments, ensure_ascii=False)
+        if len(arguments) > 80:
+            arguments = arguments[:77] + "..."
+        target = f"{call.server}/{call.tool}" if call.server else call.function
+        status = f"❌ {call.error}" if call.error else f"{len(call.result)} chars"
+        console.print(
+            f"🔧 {target}({arguments}) · {call.elapsed_ms:.0f} ms · {status}",
+            style=TABLE_STYLE["error"] if call.error else TABLE_STYLE["info"],
+            markup=False,
+        )
+
+    def _log_step(self, step: AgentStep) -> None:
+        if not step.tool_calls:
+            logger.info(f"Agent step {step.number}: LLM {step.llm_ms:.0f} ms, answered")
+            return
+        slowest = max(step.tool_calls, key=lambda call: call.elapsed_ms)
+        logger.info(
+            f"Agent step {step.number}: LLM {step.llm_ms:.0f} ms, "
+            f"{len(step.tool_calls)} tool call(s) in {step.tools_ms:.0f} ms "
+            f"(slowest {slowest.function} {slowest.elapsed_ms:.0f} ms)"
+        )
+
+    @staticmethod
+    def print_answer(answer: str, steps: List[AgentStep]) -> None:
+        """Print the final answer and a one-line timing summary"""
+        current_time = datetime.now().strftime("%H:%M:%S")
+        console.print(
+            f"\n✨ Answer [{current_time}]:", style=f"bold {TABLE_STYLE['green']}", markup=False
+        )
+        console.print(Markdown(answer))
+        calls = sum(len(step.tool_calls) for step in steps)
+        llm_ms = sum(step.llm_ms for step in steps)
+        tools_ms = sum(step.tools_ms for step in steps)
+        console.print(
+            f"{len(steps)} step(s) · {calls} tool call(s) · LLM {llm_ms:.0f} ms · "
+            f"tools {tools_ms:.0f} ms",
+            style="dim",
+        )
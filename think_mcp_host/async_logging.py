@@ -0,0 +1,211 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from think_mcp_host.utils.settings import HOST_DIR
+
+LOGGER_NAME = "think-mcp-host"
+LOG_DIR = HOST_DIR / "log"
+LOG_FILE_NAME = "think-mcp-host.log"
+
+TEXT_FORMAT = f"%(asctime)s - {LOGGER_NAME} - %(levelname)s - %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Attributes of every LogRecord, anything else was passed through extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message",
+    "asctime",
+}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_lock = threading.Lock()
+
+
+def log_file_path() -> Path:
+    """Current log file of the host"""
+    return LOG_DIR / LOG_FILE_NAME
+
+
+def truncate(value: Any, max_chars: int) -> Any:
+    """Shorten long strings, keeping their start and the number of characters cut"""
+    if max_chars and isinstance(value, str) and len(value) > max_chars:
+        return f"{value[:max_chars]}…[+{len(value) - max_chars} chars]"
+    return value
+
+
+class _PayloadFormatter(logging.Formatter):
+    """Truncate string arguments before they are merged into the message
+
+    Messages are formatted on the listener thread, so callers pass payloads as arguments
+    (logger.info("Input message: %s", text)) and never pay for formatting or writing them.
+    """
+
+    def __init__(self, fmt=None, datefmt=None, max_chars: int = 2000):
+        super().__init__(fmt, datefmt)
+        self.max_chars = max_chars
+
+    def _message(self, record: logging.LogRecord) -> str:
+        if record.args and isinstance(record.args, tuple):
+            record.args = tuple(truncate(arg, self.max_chars) for arg in record.args)
+        return truncate(record.getMessage(), self.max_chars * 2)
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.message = self._message(record)
+        record.msg, record.args = record.message, None
+        return super().format(record)
+
+
+class JsonFormatter(_PayloadFormatter):
+    """One JSON object per line, with the fields passed through extra={...}"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": self._message(record),
+            "thread": record.threadName,
+            "where": f"{record.module}:{record.lineno}",
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                data[key] = truncate(value, self.max_chars)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _SamplingFilter(logging.Filter):
+    """Keep one in every 1/rate DEBUG/INFO records of each logging call site
+
+    Records are counted per source line, messages are mostly f-strings and differ on every
+    call. The first record of a call site is always kept, warnings and errors are never
+    sampled. Only the MAX_SITES most recently used call sites are counted.
+    """
+
+    MAX_SITES = 1024
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counts: "OrderedDict[Tuple[str, int], int]" = OrderedDict()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.every == 1:
+            return True
+        if not self.every:
+            return False
+        site = (record.pathname, record.lineno)
+        count = self._counts.pop(site, 0)
+        self._counts[site] = count + 1
+        if len(self._counts) > self.MAX_SITES:
+            self._counts.popitem(last=False)
+        return count % self.every == 0
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hand records to the listener thread without formatting them or ever blocking
+
+    When the queue is full the record is dropped and counted, a warning with the count is
+    logged once the queue has room again.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the traceback is rendered here, its frames may be gone by the time it's written
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if self.dropped:
+                warning = logging.LogRecord(
+                    record.name,
+                    logging.WARNING,
+                    __file__,
+                    0,
+                    "Dropped %d log record(s), the log queue was full",
+                    (self.dropped,),
+                    None,
+                )
+                self.queue.put_nowait(warning)
+                self.dropped = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(settings: Dict[str, Any]) -> None:
+    """Route the host's logger through a queue to a background writer thread
+
+    Records are enqueued on the calling thread (sampling is the only work done there) and
+    formatted, truncated and written by a QueueListener: as JSON lines or text, to a
+    size-rotated file, with errors also printed to stderr. Safe to call more than once,
+    later calls are ignored.
+
+    Args:
+        settings: The "logging" block of the host settings
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
+        max_chars = settings["payload_max_chars"]
+        if settings["json"]:
+            file_formatter = JsonFormatter(max_chars=max_chars)
+        else:
+            file_formatter = _PayloadFormatter(TEXT_FORMAT, DATE_FORMAT, max_chars=max_chars)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file_path(),
+            maxBytes=int(settings["max_mb"] * 1024 * 1024),
+            backupCount=settings["backups"],
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(file_formatter)
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(_PayloadFormatter(TEXT_FORMAT, DATE_FORMAT, max_chars=500))
+        console_handler.setLevel(logging.ERROR)
+
+        log_queue: queue.Queue = queue.Queue(maxsize=settings["queue_size"])
+        queue_handler = _NonBlockingQueueHandler(log_queue)
+        if settings["sample_rate"] < 1:
+            queue_handler.addFilter(_SamplingFilter(settings["sample_rate"]))
+
+        logger = logging.getLogger(LOGGER_NAME)
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+        logger.addHandler(queue_handler)
+        logger.propagate = False
+
+        _listener = logging.handlers.QueueListener(
+            log_queue, file_handler, console_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Write the queued records and stop the writer thread"""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
@@ -0,0 +1,209 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from think_llm_client import LLMClient
+from think_llm_client.utils.logger import logging
+from think_llm_client.utils.terminal_config import TABLE_STYLE, console
+
+from think_mcp_host.tracing import tracer
+from think_mcp_host.utils.llm_stream import stream_chat
+from think_mcp_host.utils.tokens import estimate_tokens
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+
+def load_batch_items(input_path: Path) -> List[Dict[str, Any]]:
+    """Load prompts from a JSONL file
+
+    Each line is either a JSON string (the prompt) or an object with a "prompt" field and
+    optional "id" and "system_prompt" fields. Blank lines are skipped.
+
+    Args:
+        input_path: JSONL file path
+
+    Returns:
+        List[Dict[str, Any]]: Items with index, id, prompt and system_prompt
+    """
+    items = []
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            if isinstance(data, str):
+                data = {"prompt": data}
+            if not isinstance(data, dict) or "prompt" not in data:
+                raise ValueError(
+                    f"Line {line_number}: expected a string or an object with 'prompt'"
+                )
+            items.append(
+                {
+                    "index": len(items),
+                    "id": data.get("id", len(items)),
+                    "prompt": data["prompt"],
+                    "system_prompt": data.get("system_prompt"),
+                }
+            )
+    return items
+
+
+def resolve_model(llm_client, model_spec: Optional[str]) -> Tuple[str, str, str]:
+    """Resolve "model_type/provider/model", default is the first configured model"""
+    models = llm_client.get_available_models()
+    if not models:
+        raise ValueError("No available models")
+    if not model_spec:
+        return models[0]
+    parts = tuple(model_spec.split("/", 2))
+    if parts not in models:
+        raise ValueError(f"Unknown model: {model_spec}, expected model_type/provider/model")
+    return parts
+
+
+class BatchRunner:
+    """Run a list of prompts through the host with bounded LLM concurrency"""
+
+    def __init__(self, host, model: Tuple[str, str, str], concurrency: int = 4):
+        """Initialize batch runner
+
+        Args:
+            host: Initialized DestinyHost, used for its LLM config and placeholder expansion
+            model: (model_type, provider, model) used for every prompt
+            concurrency: Maximum number of LLM calls in flight
+        """
+        self.host = host
+        self.model = model
+        self.concurrency = max(1, concurrency)
+
+    def _create_llm_client(self) -> LLMClient:
+        """Each worker owns a client, so histories of concurrent prompts never mix"""
+        llm_client = LLMClient(config_path=self.host.llm_config_path)
+        llm_client.set_model(*self.model)
+        return llm_client
+
+    async def run(self, items: List[Dict[str, Any]], output_path: Path) -> Dict[str, Any]:
+        """Run all items, writing results to output_path in completion order
+
+        Returns:
+            Dict[str, Any]: Summary with counts and total time
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in items:
+            queue.put_nowait(item)
+
+        summary = {"total": len(items), "ok": 0, "error": 0, "cached": 0}
+        start = time.perf_counter()
+        with open(output_path, "w", encoding="utf-8") as output:
+
+            async def worker():
+                llm_client = self._create_llm_client()
+                while not queue.empty():
+                    item = queue.get_nowait()
+                    with tracer.span("batch.item", category="turn", id=item["id"]) as span:
+                        result = await self._run_item(llm_client, item)
+                        span.set(status=result["status"])
+                    summary[result["status"]] += 1
+                    cached = result.get("cache") == "hit"
+                    summary["cached"] += cached
+                    output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    output.flush()
+                    console.print(
+                        f"[{result['index'] + 1}/{len(items)}] {result['id']}: "
+                        f"{result['status']} in {result['latency_ms']:.0f} ms"
+                        + (" (cached)" if cached else ""),
+                        style=TABLE_STYLE["green" if result["status"] == "ok" else "red"],
+                    )
+
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(items)))))
+
+        summary["elapsed_ms"] = (time.perf_counter() - start) * 1000
+        return summary
+
+    async def _run_item(self, llm_client: LLMClient, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Expand placeholders and call the LLM for one item"""
+        result = {"index": item["index"], "id": item["id"], "status": "ok", "error": None}
+        start = time.perf_counter()
+        try:
+            message = await self.host.expand_placeholders(item["prompt"], preview=False)
+            result["expand_ms"] = (time.perf_counter() - start) * 1000
+
+            llm_client.messages = []
+            llm_client.system_prompt = item["system_prompt"]
+            reasoning_chunks, content_chunks = [], []
+            llm_start = time.perf_counter()
+            cache_status = {}
+            async for chunk_type, chunk in stream_chat(llm_client, message, status=cache_status):
+                if "ttft_ms" not in result:
+                    result["ttft_ms"] = (time.perf_counter() - llm_start) * 1000
+                (reasoning_chunks if chunk_type == "reasoning" else content_chunks).append(chunk)
+            result["llm_ms"] = (time.perf_counter() - llm_start) * 1000
+            result["cache"] = cache_status["cache"]
+
+            reasoning, response = "".join(reasoning_chunks), "".join(content_chunks)
+            result["reasoning"] = reasoning or None
+            result["response"] = response or None
+            # Token counts are estimated, the streaming API doesn't report usage
+            result["prompt_tokens"] = estimate_tokens(item["system_prompt"]) + estimate_tokens(
+                message
+            )
+            result["completion_tokens"] = estimate_tokens(reasoning) + estimate_tokens(response)
+            if not response:
+                result["status"] = "error"
+                result["error"] = "Empty response from the model, see log for details"
+        except Exception as e:
+            logger.error(f"Batch item {item['id']} failed: {e}")
+            result["status"] = "error"
+            result["error"] = str(e)
+        result["latency_ms"] = (time.perf_counter() - start) * 1000
+        return result
+
+
+async def run_batch(host, args) -> bool:
+    """Initialize the host and run the batch described by the command line arguments"""
+    input_path = Path(args.input)
+    output_path = (
+        Path(args.output)
+        if args.output
+        else input_path.with_name(f"{input_path.stem}.results.jsonl")
+    )
+    try:
+        items = load_batch_items(input_path)
+    except Exception as e:
+        console.print(f"\n❌ Failed to load batch input: {e}", style=TABLE_STYLE["error"])
+        return False
+
+    # Concurrent workers must not connect servers lazily: two of them could initialize the
+    # same client, and the connection would be closed from a different task than its owner
+    host.warmup_enabled = True
+    if not await host.init_clients():
+        console.print("\n❌ Failed to initialize clients", style=TABLE_STYLE["error"])
+        return False
+    host.placeholder_expander.require_connected = True
+
+    try:
+        model = resolve_model(host.llm_client, args.model)
+        console.print(
+            f"\nRunning {len(items)} prompt(s) on {'/'.join(model)} "
+            f"with concurrency {args.concurrency}",
+            style=TABLE_STYLE["cyan"],
+        )
+        runner = BatchRunner(host, model, concurrency=args.concurrency)
+        summary = await runner.run(items, output_path)
+    except Exception as e:
+        console.print(f"\n❌ Batch failed: {e}", style=TABLE_STYLE["error"])
+        logger.error(f"Batch failed: {e}")
+        return False
+    finally:
+        await host.cleanup_resources()
+
+    console.print(
+        f"\n✨ {summary['ok']} ok, {summary['error']} failed in {summary['elapsed_ms'] / 1000:.1f}s, "
+        + (f"{summary['cached']} from the response cache, " if summary["cached"] else "")
+        + f"results written to {output_path}",
+        style=TABLE_STYLE["green"],
+    )
+    return summary["error"] == 0
@@ -0,0 +1,278 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from think_llm_client.utils.logger import logging
+from think_mcp_client import Prompt, Resource, Tool
+
+from think_mcp_host.utils.settings import HOST_DIR
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+# Capability kind -> (client list method, dataclass used to restore cached items)
+CAPABILITY_KINDS = {
+    "tools": ("list_tools", Tool),
+    "resources": ("list_resources", Resource),
+    "prompts": ("list_prompts", Prompt),
+}
+
+# MCP list_changed notification method -> capability kind
+LIST_CHANGED_NOTIFICATIONS = {
+    "notifications/tools/list_changed": "tools",
+    "notifications/resources/list_changed": "resources",
+    "notifications/prompts/list_changed": "prompts",
+}
+
+# Seconds to collect changes before the snapshot is rewritten
+SAVE_DELAY = 1.0
+
+
+def server_config_hash(server_config: Dict[str, Any]) -> str:
+    """Hash a server's configuration so a changed command/args/env invalidates its cache"""
+    payload = json.dumps(server_config, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class CapabilityCache:
+    """TTL-bounded cache of MCP server tools/resources/prompts lists
+
+    Entries are keyed by server name plus config hash, kept in an in-memory LRU and
+    snapshotted to disk so that the next launch can render menus before servers boot.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        ttl: float = 600,
+        max_entries: int = 64,
+    ):
+        """Initialize capability cache
+
+        Args:
+            cache_dir: Directory of the on-disk snapshot, default is ~/.think-mcp-host/cache
+            ttl: Seconds before a cached list is considered stale
+            max_entries: Maximum number of servers kept in memory
+        """
+        self.cache_dir = cache_dir or HOST_DIR / "cache"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.snapshot_path = self.cache_dir / "capabilities.json"
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> {kind: {"fetched_at": float, "items": [dict, ...]}}
+        self._entries: "OrderedDict[str, Dict[str, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Server name -> cache key of the attached manager's servers
+        self.keys: Dict[str, str] = {}
+        self._listeners: List[
+            Callable[[Optional[str], Optional[str], Optional[List[Any]]], None]
+        ] = []
+        # Set when the snapshot on disk is older than the in-memory entries
+        self._dirty = False
+        self._save_task: Optional[asyncio.Task] = None
+        self._write_lock = threading.Lock()
+        self._load_snapshot()
+
+    def _load_snapshot(self) -> None:
+        """Load the on-disk snapshot, dropping expired entries"""
+        if not self.snapshot_path.exists():
+            return
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            now = time.time()
+            for key, kinds in snapshot.items():
+                fresh = {
+                    kind: entry
+                    for kind, entry in kinds.items()
+                    if kind in CAPABILITY_KINDS and now - entry.get("fetched_at", 0) < self.ttl
+                }
+                if fresh:
+                    self._entries[key] = fresh
+            self._evict()
+        except Exception as e:
+            logger.error(f"Failed to load capability cache snapshot: {e}")
+
+    def _write_snapshot(self, payload: str) -> None:
+        """Atomically write a serialized snapshot to disk"""
+        try:
+            with self._write_lock:
+                tmp_path = self.snapshot_path.with_suffix(".tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(payload)
+                os.replace(tmp_path, self.snapshot_path)
+        except Exception as e:
+            logger.error(f"Failed to save capability cache snapshot: {e}")
+
+    def _schedule_save(self) -> None:
+        """Mark the snapshot stale and rewrite it shortly after, off the event loop"""
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        if self._save_task is None or self._save_task.done():
+            self._save_task = loop.create_task(self._save_later())
+
+    async def _save_later(self) -> None:
+        while self._dirty:
+            await asyncio.sleep(SAVE_DELAY)
+            self._dirty = False
+            payload = json.dumps(self._entries, ensure_ascii=False)
+            await asyncio.to_thread(self._write_snapshot, payload)
+
+    def flush(self) -> None:
+        """Write pending changes to disk now, e.g. at shutdown"""
+        if self._save_task is not None and not self._save_task.done():
+            self._save_task.cancel()
+        self._save_task = None
+        if self._dirty:
+            self._dirty = False
+            self._write_snapshot(json.dumps(self._entries, ensure_ascii=False))
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str, kind: str) -> Optional[List[Any]]:
+        """Get a cached capability list
+
+        Args:
+            key: Cache key of the server
+            kind: One of tools / resources / prompts
+
+        Returns:
+            The cached items, or None if missing or expired
+        """
+        entry = self._entries.get(key, {}).get(kind)
+        if entry is None or time.time() - entry["fetched_at"] >= self.ttl:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        item_class = CAPABILITY_KINDS[kind][1]
+        return [item_class(**item) for item in entry["items"]]
+
+    def peek(self, key: str, kind: str) -> Optional[List[Any]]:
+        """Get a cached capability list even if expired, without counting or reordering it"""
+        entry = self._entries.get(key, {}).get(kind)
+        if entry is None:
+            return None
+        item_class = CAPABILITY_KINDS[kind][1]
+        return [item_class(**item) for item in entry["items"]]
+
+    def add_listener(
+        self, callback: Callable[[Optional[str], Optional[str], Optional[List[Any]]], None]
+    ) -> None:
+        """Call callback(key, kind, items) whenever a list is stored or invalidated
+
+        Items are None on invalidation, key and kind are None when all of them are invalidated.
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, key: Optional[str], kind: Optional[str], items: Optional[List[Any]]) -> None:
+        for callback in self._listeners:
+            try:
+                callback(key, kind, items)
+            except Exception as e:
+                logger.error(f"Capability cache listener failed: {e}")
+
+    def put(self, key: str, kind: str, items: List[Any]) -> None:
+        """Store a capability list"""
+        self._entries.setdefault(key, {})[kind] = {
+            "fetched_at": time.time(),
+            "items": [asdict(item) for item in items],
+        }
+        self._entries.move_to_end(key)
+        self._evict()
+        self._schedule_save()
+        self._notify(key, kind, items)
+
+    def invalidate(self, key: Optional[str] = None, kind: Optional[str] = None) -> None:
+        """Invalidate cached lists
+
+        Args:
+            key: Server cache key, if not specified all servers are invalidated
+            kind: Capability kind, if not specified all kinds are invalidated
+        """
+        if key is None:
+            self._entries.clear()
+        elif kind is None:
+            self._entries.pop(key, None)
+        else:
+            self._entries.get(key, {}).pop(kind, None)
+        self._schedule_save()
+        if key is not None and kind is None:
+            for each_kind in CAPABILITY_KINDS:
+                self._notify(key, each_kind, None)
+        else:
+            self._notify(key, kind, None)
+
+    def attach(self, mcp_manager) -> None:
+        """Route every client's list_* calls of the manager through the cache
+
+        Clients must open their sessions with mcp_session.open_session, which passes
+        client.message_handler to the session so list_changed notifications invalidate it.
+
+        Args:
+            mcp_manager: MCP client manager whose clients will be wrapped
+        """
+        try:
+            with open(mcp_manager.config_path, "r", encoding="utf-8") as f:
+                servers_config = json.load(f).get("mcpServers", {})
+        except Exception as e:
+            logger.error(f"Failed to read MCP config for capability cache: {e}")
+            return
+
+        for name, client in mcp_manager.get_all_clients().items():
+            key = f"{name}:{server_config_hash(servers_config.get(name, {}))}"
+            self.keys[name] = key
+            self._wrap_client(key, client)
+
+    def _wrap_client(self, key: str, client) -> None:
+        """Replace the client's list methods with cache-aware versions and watch list changes"""
+        for kind, (method_name, _) in CAPABILITY_KINDS.items():
+            original = getattr(client, method_name)
+            setattr(client, method_name, self._cached_list(key, kind, original))
+        client.message_handler = self._message_handler(key)
+
+    def _cached_list(self, key: str, kind: str, original):
+        async def cached_list():
+            items = self.get(key, kind)
+            if items is not None:
+                return items
+            items = await original()
+            self.put(key, kind, items)
+            return items
+
+        return cached_list
+
+    def _message_handler(self, key: str):
+        """Build a ClientSession message_handler invalidating lists the server reports changed"""
+
+        async def message_handler(message):
+            method = getattr(getattr(message, "root", None), "method", "")
+            kind = LIST_CHANGED_NOTIFICATIONS.get(method)
+            if kind:
+                logger.info(f"MCP server {key} reported {kind} list changed")
+                self.invalidate(key, kind)
+
+        return message_handler
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return {
+            "servers": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "ttl": self.ttl,
+        }
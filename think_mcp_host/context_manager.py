@@ -0,0 +1,288 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from think_llm_client.utils.logger import logging
+
+from think_mcp_host.tracing import tracer
+from think_mcp_host.utils.llm_stream import stream_chat
+from think_mcp_host.utils.tokens import MESSAGE_OVERHEAD_TOKENS, estimate_tokens
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You summarize conversations between a user and an assistant. Keep facts, decisions, "
+    "names, numbers and open questions the rest of the conversation may rely on. "
+    "Answer with the summary only, in the language of the conversation."
+)
+
+SUMMARY_PREFIX = "[Summary of the earlier conversation]\n"
+
+
+class ContextManager:
+    """Keep the prompt of each chat turn within a per-model token budget
+
+    The full history stays in the LLM client. For the duration of a call the client's
+    messages are swapped for a budgeted view. A history that fits the budget is sent as
+    is; otherwise oversized payloads (pasted resources, tool results) are truncated and
+    then turns evicted, oldest first, until it fits, and evicted turns are replaced by a
+    summary when one is available. Token counts are cached per message, so a turn only
+    estimates the messages it hasn't seen before.
+    """
+
+    def __init__(
+        self,
+        llm_config_path: Optional[str] = None,
+        default_budget: int = 32000,
+        budgets: Optional[Dict[str, int]] = None,
+        max_message_tokens: int = 4000,
+        summarize: bool = False,
+        summary_tokens: int = 500,
+    ):
+        """Initialize context manager
+
+        Args:
+            llm_config_path: LLM config used for the summarization client
+            default_budget: Prompt token budget of models without their own budget
+            budgets: Budgets by "provider/model" or "model"
+            max_message_tokens: Historical messages above this are truncated in the view of a
+                history over the budget
+            summarize: Whether to summarize evicted turns with the current model, an extra
+                LLM request whenever turns are evicted
+            summary_tokens: Target length of the summary
+        """
+        self.llm_config_path = llm_config_path
+        self.default_budget = default_budget
+        self.budgets = budgets or {}
+        self.max_message_tokens = max_message_tokens
+        self.summarize = summarize
+        self.summary_tokens = summary_tokens
+        # id(message) -> (message, tokens), the message is kept so the id stays unique
+        self._token_cache: Dict[int, Tuple[Dict[str, Any], int]] = {}
+        self._truncated_cache: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        # (covered, messages): summary of the first covered messages of the history
+        self._summary: Optional[Tuple[int, List[Dict[str, Any]]]] = None
+        self._summary_task: Optional[asyncio.Task] = None
+
+    def budget(self, provider: Optional[str], model: Optional[str]) -> int:
+        """Prompt token budget of a model"""
+        return self.budgets.get(
+            f"{provider}/{model}", self.budgets.get(model or "", self.default_budget)
+        )
+
+    def message_tokens(self, message: Dict[str, Any]) -> int:
+        """Estimated tokens of a message, cached per message"""
+        cached = self._token_cache.get(id(message))
+        if cached and cached[0] is message:
+            return cached[1]
+        tokens = estimate_tokens(message.get("content")) + MESSAGE_OVERHEAD_TOKENS
+        self._token_cache[id(message)] = (message, tokens)
+        return tokens
+
+    def _truncated(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of an oversized message keeping its head and tail"""
+        content = message.get("content")
+        tokens = self.message_tokens(message)
+        if tokens <= self.max_message_tokens or not isinstance(content, str):
+            return message
+        cached = self._truncated_cache.get(id(message))
+        if cached and cached[0] is message:
+            return cached[1]
+
+        chars_per_token = len(content) / max(tokens - MESSAGE_OVERHEAD_TOKENS, 1)
+        keep = int(self.max_message_tokens * chars_per_token)
+        head, tail = content[: keep * 2 // 3], content[-(keep // 3) :] if keep >= 3 else ""
+        omitted = estimate_tokens(content[len(head) : len(content) - len(tail)])
+        truncated = dict(message)
+        truncated["content"] = f"{head}\n[... ~{omitted} tokens truncated ...]\n{tail}"
+        self._truncated_cache[id(message)] = (message, truncated)
+        return truncated
+
+    def _forget(self, history: List[Dict[str, Any]]) -> None:
+        """Drop cache entries of messages no longer in the history (e.g. after /clear)"""
+        if len(self._token_cache) <= 2 * len(history) + 16:
+            return
+        alive = {id(message) for message in history}
+        self._token_cache = {k: v for k, v in self._token_cache.items() if k in alive}
+        self._truncated_cache = {k: v for k, v in self._truncated_cache.items() if k in alive}
+
+    def build_view(
+        self,
+        history: List[Dict[str, Any]],
+        system_prompt: Optional[str],
+        message: str,
+        budget: int,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Select the messages sent with the next user message
+
+        Args:
+            history: Full conversation history
+            system_prompt: System prompt, always sent
+            message: Next user message, always sent in full
+            budget: Prompt token budget
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Dict[str, Any]]: (view, report)
+        """
+        self._forget(history)
+        fixed = estimate_tokens(system_prompt) + estimate_tokens(message)
+        fixed += MESSAGE_OVERHEAD_TOKENS * 2
+        full_tokens = fixed + sum(self.message_tokens(m) for m in history)
+
+        view = list(history)
+        used = full_tokens
+        start = 0
+        if used > budget:
+            # Oversized messages are truncated first, oldest first, until the history fits
+            for i, original in enumerate(history):
+                if used <= budget:
+                    break
+                copy = self._truncated(original)
+                if copy is not original:
+                    view[i] = copy
+                    used -= self.message_tokens(original) - self.message_tokens(copy)
+
+            # Then the oldest turns are evicted, leaving room for the summary that replaces them
+            summary_reserve = (
+                sum(self.message_tokens(m) for m in self._summary[1]) if self._summary else 0
+            )
+            while start < len(view) and used + summary_reserve > budget:
+                # Keep user/assistant pairs together so roles keep alternating
+                end = start + 1
+                if (
+                    view[start].get("role") == "user"
+                    and end < len(view)
+                    and view[end].get("role") == "assistant"
+                ):
+                    end += 1
+                used -= sum(self.message_tokens(m) for m in view[start:end])
+                start = end
+
+        kept = view[start:]
+        truncated = sum(1 for original, m in zip(history[start:], kept) if m is not original)
+        view = kept
+        summarized = 0
+        if start > 0 and self._summary:
+            covered, summary_messages = self._summary
+            summary_tokens = sum(self.message_tokens(m) for m in summary_messages)
+            if used + summary_tokens <= budget:
+                view = summary_messages + kept
+                used += summary_tokens
+                summarized = min(covered, start)
+
+        report = {
+            "budget": budget,
+            "prompt_tokens": used,
+            "full_tokens": full_tokens,
+            "saved_tokens": max(full_tokens - used, 0),
+            "kept_messages": len(kept),
+            "evicted_messages": start,
+            "summarized_messages": summarized,
+            "truncated_messages": truncated,
+        }
+        return view, report
+
+    @asynccontextmanager
+    async def window(self, llm_client, message: str):
+        """Send the next turn with a budgeted view of the history
+
+        The client's messages are swapped for the view during the call, and the new
+        messages of the turn are appended to the full history afterwards.
+
+        Args:
+            llm_client: LLM client with the model already set
+            message: Next user message
+        """
+        history = llm_client.messages
+        budget = self.budget(llm_client.current_provider, llm_client.current_model)
+        with tracer.span("context.build", category="context") as span:
+            view, report = self.build_view(history, llm_client.system_prompt, message, budget)
+            span.set(**report)
+        logger.info(
+            f"Prompt ~{report['prompt_tokens']} of {report['budget']} tokens "
+            f"(full history ~{report['full_tokens']}, saved ~{report['saved_tokens']}): "
+            f"{report['kept_messages']} message(s) kept, {report['evicted_messages']} evicted, "
+            f"{report['summarized_messages']} summarized, {report['truncated_messages']} truncated"
+        )
+
+        if report["prompt_tokens"] > budget:
+            logger.warning(
+                f"Message alone is ~{report['prompt_tokens']} tokens, over the budget of {budget}"
+            )
+
+        llm_client.messages = list(view)
+        try:
+            yield report
+        finally:
+            new_messages = llm_client.messages[len(view) :]
+            llm_client.messages = history
+            history.extend(new_messages)
+
+        if self.summarize and report["evicted_messages"]:
+            self._schedule_summary(llm_client, history, report["evicted_messages"])
+
+    def _schedule_summary(self, llm_client, history: List[Dict[str, Any]], evicted: int) -> None:
+        """Summarize evicted messages in the background, ready for a later turn"""
+        covered = self._summary[0] if self._summary else 0
+        if evicted <= covered or (self._summary_task and not self._summary_task.done()):
+            return
+        logger.info(
+            f"Summarizing {evicted - covered} evicted message(s) with "
+            f"{llm_client.current_provider}/{llm_client.current_model} (an extra LLM request)"
+        )
+        self._summary_task = asyncio.create_task(
+            self._update_summary(llm_client, history[:evicted], covered)
+        )
+
+    async def _update_summary(
+        self, llm_client, messages: List[Dict[str, Any]], covered: int
+    ) -> None:
+        from think_llm_client import LLMClient
+
+        lines = []
+        if self._summary:
+            previous = self._summary[1][0]["content"][len(SUMMARY_PREFIX) :]
+            lines.append(f"Summary so far:\n{previous}\n")
+        for m in messages[covered:]:
+            content = self._truncated(m).get("content")
+            if isinstance(content, list):
+                content = " ".join(p.get("text", "") for p in content if isinstance(p, dict))
+            lines.append(f"{m.get('role')}: {content}")
+        prompt = (
+            "\n".join(lines)
+            + f"\n\nSummarize the conversation above in at most {self.summary_tokens} tokens."
+        )
+
+        try:
+            summarizer = LLMClient(config_path=self.llm_config_path)
+            summarizer.set_model(
+                llm_client.current_model_type, llm_client.current_provider, llm_client.current_model
+            )
+            summarizer.system_prompt = SUMMARY_SYSTEM_PROMPT
+            chunks = []
+            async for chunk_type, chunk in stream_chat(summarizer, prompt):
+                if chunk_type == "content":
+                    chunks.append(chunk)
+            summary = "".join(chunks).strip()
+            if summary:
+                # A user/assistant pair keeps roles alternating for every provider
+                summary_messages = [
+                    {"role": "user", "content": SUMMARY_PREFIX + summary},
+                    {"role": "assistant", "content": "Understood."},
+                ]
+                self._summary = (len(messages), summary_messages)
+                logger.info(
+                    f"Summarized {len(messages)} message(s) into ~{estimate_tokens(summary)} tokens"
+                )
+        except Exception as e:
+            logger.error(f"Failed to summarize evicted messages: {e}")
+
+    def reset(self) -> None:
+        """Forget the summary, e.g. after the history was cleared or replaced"""
+        if self._summary_task and not self._summary_task.done():
+            self._summary_task.cancel()
+        self._summary = None
+        self._summary_task = None
+        self._token_cache.clear()
+        self._truncated_cache.clear()
@@ -1,50 +1,106 @@
-import argparse
 import asyncio
 import os
 import platform
 import re
+import socket
 import sys
-import time
-from datetime import datetime
-from enum import Enum
-from importlib.metadata import version
 from pathlib import Path
 
-from dotenv import load_dotenv
-from prompt_toolkit.application import get_app
-from prompt_toolkit.key_binding import KeyBindings
-from prompt_toolkit.keys import Keys
 from rich.align import Align
-from rich.panel import Panel
-from rich.prompt import Prompt
-from think_llm_client.cli import LLMCLIClient
-from think_llm_client.utils.display import print_markdown
-from think_llm_client.utils.logger import get_log_file_path, logging, setup_logger
+from think_llm_client.utils.logger import logging, setup_logger
 from think_llm_client.utils.terminal_config import TABLE_STYLE, console
-from think_mcp_client import ClientType, MCPClientManager
-from think_mcp_client.mcp_processor import MCPProcessor
 
-from think_mcp_host.utils.poetry_display import Language, PoetryType, display_random_poetry
+from think_mcp_host import mcp_session
+from think_mcp_host.agent import AgentError, AgentLoop
+from think_mcp_host.async_logging import configure_logging, log_file_path
+from think_mcp_host.capability_cache import CapabilityCache
+from think_mcp_host.context_manager import ContextManager
+from think_mcp_host.fanout import POLICIES, FanOut
+from think_mcp_host.history_index import HistoryIndex
+from think_mcp_host.history_journal import HistoryJournal
+from think_mcp_host.llm_scheduler import llm_scheduler
+from think_mcp_host.mcp_broker import BrokerClient, run_broker_command
+from think_mcp_host.mcp_completer import CapabilityIndex, MCPCompleter
+from think_mcp_host.mcp_supervisor import ConnectionLostError, MCPSupervisor
+from think_mcp_host.mcp_warmup import MCPWarmup
+from think_mcp_host.payload_store import PayloadStore
+from think_mcp_host.placeholder_expander import PlaceholderExpander
+from think_mcp_host.placeholder_prefetch import PlaceholderPrefetcher
+from think_mcp_host.resource_index import ResourceIndex
+from think_mcp_host.response_cache import response_cache
+from think_mcp_host.result_cache import CachePolicy, ResultCache
+from think_mcp_host.startup import (
+    build_parser,
+    get_version,
+    load_cached_banner,
+    save_cached_banner,
+    terminal_width,
+)
+from think_mcp_host.stream_renderer import StreamRenderer
+from think_mcp_host.tracing import tracer
+from think_mcp_host.utils.poetry_display import Language, display_random_poetry
+from think_mcp_host.utils.settings import load_settings
+
+# Initialize project-specific logging configuration
+setup_logger("think-mcp-host")
 
 # Get project-specific logger
 logger = logging.getLogger("think-mcp-host")
 
 
 class DestinyHost:
-    def __init__(self, llm_config_path=None, mcp_config_path=None):
+    def __init__(
+        self,
+        llm_config_path=None,
+        mcp_config_path=None,
+        host_config_path=None,
+        warmup=False,
+        warmup_timeout=10.0,
+        profiler=None,
+        banner_shown=False,
+    ):
         # Specify configuration file paths
         self.llm_config_path = llm_config_path
         self.mcp_config_path = mcp_config_path
+        self.settings = load_settings(host_config_path)
+        # Log writes happen on a background thread from here on
+        configure_logging(self.settings["logging"])
         self.llm_client = None
         self.mcp_manager = None
         self.mcp_processor = None
+        self.placeholder_expander = None
+        self.placeholder_prefetcher = None  # Resolves placeholders while the message is typed
+        self.capability_cache = None
+        self.result_cache = None
+        self.payload_store = None  # Large MCP contents spilled to disk
+        # Optional eager connection of all MCP servers
+        self.warmup_enabled = warmup
+        self.warmup_timeout = warmup_timeout
+        self.mcp_warmup = None
+        self.mcp_supervisor = None  # Health checks and reconnects of warm-up connections
+        self._warmup_reported = False
+        self._index_task = None
+        self._warmup_lock = asyncio.Lock()
+        # Placeholder completion, served from an index that MCP listings keep up to date
+        self.capability_index = CapabilityIndex()
         self.session = self._create_prompt_session()
         self.current_history_file = None  # Add current history file path
+        self.history_journal = None  # Append-only persistence of the conversation
+        self.history_index = None  # Searchable index of saved conversations
+        self.context_manager = None  # Token budget of each chat turn
+        self.fanout = None  # Sends each turn to several models when more than one is selected
+        self.agent = None  # Lets the model call MCP tools itself (/agent on)
         self.language = Language.ENGLISH  # Default to English
+        # Startup profiling and whether the cached banner was already written by the entry point
+        self.profiler = profiler
+        self.banner_shown = banner_shown
+        # TTFT and speed of the last reply, shown in the next prompt
+        self.last_stream_stats = ""
 
     def _create_prompt_session(self):
         """Create prompt session"""
         from prompt_toolkit import PromptSession
+        from prompt_toolkit.completion import ThreadedCompleter
         from prompt_toolkit.history import FileHistory
         from prompt_toolkit.styles import Style
 
@@ -59,7 +115,21 @@ class DestinyHost:
             }
         )
 
-        return PromptSession(history=history, style=style, include_default_pygments_style=False)
+        completion_settings = self.settings["completion"]
+        completer = None
+        if completion_settings["enabled"]:
+            # Completions are computed off the event loop, typing is never held up
+            completer = ThreadedCompleter(
+                MCPCompleter(self.capability_index, max_results=completion_settings["max_results"])
+            )
+
+        return PromptSession(
+            history=history,
+            style=style,
+            include_default_pygments_style=False,
+            completer=completer,
+            complete_while_typing=completer is not None,
+        )
 
     def clear_screen(self):
         """Clear screen, using a cross-platform method"""
@@ -70,11 +140,98 @@ class DestinyHost:
 
     def init_mcp(self):
         """Synchronously initialize MCP-related components"""
+        from think_mcp_client import ClientType, MCPClientManager
+        from think_mcp_client.mcp_processor import MCPProcessor
+
         try:
             # Convert string path to Path object
             config_path = Path(self.mcp_config_path) if self.mcp_config_path else None
             self.mcp_manager = MCPClientManager(config_path=config_path, client_type=ClientType.CLI)
+            # Sessions are opened here so server notifications reach the host's handlers
+            mcp_session.attach(self.mcp_manager)
+
+            # Attach to servers kept running by the broker instead of spawning them
+            broker_settings = self.settings["broker"]
+            if broker_settings["enabled"]:
+                if hasattr(socket, "AF_UNIX"):
+                    BrokerClient(
+                        broker_settings["socket"],
+                        idle_timeout=broker_settings["idle_timeout"],
+                        autostart=broker_settings["autostart"],
+                    ).attach(self.mcp_manager)
+                else:
+                    logger.warning("The MCP broker requires Unix domain sockets")
+
+            # Serve tools/resources/prompts lists from the capability cache when possible
+            cache_settings = self.settings["capability_cache"]
+            if cache_settings["enabled"]:
+                self.capability_cache = CapabilityCache(
+                    ttl=cache_settings["ttl"], max_entries=cache_settings["max_entries"]
+                )
+                self.capability_cache.attach(self.mcp_manager)
+            # Completions are available from the cache snapshot before any server is up
+            self.capability_index.attach(self.mcp_manager, self.capability_cache)
+
+            # Reuse results of idempotent reads and tool calls allowed by the MCP config
+            result_cache_settings = self.settings["result_cache"]
+            if result_cache_settings["enabled"]:
+                self.result_cache = ResultCache(
+                    CachePolicy.from_mcp_config(
+                        self.mcp_manager.config_path, result_cache_settings["ttl"]
+                    ),
+                    max_mb=result_cache_settings["max_mb"],
+                )
+
             self.mcp_processor = MCPProcessor(self.mcp_manager)
+            placeholder_settings = self.settings["placeholders"]
+            self.placeholder_expander = PlaceholderExpander(
+                self.mcp_manager,
+                max_concurrency_per_server=placeholder_settings["max_concurrency_per_server"],
+                timeout=placeholder_settings["timeout"],
+                result_cache=self.result_cache,
+            )
+
+            # Keep large contents out of messages, history and memory
+            payload_settings = self.settings["payloads"]
+            if payload_settings["enabled"]:
+                self.payload_store = PayloadStore(
+                    threshold_kb=payload_settings["threshold_kb"],
+                    policy=payload_settings["policy"],
+                    excerpt_chars=payload_settings["excerpt_chars"],
+                    chunks=payload_settings["chunks"],
+                    max_mb=payload_settings["max_mb"],
+                )
+                self.placeholder_expander.payload_store = self.payload_store
+
+            # ->mcp_rag placeholders insert only the resource chunks relevant to the message
+            rag_settings = self.settings["rag"]
+            if rag_settings["enabled"]:
+                try:
+                    self.placeholder_expander.resource_index = ResourceIndex(
+                        chunk_chars=rag_settings["chunk_chars"],
+                        top_k=rag_settings["top_k"],
+                        max_documents=rag_settings["max_documents"],
+                    )
+                    self.placeholder_expander.rag_max_resources = rag_settings["max_resources"]
+                except Exception as e:
+                    logger.error(f"Resource index unavailable: {e}")
+
+            # Start reading resources and read-only tools while the message is being typed
+            prefetch_settings = self.settings["prefetch"]
+            if prefetch_settings["enabled"]:
+                self.placeholder_prefetcher = PlaceholderPrefetcher(
+                    self.placeholder_expander,
+                    policy=(
+                        self.result_cache.policy
+                        if self.result_cache
+                        else CachePolicy.from_mcp_config(self.mcp_manager.config_path, 0)
+                    ),
+                    delay=prefetch_settings["delay"],
+                    max_age=prefetch_settings["max_age"],
+                    max_pending=prefetch_settings["max_pending"],
+                )
+                self.placeholder_prefetcher.attach(self.session)
+                self.placeholder_expander.prefetcher = self.placeholder_prefetcher
             logger.info("MCP initialized successfully")
             return True
         except Exception as e:
@@ -83,6 +240,8 @@ class DestinyHost:
 
     async def init_clients(self):
         """Initialize all clients"""
+        from think_llm_client.cli import LLMCLIClient
+
         # Initialize LLM client
         try:
             self.llm_client = LLMCLIClient(config_path=self.llm_config_path)
@@ -91,19 +250,105 @@ class DestinyHost:
             logger.error(f"LLM client initialization failed: {e}")
             return False
 
+        if self.settings["llm_scheduler"]["enabled"]:
+            llm_scheduler.configure(self.settings["llm_scheduler"], self.llm_config_path)
+
+        context_settings = self.settings["context"]
+        if context_settings["enabled"]:
+            self.context_manager = ContextManager(
+                llm_config_path=self.llm_config_path,
+                default_budget=context_settings["default_budget"],
+                budgets=context_settings["budgets"],
+                max_message_tokens=context_settings["max_message_tokens"],
+                summarize=context_settings["summarize"],
+                summary_tokens=context_settings["summary_tokens"],
+            )
+
+        history_settings = self.settings["history"]
+        if history_settings["index"]:
+            try:
+                self.history_index = HistoryIndex()
+            except Exception as e:
+                logger.error(f"History index unavailable: {e}")
+        if history_settings["journal"]:
+            self.history_journal = HistoryJournal(
+                self.llm_client,
+                compact_every=history_settings["compact_every"],
+                history_index=self.history_index,
+            )
+
         # Synchronously initialize MCP
         if not self.init_mcp():
             return False
+
+        # Connect all servers in the background while the user goes through the setup prompts
+        if self.warmup_enabled:
+            supervisor_settings = self.settings["supervisor"]
+            if supervisor_settings["enabled"]:
+                self.mcp_supervisor = MCPSupervisor(
+                    ping_interval=supervisor_settings["ping_interval"],
+                    ping_timeout=supervisor_settings["ping_timeout"],
+                    max_missed_pings=supervisor_settings["max_missed_pings"],
+                    degraded_ms=supervisor_settings["degraded_ms"],
+                    backoff_base=supervisor_settings["backoff_base"],
+                    backoff_max=supervisor_settings["backoff_max"],
+                    max_reconnect_attempts=supervisor_settings["max_reconnect_attempts"],
+                    connect_timeout=self.warmup_timeout,
+                    wait_timeout=supervisor_settings["wait_timeout"],
+                    policy=CachePolicy.from_mcp_config(self.mcp_manager.config_path, 0),
+                )
+                self.placeholder_expander.supervisor = self.mcp_supervisor
+            self.mcp_warmup = MCPWarmup(
+                self.mcp_manager, timeout=self.warmup_timeout, supervisor=self.mcp_supervisor
+            )
+            self.mcp_warmup.start()
         return True
 
+    async def wait_for_mcp(self):
+        """Wait for the MCP warm-up (if enabled) and print its report once"""
+        if not self.mcp_warmup or self._warmup_reported:
+            return
+        async with self._warmup_lock:
+            if self._warmup_reported:
+                return
+            if not self.mcp_warmup.done:
+                console.print(
+                    "\n⏳ Waiting for MCP servers to be ready...", style=TABLE_STYLE["info"]
+                )
+            await self.mcp_warmup.wait()
+            self.mcp_warmup.print_report()
+            self._warmup_reported = True
+            # Index the warm connections without delaying the first prompt
+            self._index_task = asyncio.create_task(self.capability_index.refresh())
+
     def print_header(self):
         """Print program header information"""
+        version = get_version()
+
+        # The figlet banner and welcome panel are static, render them once per version and width
+        if not self.banner_shown:
+            width = terminal_width()
+            banner = load_cached_banner(version, width)
+            if banner is None:
+                with console.capture() as capture:
+                    self._print_banner()
+                banner = capture.get()
+                save_cached_banner(version, width, banner)
+            console.file.write(banner)
+            self.banner_shown = True
+
+        # Version number and usage tips
+        version_text = f"[{TABLE_STYLE['info']}]Version: {version}[/]"
+
+        # Display random poetry in the selected language
+        display_random_poetry(language=self.language)
+        console.print(Align.center(version_text))
+
+    def _print_banner(self):
+        """Print the "AI ZEN LOVE" figlet banner and welcome panel"""
         from pyfiglet import figlet_format
-        from rich.align import Align
         from rich.panel import Panel
 
-        version = get_version()
-
         # Generate figlet for each part
         header_ai = figlet_format("AI", font="slant")
         header_zen = figlet_format("ZEN", font="slant")  # Use uppercase for more uniform length
@@ -157,13 +402,6 @@ class DestinyHost:
         )
         console.print(Align.center(welcome_panel))
 
-        # Version number and usage tips
-        version_text = f"[{TABLE_STYLE['info']}]Version: {version}[/]"
-
-        # Display random poetry in the selected language
-        display_random_poetry(language=self.language)
-        console.print(Align.center(version_text))
-
     async def process_mcp_input(
         self, initial_input: str = "", *, allow_empty: bool = False
     ) -> tuple[str, bool]:
@@ -181,10 +419,11 @@ class DestinyHost:
         while True:
             if not initial_input:
                 try:
-                    user_input = await self.session.prompt_async(
-                        [("class:prompt", "\nYou: ")],
-                        rprompt=[("class:rprompt", " Ctrl+C to exit")],
-                    )
+                    with tracer.span("prompt.wait", category="prompt"):
+                        user_input = await self.session.prompt_async(
+                            [("class:prompt", "\nYou: ")],
+                            rprompt=[("class:rprompt", self._chat_rprompt())],
+                        )
                 except (EOFError, KeyboardInterrupt):
                     return "", False
 
@@ -209,6 +448,7 @@ class DestinyHost:
                         style=TABLE_STYLE["yellow"],
                     )
                     return "", False
+                await self.wait_for_mcp()
 
                 # Get text before and after ->mcp
                 start_pos = mcp_match.start()
@@ -225,22 +465,36 @@ class DestinyHost:
                         style=TABLE_STYLE["green"],
                     )
                     try:
-                        user_input = await self.session.prompt_async(
-                            default=f"{prefix}{result}{suffix}"
-                        )
+                        with tracer.span("prompt.wait", category="prompt"):
+                            user_input = await self.session.prompt_async(
+                                default=f"{prefix}{result}{suffix}"
+                            )
                     except (EOFError, KeyboardInterrupt):
                         return "", False
                 else:
                     break
 
             # Finally process all placeholders
-            if self.mcp_processor:
-                processed_input = await self.mcp_processor.process_text(user_input)
-            else:
-                processed_input = user_input
-
+            processed_input = await self.expand_placeholders(user_input)
             return processed_input, True
 
+    async def expand_placeholders(self, text: str, preview: bool = True) -> str:
+        """Replace all ->mcp_* placeholders in the text with their content
+
+        Args:
+            text: Text that may contain placeholders
+            preview: Whether to print the processed content
+
+        Returns:
+            str: Text with placeholders resolved
+        """
+        if not self.placeholder_expander:
+            return text
+        if "->mcp_" in text:
+            with tracer.span("mcp.wait", category="mcp"):
+                await self.wait_for_mcp()
+        return await self.placeholder_expander.expand(text, preview=preview)
+
     async def ask_save_with_timeout(self, timeout=5):
         """Ask whether to save the conversation, with timeout functionality"""
 
@@ -274,22 +528,39 @@ class DestinyHost:
 
     async def save_chat_history(self):
         """Save and export conversation history"""
+        with tracer.span("persist.save", category="persist"):
+            await self._save_chat_history()
+
+    async def _save_chat_history(self):
         if self.llm_client:
             try:
-                if self.current_history_file:
+                if self.history_journal and self.history_journal.path:
+                    # Turns are already journaled, compacting writes the history file
+                    new_file = await self.history_journal.compact()
+                    if new_file:
+                        self.llm_client.export_chat_history(new_file)
+                        logger.info(f"Successfully saved conversation history to: {new_file}")
+                elif self.current_history_file:
                     success, new_file = self.llm_client.save_chat_history(self.current_history_file)
                     if success and new_file:
                         self.llm_client.export_chat_history(new_file)
                         logger.info(f"Successfully saved conversation history to: {new_file}")
+                        if self.history_index:
+                            self.history_index.update_file(new_file)
                 else:
                     logger.info("First time saving conversation history")
                     success, new_file = self.llm_client.save_chat_history()
                     if success and new_file:
                         logger.info("Successfully exported conversation history")
                         self.llm_client.export_chat_history(new_file)
+                        self.current_history_file = new_file
+                        if self.history_index:
+                            self.history_index.update_file(new_file)
             except Exception as e:
                 logger.error(f"Error occurred while saving conversation history: {e}")
-                console.print("\n❌ Failed to save conversation history", style=TABLE_STYLE["error"])
+                console.print(
+                    "\n❌ Failed to save conversation history", style=TABLE_STYLE["error"]
+                )
 
     async def setup_llm(self):
         """Set up LLM model"""
@@ -301,18 +572,23 @@ class DestinyHost:
         choice = await self.session.prompt_async(
             "\nPlease select model number: ",
             default="1",
-            rprompt=[("class:rprompt", " Enter a number to select model")],
+            rprompt=[("class:rprompt", " Enter a number, or several (1,3) to fan out")],
         )
 
         try:
-            index = int(choice) - 1
-            if 0 <= index < len(models):
-                model_type, provider, model = models[index]
-                self.llm_client.set_model(model_type, provider, model)
-                console.print(f"\n✨ Selected: ", style=TABLE_STYLE["green"], end="")
-                console.print(f"[blue]{model_type.upper()}[/blue] - ", end="")
-                console.print(f"[green]{provider}[/green] - ", end="")
-                console.print(f"[yellow]{model}[/yellow]")
+            indexes = [int(part) - 1 for part in re.split(r"[,\s]+", choice.strip()) if part]
+            if indexes and all(0 <= index < len(models) for index in indexes):
+                selected = [models[index] for index in dict.fromkeys(indexes)]
+                # The first model is the session's model, e.g. for the context budget
+                self.llm_client.set_model(*selected[0])
+                for model_type, provider, model in selected:
+                    console.print(f"\n✨ Selected: ", style=TABLE_STYLE["green"], end="")
+                    console.print(f"[blue]{model_type.upper()}[/blue] - ", end="")
+                    console.print(f"[green]{provider}[/green] - ", end="")
+                    console.print(f"[yellow]{model}[/yellow]")
+                self.fanout = None
+                if len(selected) > 1:
+                    return await self.setup_fanout(selected)
                 return True
         except ValueError:
             pass
@@ -320,6 +596,30 @@ class DestinyHost:
         console.print("\n❌ Invalid selection", style=TABLE_STYLE["error"])
         return False
 
+    async def setup_fanout(self, models):
+        """Set up sending each turn to several models"""
+        policy = self.settings["fanout"]["policy"]
+        default = str(POLICIES.index(policy) + 1) if policy in POLICIES else "1"
+        console.print("\nPlease select fan-out policy:", style=TABLE_STYLE["cyan"])
+        console.print(
+            "1. [bold green]race[/bold green] - stream the first model to answer, cancel the rest"
+        )
+        console.print(
+            "2. [bold yellow]compare[/bold yellow] - show all answers side by side, keep one"
+        )
+        choice = await self.session.prompt_async(
+            f"Please select [1/2] ({default}): ", default=default
+        )
+        policy = {"1": "race", "2": "compare"}.get(choice.strip(), choice.strip())
+        if policy not in POLICIES:
+            console.print("\n❌ Invalid selection", style=TABLE_STYLE["error"])
+            return False
+        self.fanout = FanOut(self.llm_client, models, policy)
+        console.print(
+            f"\n✨ Each turn is sent to {len(models)} models ({policy})", style=TABLE_STYLE["green"]
+        )
+        return True
+
     async def setup_system_prompt(self):
         """Set up system prompt"""
         console.print(
@@ -333,7 +633,7 @@ class DestinyHost:
         if content:
             self.llm_client.system_prompt = content
             console.print("\n✨ Set the above content as system prompt", style=TABLE_STYLE["green"])
-            logger.info(f"Set the above content as system prompt: {content}")
+            logger.info("Set the above content as system prompt: %s", content)
         return True
 
     async def setup_mode(self):
@@ -342,6 +642,8 @@ class DestinyHost:
             console.print("\nPlease select running mode:", style=TABLE_STYLE["cyan"])
             console.print("1. [bold green]Chat mode[/bold green]")
             console.print("2. [bold yellow]Tool mode[/bold yellow]")
+            if self.profiler:
+                self.profiler.report()
             choice = await self.session.prompt_async("Please select [1/2] (1): ", default="1")
 
             if choice == "2":
@@ -361,16 +663,24 @@ class DestinyHost:
                 )
                 return False
 
+            await self.wait_for_mcp()
             while True:
                 # Use select_mcp_client to select client
                 client = await self.mcp_manager.select_mcp_client(self.session)
                 if not client:
                     return False
+                server = next(
+                    (n for n, c in self.mcp_manager.get_all_clients().items() if c is client), None
+                )
 
                 try:
                     # Set prompt_session
                     client.prompt_session = self.session
 
+                    # A supervised server may be reconnecting, it must not be connected lazily
+                    if self.mcp_supervisor:
+                        await self.mcp_supervisor.wait_up(server)
+
                     # Get client's tool list
                     tools = await client.list_tools()
                     if not tools:
@@ -379,8 +689,14 @@ class DestinyHost:
                         )
                         continue
 
-                    # Use client's tool selection and execution functionality
-                    result = await client.select_and_run_tool(tools)
+                    # Use client's tool selection and execution functionality, fails fast
+                    # if the server connection drops while the tool runs
+                    if self.mcp_supervisor:
+                        result = await self.mcp_supervisor.call(
+                            server, lambda: client.select_and_run_tool(tools)
+                        )
+                    else:
+                        result = await client.select_and_run_tool(tools)
 
                     # Ask whether to continue using tools
                     continue_choice = await self.session.prompt_async(
@@ -389,11 +705,16 @@ class DestinyHost:
                     if continue_choice.lower() != "y":
                         return False
 
+                except ConnectionLostError as e:
+                    console.print(f"\n❌ {e}", style=TABLE_STYLE["error"])
+                    continue
                 except Exception as e:
                     console.print(
                         f"\n❌ Error occurred while executing tool: {e}", style=TABLE_STYLE["error"]
                     )
                     logger.error(f"Error running tool: {e}")
+                    if self.mcp_supervisor:
+                        self.mcp_supervisor.report_failure(server)
                     continue
 
         except Exception as e:
@@ -423,42 +744,162 @@ class DestinyHost:
 
     async def load_chat_history(self) -> bool:
         """Load conversation history"""
-        histories = self.llm_client.display_available_histories()
-        if not histories:
-            return False
+        if self.history_journal:
+            # Conversations of crashed sessions only exist as journals
+            recovered = self.history_journal.recover()
+            if recovered:
+                console.print(
+                    f"\n✨ Recovered {recovered} unsaved conversation(s)",
+                    style=TABLE_STYLE["green"],
+                )
 
-        choice = await self.session.prompt_async("\nPlease select conversation history to load: ")
-        try:
-            index = int(choice) - 1
-            if 0 <= index < len(histories):
-                filepath = histories[index][0]
-                if self.llm_client.load_chat_history_from_file(filepath):
-                    self.current_history_file = filepath  # Record current history file path
-                    return True
-        except (ValueError, IndexError):
-            pass
+        if self.history_index:
+            filepath = await self._pick_history()
+        else:
+            filepath = None
+            histories = self.llm_client.display_available_histories()
+            if not histories:
+                return False
+            choice = await self.session.prompt_async(
+                "\nPlease select conversation history to load: "
+            )
+            try:
+                index = int(choice) - 1
+                if 0 <= index < len(histories):
+                    filepath = histories[index][0]
+            except (ValueError, IndexError):
+                pass
+        if not filepath:
+            return False
 
+        if self.history_journal:
+            loaded = self.history_journal.load(filepath)
+        else:
+            loaded = self.llm_client.load_chat_history_from_file(filepath)[0]
+        if loaded:
+            self.current_history_file = filepath  # Record current history file path
+            return True
         return False
 
+    async def _pick_history(self):
+        """Paginated, searchable picker over the history index
+
+        Returns:
+            Optional[Path]: Selected history file, None if cancelled
+        """
+        await asyncio.to_thread(self.history_index.sync, self.llm_client.history_dir)
+        total = self.history_index.count()
+        if not total:
+            console.print("\nNo conversation history found", style=TABLE_STYLE["warning"])
+            return None
+
+        page_size = self.settings["history"]["page_size"]
+        offset = 0
+        search_terms = None
+        while True:
+            if search_terms:
+                rows = self.history_index.search(search_terms, limit=page_size)
+                caption = f"{len(rows)} match(es) for '{search_terms}'"
+                first_number = 1
+            else:
+                rows = self.history_index.page(offset, page_size)
+                last_page = (total - 1) // page_size + 1
+                caption = f"Page {offset // page_size + 1}/{last_page}, {total} conversation(s)"
+                first_number = offset + 1
+            self._print_history_table(rows, first_number, caption)
+
+            choice = (
+                await self.session.prompt_async(
+                    "\nSelect number, n/p for next/previous page, /search <terms>, "
+                    "Enter to go back: ",
+                    rprompt=[("class:rprompt", " /search with no terms lists all")],
+                )
+            ).strip()
+            if not choice:
+                return None
+            if choice.startswith("/search"):
+                search_terms = choice[len("/search") :].strip() or None
+            elif choice.lower() == "n" and not search_terms:
+                offset = min(offset + page_size, (total - 1) // page_size * page_size)
+            elif choice.lower() == "p" and not search_terms:
+                offset = max(offset - page_size, 0)
+            elif choice.isdigit() and 0 <= int(choice) - first_number < len(rows):
+                return rows[int(choice) - first_number]["path"]
+            else:
+                console.print("Invalid selection", style=TABLE_STYLE["warning"])
+
+    def _print_history_table(self, rows, first_number: int, caption: str):
+        """Print a page of conversations from the history index"""
+        from rich.markup import escape
+        from rich.table import Table
+
+        table = Table(
+            title="📚 Conversation History",
+            caption=caption,
+            box=TABLE_STYLE["box"],
+            title_style=TABLE_STYLE["table.title"],
+            header_style=TABLE_STYLE["table.header"],
+            border_style=TABLE_STYLE["table.border"],
+        )
+        table.add_column("No.", justify="right", style=TABLE_STYLE["cyan"], no_wrap=True)
+        table.add_column("Time", style=TABLE_STYLE["blue"], no_wrap=True)
+        table.add_column("Model", style=TABLE_STYLE["green"])
+        table.add_column("Turns", justify="right")
+        table.add_column("First message")
+        for number, row in enumerate(rows, first_number):
+            timestamp = row["timestamp"] or ""
+            if re.fullmatch(r"\d{8}_\d{6}", timestamp):
+                timestamp = (
+                    f"{timestamp[:4]}-{timestamp[4:6]}-{timestamp[6:8]} "
+                    f"{timestamp[9:11]}:{timestamp[11:13]}"
+                )
+            title = escape(row.get("snippet") or row["title"] or "")
+            table.add_row(str(number), timestamp, row["model"] or "-", str(row["turns"]), title)
+        console.print(table)
+
     async def chat_loop(self):
         """Main conversation loop"""
+        if self.history_journal:
+            self.history_journal.start(self.current_history_file)
+            self.current_history_file = self.history_journal.history_file
 
         try:
             while True:
                 try:
-                    console.print(
-                        "\n Tip: If you need to call MCP server resources, you can type ->mcp (must have spaces before and after) anywhere; Press Ctrl+C to save conversation and exit.",
-                        style=TABLE_STYLE["info"],
-                    )
-                    processed_input, success = await self.process_mcp_input()
-                    if not success:
-                        break
-
-                    # Call LLM
-                    logger.info(f"Input Message：{processed_input}")
-                    reasoning, response = await self.llm_client.chat_cli(message=processed_input)
-                    logger.info(f"Reasoning Result：{reasoning}")
-                    logger.info(f"Response Result：{response}")
+                    with tracer.span("turn", category="turn") as turn:
+                        console.print(
+                            "\n Tip: If you need to call MCP server resources, you can type ->mcp (must have spaces before and after) anywhere; Press Ctrl+C to save conversation and exit.",
+                            style=TABLE_STYLE["info"],
+                        )
+                        processed_input, success = await self.process_mcp_input()
+                        if not success:
+                            break
+
+                        # Slash commands are handled locally, unknown ones are sent as messages
+                        if processed_input.startswith("/"):
+                            turn.set(command=processed_input.split()[0])
+                            handled = await self._handle_command(processed_input.strip())
+                            if handled is True:
+                                break
+                            if handled is False:
+                                continue
+
+                        # Call LLM
+                        logger.info("Input Message: %s", processed_input)
+                        renderer = StreamRenderer(max_fps=self.settings["rendering"]["max_fps"])
+                        if self.context_manager:
+                            async with self.context_manager.window(
+                                self.llm_client, processed_input
+                            ):
+                                reasoning, response = await self._send_turn(
+                                    renderer, processed_input
+                                )
+                        else:
+                            reasoning, response = await self._send_turn(renderer, processed_input)
+                        if self.history_journal and response:
+                            self.history_journal.append_turn(self.llm_client.messages[-2:])
+                        logger.info("Reasoning Result: %s", reasoning)
+                        logger.info("Response Result: %s", response)
 
                 except KeyboardInterrupt:
                     raise
@@ -472,8 +913,11 @@ class DestinyHost:
         finally:
             try:
                 # Ask whether to save conversation
-                if await self.ask_save_with_timeout():
+                keep = await self.ask_save_with_timeout()
+                if keep:
                     await self.save_chat_history()
+                if self.history_journal:
+                    await self.history_journal.close(keep=keep)
 
                 # Clean up resources
                 await self.cleanup_resources()
@@ -488,6 +932,20 @@ class DestinyHost:
     async def cleanup_resources(self):
         """Clean up all resources"""
         try:
+            # Close warm-up connections from the tasks that opened them
+            if self.mcp_warmup:
+                try:
+                    await self.mcp_warmup.shutdown()
+                except Exception as e:
+                    logger.error(f"MCP warm-up shutdown failed: {e}")
+
+            # Connections opened for placeholders are closed in reverse order first
+            if self.placeholder_expander:
+                try:
+                    await self.placeholder_expander.close()
+                except Exception as e:
+                    logger.error(f"Closing MCP connections failed: {e}")
+
             # Clean up MCP resources
             if self.mcp_manager:
                 try:
@@ -495,17 +953,33 @@ class DestinyHost:
                 except Exception as e:
                     logger.error(f"MCP cleanup failed: {e}")
 
+            if self.capability_cache:
+                self.capability_cache.flush()
+            if self.result_cache:
+                self.result_cache.close()
+            if self.placeholder_expander and self.placeholder_expander.resource_index:
+                self.placeholder_expander.resource_index.close()
+            if self.context_manager:
+                self.context_manager.reset()
+            if self.history_index:
+                self.history_index.close()
+
         except Exception as e:
             logger.error(f"Error occurred during resource cleanup: {e}")
 
     async def run(self):
         """Run main program"""
-        self.clear_screen()
+        if not self.banner_shown:
+            self.clear_screen()
         self.print_header()
+        if self.profiler:
+            self.profiler.mark("print header")
 
         try:
             # Initialize all clients
             await self.init_clients()
+            if self.profiler:
+                self.profiler.mark("initialize clients")
 
             # Set up running mode
             mode = await self.setup_mode()
@@ -514,6 +988,7 @@ class DestinyHost:
 
             # If in chat mode, start conversation loop
             if mode == "chat":
+                await self.wait_for_mcp()
                 await self.chat_loop()
 
         except Exception as e:
@@ -529,14 +1004,90 @@ class DestinyHost:
                 )
                 raise
 
+    async def _send_turn(self, renderer, message):
+        """Send a chat turn to the session's model, or to all models of the fan-out
+
+        Returns:
+            Tuple[Optional[str], Optional[str]]: (reasoning, response) added to the history
+        """
+        if self.agent:
+            try:
+                answer, steps = await self.agent.run(message)
+            except AgentError as e:
+                console.print(f"\n❌ {e}", style=TABLE_STYLE["error"])
+                return None, None
+            except TimeoutError:
+                console.print(
+                    f"\n❌ Agent turn exceeded its deadline of {self.agent.deadline:g}s",
+                    style=TABLE_STYLE["error"],
+                )
+                return None, None
+            if not answer:
+                console.print("\n❌ The model returned no answer", style=TABLE_STYLE["error"])
+                return None, None
+            self.agent.print_answer(answer, steps)
+            return None, answer
+
+        if not self.fanout:
+            reasoning, response = await renderer.run(self.llm_client, message)
+            self.last_stream_stats = renderer.stats_text()
+            return reasoning, response
+
+        if self.fanout.policy == "race":
+            winner, reasoning, response = await self.fanout.race(renderer, message)
+            if not winner:
+                console.print("\n❌ No model answered", style=TABLE_STYLE["error"])
+                return None, None
+            others = len(self.fanout.models) - 1
+            console.print(
+                f"\n🏁 {winner.label} answered first ({others} other(s) cancelled)",
+                style=TABLE_STYLE["info"],
+            )
+            self.last_stream_stats = f"{winner.label} · {renderer.stats_text()}"
+            return reasoning, response
+
+        replies = await self.fanout.compare(message)
+        answered = [i for i, reply in enumerate(replies) if reply.content]
+        if not answered:
+            console.print("\n❌ No model answered", style=TABLE_STYLE["error"])
+            return None, None
+        fastest = min(answered, key=lambda i: replies[i].elapsed_ms)
+        choice = await self.session.prompt_async(
+            f"\nKeep which answer in the history? [1-{len(replies)}] ({fastest + 1}): ",
+            default=str(fastest + 1),
+        )
+        try:
+            index = int(choice) - 1
+        except ValueError:
+            index = -1
+        if index not in answered:
+            console.print("\n⚠️  No answer kept for this turn", style=TABLE_STYLE["warning"])
+            return None, None
+        chosen = replies[index]
+        self.fanout.keep(chosen)
+        speed = chosen.tokens_per_second
+        speed_text = f" · {speed:.1f} tok/s" if speed else ""
+        self.last_stream_stats = f"{chosen.label} · TTFT {chosen.ttft_ms:.0f} ms{speed_text}"
+        return chosen.reasoning, chosen.content
+
+    def _chat_rprompt(self):
+        """Right prompt of the chat input, with the last reply's TTFT and speed"""
+        if self.last_stream_stats:
+            return f" {self.last_stream_stats} | Ctrl+C to exit"
+        return " Ctrl+C to exit"
+
     async def _handle_command(self, command):
         """Handle special commands"""
         if command == "/exit" or command == "/quit":
-            await self.save_chat_history()
+            # Saving is offered when the chat loop ends
             return True
         elif command == "/clear":
             if self.llm_client:
-                self.llm_client.clear_chat_history()
+                self.llm_client.clear_history()
+            if self.history_journal:
+                self.history_journal.record_clear()
+            if self.context_manager:
+                self.context_manager.reset()
             console.print("[green]Chat history cleared[/green]")
             return False
         elif command == "/save":
@@ -545,6 +1096,109 @@ class DestinyHost:
         elif command == "/help":
             self._print_help()
             return False
+        elif command.startswith("/history"):
+            if not self.history_index:
+                console.print("[yellow]History index is disabled[/yellow]")
+                return False
+            parts = command.split(maxsplit=2)
+            await asyncio.to_thread(self.history_index.sync, self.llm_client.history_dir)
+            page_size = self.settings["history"]["page_size"]
+            if len(parts) > 1 and parts[1] == "search":
+                terms = parts[2] if len(parts) > 2 else ""
+                rows = self.history_index.search(terms, limit=page_size)
+                self._print_history_table(rows, 1, f"{len(rows)} match(es) for '{terms}'")
+            else:
+                page = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 1
+                offset = (max(page, 1) - 1) * page_size
+                rows = self.history_index.page(offset, page_size)
+                self._print_history_table(
+                    rows, offset + 1, f"Page {page}, {self.history_index.count()} conversation(s)"
+                )
+            return False
+        elif command == "/mcp":
+            if self.mcp_supervisor:
+                self.mcp_supervisor.print_report()
+            elif self.mcp_warmup:
+                self.mcp_warmup.print_report()
+            else:
+                console.print(
+                    "[yellow]MCP servers are connected on first use (no --warmup)[/yellow]"
+                )
+            return False
+        elif command.startswith("/agent"):
+            parts = command.split()
+            if len(parts) > 1 and parts[1] == "off":
+                self.agent = None
+            elif len(parts) > 1 and parts[1] == "on" and not self.agent:
+                await self.wait_for_mcp()
+                agent_settings = self.settings["agent"]
+                self.agent = AgentLoop(
+                    self.llm_client,
+                    self.mcp_manager,
+                    supervisor=self.mcp_supervisor,
+                    max_steps=agent_settings["max_steps"],
+                    tool_timeout=agent_settings["tool_timeout"],
+                    deadline=agent_settings["deadline"],
+                    max_result_chars=agent_settings["max_result_chars"],
+                    max_concurrency_per_server=self.settings["placeholders"][
+                        "max_concurrency_per_server"
+                    ],
+                    payload_store=self.payload_store,
+                    expander=self.placeholder_expander,
+                )
+            if self.agent:
+                console.print(
+                    "[green]Agent mode on: the model may call MCP tools "
+                    f"(up to {self.agent.max_steps} steps)[/green]"
+                )
+            else:
+                console.print("[green]Agent mode off[/green]")
+            return False
+        elif command.startswith("/payload"):
+            parts = command.split()
+            if not self.payload_store:
+                console.print("[yellow]Payload spilling is disabled[/yellow]")
+            elif len(parts) < 2:
+                for payload_id, (path, source, size) in self.payload_store.spilled.items():
+                    console.print(f"{payload_id}  {size / 1024:.0f} KB  {source}  {path}")
+                if not self.payload_store.spilled:
+                    console.print("[yellow]No payloads spilled in this session[/yellow]")
+            else:
+                page = int(parts[2]) - 1 if len(parts) > 2 and parts[2].isdigit() else 0
+                try:
+                    console.print(self.payload_store.read(parts[1], max(page, 0)), markup=False)
+                except LookupError as e:
+                    console.print(f"\n❌ {e}", style=TABLE_STYLE["error"])
+            return False
+        elif command.startswith("/fanout"):
+            parts = command.split()
+            if not self.fanout:
+                console.print("[yellow]Select several models to fan out each turn[/yellow]")
+            elif len(parts) > 1 and parts[1] in POLICIES:
+                self.fanout.policy = parts[1]
+                console.print(f"[green]Fan-out policy: {parts[1]}[/green]")
+            elif len(parts) > 1 and parts[1] == "off":
+                self.fanout = None
+                console.print(
+                    f"[green]Fan-out off, using {self.llm_client.current_provider}/"
+                    f"{self.llm_client.current_model}[/green]"
+                )
+            else:
+                self.fanout.print_stats()
+            return False
+        elif command == "/llm":
+            if llm_scheduler.enabled:
+                llm_scheduler.print_metrics()
+            else:
+                console.print("[yellow]The LLM scheduler is disabled[/yellow]")
+            return False
+        elif command.startswith("/cache"):
+            parts = command.split()
+            if len(parts) > 1 and parts[1] == "clear":
+                self._clear_caches()
+            else:
+                self._print_cache_stats()
+            return False
         elif command.startswith("/lang"):
             # Handle language switching
             parts = command.split()
@@ -565,6 +1219,72 @@ class DestinyHost:
             return False
         return None
 
+    def _print_cache_stats(self):
+        """Print result cache, capability cache and response cache statistics"""
+        from rich.table import Table
+
+        table = Table(
+            title="Caches",
+            box=TABLE_STYLE["box"],
+            title_style=TABLE_STYLE["table.title"],
+            header_style=TABLE_STYLE["table.header"],
+            border_style=TABLE_STYLE["table.border"],
+        )
+        table.add_column("Cache", style="cyan")
+        table.add_column("Metric")
+        table.add_column("Value", justify="right")
+
+        if self.result_cache:
+            stats = self.result_cache.stats()
+            lookups = stats["hits"] + stats["misses"]
+            hit_rate = f"{stats['hits'] / lookups:.0%}" if lookups else "-"
+            table.add_row("results", "entries", str(stats["entries"]))
+            table.add_row(
+                "",
+                "size",
+                f"{stats['size_bytes'] / 1024:.1f} KB / {stats['max_bytes'] / 1024 / 1024:.0f} MB",
+            )
+            table.add_row("", "hits / misses", f"{stats['hits']} / {stats['misses']} ({hit_rate})")
+            table.add_row("", "time saved", f"{stats['saved_ms']:.0f} ms")
+            for server, count in stats["by_server"].items():
+                table.add_row("", f"entries of {server}", str(count))
+        else:
+            table.add_row("results", "disabled", "-")
+
+        if self.capability_cache:
+            for i, (key, value) in enumerate(self.capability_cache.stats().items()):
+                table.add_row("capabilities" if i == 0 else "", str(key), str(value))
+        else:
+            table.add_row("capabilities", "disabled", "-")
+
+        if response_cache.enabled:
+            stats = response_cache.stats()
+            lookups = stats["hits"] + stats["misses"]
+            hit_rate = f"{stats['hits'] / lookups:.0%}" if lookups else "-"
+            table.add_row("llm responses", "entries", str(stats["entries"]))
+            table.add_row(
+                "",
+                "size",
+                f"{stats['size_bytes'] / 1024:.1f} KB / {stats['max_bytes'] / 1024 / 1024:.0f} MB",
+            )
+            table.add_row("", "hits / misses", f"{stats['hits']} / {stats['misses']} ({hit_rate})")
+            table.add_row("", "time saved", f"{stats['saved_ms']:.0f} ms")
+        else:
+            table.add_row("llm responses", "disabled", "-")
+
+        console.print(table)
+
+    def _clear_caches(self):
+        """Clear the result and response caches and invalidate all cached capability lists"""
+        removed = self.result_cache.clear() if self.result_cache else 0
+        if self.capability_cache:
+            self.capability_cache.invalidate()
+        responses = response_cache.clear()
+        console.print(
+            f"[green]Cleared {removed} cached result(s), {responses} LLM response(s) "
+            "and capability lists[/green]"
+        )
+
     def _print_help(self):
         """Print help information"""
         help_text = """
@@ -574,19 +1294,19 @@ class DestinyHost:
         [green]/clear[/green] - Clear chat history
         [green]/save[/green] - Save chat history
         [green]/help[/green] - Show this help message
+        [green]/history [page][/green] - List saved conversations
+        [green]/history search <terms>[/green] - Full-text search of saved conversations
+        [green]/mcp[/green] - Show MCP server health (status, reconnects, ping RTT)
+        [green]/agent [on|off][/green] - Let the model call MCP tools itself, in parallel
+        [green]/payload [id] [page][/green] - List spilled MCP payloads or show a page of one
+        [green]/fanout [race|compare|off][/green] - Show per-model latency stats or change the fan-out policy
+        [green]/cache [stats|clear][/green] - Show or clear MCP result, capability and LLM response caches
+        [green]/llm[/green] - Show LLM queue depth, concurrency limits, throttling and wait times
         [green]/lang [en|cn][/green] - Set language (English or Chinese)
         """
         console.print(help_text)
 
 
-def get_version():
-    """Get package version"""
-    try:
-        return version("think-mcp-host")
-    except Exception:
-        return "0.2.1"  # Default version
-
-
 def get_resource_path(relative_path):
     """Get resource file path, supports PyInstaller packaging"""
     try:
@@ -612,12 +1332,8 @@ def get_resource_path(relative_path):
         raise
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Think MCP Host")
-    parser.add_argument("--llm_config", type=str, help="Custom LLM configuration file path")
-    parser.add_argument("--mcp_config", type=str, help="Custom MCP server configuration file path")
-    parser.add_argument("-v", "--version", action="version", version=f"%(prog)s {get_version()}")
-    args = parser.parse_args()
+def run_host(args, profiler=None, banner_shown=False):
+    """Run the interactive host with parsed command line arguments"""
     key_insider = False
     try:
         # Decide configuration file path based on key_insider
@@ -627,7 +1343,42 @@ def main():
             else get_resource_path(os.path.join("config", "llm_config.json"))
         )
         logger.info(f"LLM configuration file path passed in or set in code: {llm_config_path}")
-        host = DestinyHost(llm_config_path=llm_config_path, mcp_config_path=args.mcp_config)
+        host = DestinyHost(
+            llm_config_path=llm_config_path,
+            mcp_config_path=args.mcp_config,
+            host_config_path=args.host_config,
+            warmup=args.warmup,
+            warmup_timeout=args.warmup_timeout,
+            profiler=profiler,
+            banner_shown=banner_shown,
+        )
+        if getattr(args, "trace", False):
+            trace_settings = host.settings["tracing"]
+            tracer.start(
+                trace_settings["dir"], max_mb=trace_settings["max_mb"], keep=trace_settings["keep"]
+            )
+        cache_settings = host.settings["response_cache"]
+        if getattr(args, "response_cache", False) or cache_settings["enabled"]:
+            response_cache.start(
+                max_mb=cache_settings["max_mb"],
+                deterministic_only=cache_settings["deterministic_only"],
+            )
+        if getattr(args, "broker", False):
+            host.settings["broker"]["enabled"] = True
+        if args.command == "broker":
+            sys.exit(0 if run_broker_command(host.settings["broker"], args) else 1)
+        if args.command == "batch":
+            from think_mcp_host.batch import run_batch
+
+            sys.exit(0 if asyncio.run(run_batch(host, args)) else 1)
+        if args.command == "run-pipeline":
+            from think_mcp_host.pipeline import run_pipeline
+
+            sys.exit(0 if asyncio.run(run_pipeline(host, args)) else 1)
+        if args.command == "serve":
+            from think_mcp_host.server import run_serve
+
+            sys.exit(0 if asyncio.run(run_serve(host, args)) else 1)
         asyncio.run(host.run())
     except KeyboardInterrupt:
         console.print("\nThank you for using, goodbye!", style=TABLE_STYLE["magenta"])
@@ -635,9 +1386,20 @@ def main():
     except Exception as e:
         error_msg = f"An error occurred: {str(e)}"
         logger.error(error_msg)
-        console.print("\nLog file location:", get_log_file_path())
+        console.print("\nLog file location:", log_file_path())
         input("Press Enter to exit...")  # Add this line to let the user see the error message
         sys.exit(1)
+    finally:
+        trace_path = tracer.stop()
+        if trace_path:
+            console.print(
+                f"\nTrace written to {trace_path} (open it in https://ui.perfetto.dev)",
+                style=TABLE_STYLE["info"],
+            )
+
+
+def main():
+    run_host(build_parser().parse_args())
 
 
 if __name__ == "__main__":
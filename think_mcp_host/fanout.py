@@ -0,0 +1,359 @@
+import asyncio
+import copy
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from rich.live import Live
+from rich.markdown import Markdown
+from rich.panel import Panel
+from rich.table import Table
+from think_llm_client.utils.logger import logging
+from think_llm_client.utils.terminal_config import TABLE_STYLE, console
+
+from think_mcp_host.utils.llm_stream import stream_chat
+from think_mcp_host.utils.tokens import estimate_tokens
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+POLICIES = ("race", "compare")
+
+# A model is (model_type, provider, model), as returned by LLMClient.get_available_models
+Model = Tuple[str, str, str]
+
+
+class NoAnswerError(Exception):
+    """Every model of a race failed before answering"""
+
+
+def model_label(model: Model) -> str:
+    """Short "provider/model" name of a model"""
+    return f"{model[1]}/{model[2]}"
+
+
+@dataclass
+class ModelReply:
+    """Reply of one model to a fanned-out turn"""
+
+    label: str
+    client: object
+    reasoning: Optional[str] = None
+    content: Optional[str] = None
+    ttft_ms: Optional[float] = None
+    elapsed_ms: Optional[float] = None
+    tokens: int = 0
+    status: str = "waiting"  # waiting / streaming / done / cancelled / failed
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        if self.ttft_ms is None or self.elapsed_ms is None:
+            return None
+        generation_s = (self.elapsed_ms - self.ttft_ms) / 1000
+        return self.tokens / generation_s if generation_s > 0 else None
+
+
+@dataclass
+class ModelStats:
+    """Running latency statistics of a model over the fanned-out turns"""
+
+    turns: int = 0
+    wins: int = 0  # Races won, answers kept in compare mode
+    failures: int = 0
+    ttfts: Deque[float] = field(default_factory=lambda: deque(maxlen=100))
+    elapsed: Deque[float] = field(default_factory=lambda: deque(maxlen=100))
+
+    @staticmethod
+    def percentile(values, percentile: float) -> Optional[float]:
+        if not values:
+            return None
+        ordered = sorted(values)
+        return ordered[min(int(len(ordered) * percentile / 100), len(ordered) - 1)]
+
+
+class FanOut:
+    """Send each chat turn to several models concurrently
+
+    Policies:
+        race: stream the first model that answers and cancel the others
+        compare: wait for all models, show the answers side by side with their latency and
+            token stats, and keep the one the user picks
+
+    Every model talks through its own copy of the session's LLM client, reset to the
+    session's history before each turn. Only the chosen reply is added to the history.
+    """
+
+    def __init__(self, llm_client, models: List[Model], policy: str = "race"):
+        """Initialize fan-out
+
+        Args:
+            llm_client: Session LLM client, owns the history and the system prompt
+            models: Models to send each turn to
+            policy: "race" or "compare"
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown fan-out policy: {policy}")
+        self.llm_client = llm_client
+        self.models = list(models)
+        self.policy = policy
+        self.stats: Dict[str, ModelStats] = {model_label(m): ModelStats() for m in self.models}
+        self._clients: Dict[Model, object] = {}
+        self._history_length = 0
+
+    def _client(self, model: Model):
+        """LLM client of a model, primed with the session's current history"""
+        client = self._clients.get(model)
+        if client is None:
+            # Shares the loaded configuration, the provider client is created per model
+            client = copy.copy(self.llm_client)
+            client.set_model(*model)
+            self._clients[model] = client
+        client.messages = list(self.llm_client.messages)
+        client.system_prompt = self.llm_client.system_prompt
+        return client
+
+    def _start_turn(self) -> List[ModelReply]:
+        self._history_length = len(self.llm_client.messages)
+        return [ModelReply(model_label(model), self._client(model)) for model in self.models]
+
+    def keep(self, reply: ModelReply) -> None:
+        """Add the turn's messages of the chosen reply to the session history"""
+        self.llm_client.messages.extend(reply.client.messages[self._history_length :])
+        self.stats[reply.label].wins += 1
+
+    def _record(self, reply: ModelReply) -> None:
+        stats = self.stats[reply.label]
+        stats.turns += 1
+        if reply.status == "failed":
+            stats.failures += 1
+        if reply.ttft_ms is not None:
+            stats.ttfts.append(reply.ttft_ms)
+        if reply.status == "done" and reply.elapsed_ms is not None:
+            stats.elapsed.append(reply.elapsed_ms)
+
+    async def race(
+        self, renderer, message: str, images: Optional[List[str]] = None
+    ) -> Tuple[Optional[ModelReply], Optional[str], Optional[str]]:
+        """Stream the reply of the first model to answer
+
+        Args:
+            renderer: StreamRenderer the winning reply is streamed to
+            message: User message
+            images: Optional image paths for VLM models
+
+        Returns:
+            Tuple[Optional[ModelReply], Optional[str], Optional[str]]: (winner, reasoning,
+            content), the winner is None if no model answered
+        """
+        replies = self._start_turn()
+        winner: List[ModelReply] = []
+        chunks = self._race_chunks(replies, message, images, winner)
+        try:
+            reasoning, content = await renderer.run(self.llm_client, message, images, chunks)
+        except NoAnswerError as e:
+            logger.error(str(e))
+            reasoning, content = None, None
+        finally:
+            await chunks.aclose()
+        for reply in replies:
+            self._record(reply)
+        if not winner or not content:
+            return None, reasoning, content
+        self.keep(winner[0])
+        cancelled = sum(reply.status == "cancelled" for reply in replies)
+        logger.info(
+            f"Race won by {winner[0].label} (TTFT {winner[0].ttft_ms:.0f} ms), "
+            f"{cancelled} model(s) cancelled"
+        )
+        return winner[0], reasoning, content
+
+    async def _race_chunks(
+        self,
+        replies: List[ModelReply],
+        message: str,
+        images: Optional[List[str]],
+        winner: List[ModelReply],
+    ) -> AsyncIterator[Tuple[str, str]]:
+        """Chunks of the first model to answer, the other streams are closed"""
+        start = time.perf_counter()
+        streams = {id(reply): stream_chat(reply.client, message, images) for reply in replies}
+        pending = {asyncio.create_task(streams[id(reply)].__anext__()): reply for reply in replies}
+        first = None
+        try:
+            while pending and first is None:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    reply = pending.pop(task)
+                    try:
+                        chunk = task.result()
+                    except StopAsyncIteration:
+                        # The client logs provider errors and ends the stream empty
+                        reply.status = "failed"
+                        continue
+                    except Exception as e:
+                        logger.error(f"Fan-out model {reply.label} failed: {e}")
+                        reply.status = "failed"
+                        continue
+                    if first is None:
+                        first = chunk
+                        reply.status = "streaming"
+                        reply.ttft_ms = (time.perf_counter() - start) * 1000
+                        winner.append(reply)
+                    else:
+                        # Answered in the same tick, the earlier one wins
+                        pending[task] = reply
+        finally:
+            # Cancel the slower models, their workers stop at their next chunk
+            for task, reply in pending.items():
+                task.cancel()
+                reply.status = "cancelled"
+            await asyncio.gather(*pending, return_exceptions=True)
+            for reply in replies:
+                if not winner or reply is not winner[0]:
+                    await streams[id(reply)].aclose()
+
+        if first is None:
+            raise NoAnswerError("No model answered: " + ", ".join(r.label for r in replies))
+
+        reply = winner[0]
+        chunks = [first]
+        try:
+            yield first
+            async for chunk in streams[id(reply)]:
+                chunks.append(chunk)
+                yield chunk
+            reply.status = "done"
+        finally:
+            reply.elapsed_ms = (time.perf_counter() - start) * 1000
+            reply.tokens = sum(estimate_tokens(text) for kind, text in chunks if kind == "content")
+            if reply.status != "done":
+                reply.status = "cancelled"
+            await streams[id(reply)].aclose()
+
+    async def compare(
+        self, message: str, images: Optional[List[str]] = None, max_fps: float = 4
+    ) -> List[ModelReply]:
+        """Collect the replies of all models and show them side by side
+
+        Args:
+            message: User message
+            images: Optional image paths for VLM models
+            max_fps: Redraws per second of the progress table
+
+        Returns:
+            List[ModelReply]: Replies in the order of the models, none is kept yet
+        """
+        replies = self._start_turn()
+        start = time.perf_counter()
+
+        async def collect(reply: ModelReply) -> None:
+            sections: Dict[str, List[str]] = {"reasoning": [], "content": []}
+            try:
+                async for chunk_type, chunk in stream_chat(reply.client, message, images):
+                    if reply.ttft_ms is None:
+                        reply.ttft_ms = (time.perf_counter() - start) * 1000
+                        reply.status = "streaming"
+                    sections.get(chunk_type, sections["content"]).append(chunk)
+                    if chunk_type != "reasoning":
+                        reply.tokens += estimate_tokens(chunk)
+                reply.status = "done" if sections["content"] else "failed"
+            except Exception as e:
+                logger.error(f"Fan-out model {reply.label} failed: {e}")
+                reply.status = "failed"
+            finally:
+                reply.elapsed_ms = (time.perf_counter() - start) * 1000
+                reply.reasoning = "".join(sections["reasoning"]) or None
+                reply.content = "".join(sections["content"]) or None
+
+        tasks = [asyncio.create_task(collect(reply)) for reply in replies]
+        with Live(
+            self._stats_table(replies, start), console=console, transient=True, auto_refresh=False
+        ) as live:
+            while not all(task.done() for task in tasks):
+                await asyncio.wait(tasks, timeout=1 / max_fps)
+                live.update(self._stats_table(replies, start), refresh=True)
+
+        for reply in replies:
+            self._record(reply)
+        self.print_replies(replies)
+        return replies
+
+    def _stats_table(self, replies: List[ModelReply], start: Optional[float] = None) -> Table:
+        """Per-model latency and token stats of a turn"""
+        table = Table(
+            box=TABLE_STYLE["box"],
+            header_style=TABLE_STYLE["table.header"],
+            border_style=TABLE_STYLE["table.border"],
+        )
+        table.add_column("#", justify="right", style="cyan")
+        table.add_column("Model", style="yellow")
+        table.add_column("Status")
+        table.add_column("TTFT", justify="right")
+        table.add_column("Total", justify="right")
+        table.add_column("Tokens", justify="right")
+        table.add_column("tok/s", justify="right")
+
+        running_ms = (time.perf_counter() - start) * 1000 if start else None
+        for i, reply in enumerate(replies, 1):
+            elapsed = reply.elapsed_ms if reply.elapsed_ms is not None else running_ms
+            speed = reply.tokens_per_second
+            table.add_row(
+                str(i),
+                reply.label,
+                reply.status,
+                f"{reply.ttft_ms:.0f} ms" if reply.ttft_ms is not None else "-",
+                f"{elapsed:.0f} ms" if elapsed is not None else "-",
+                str(reply.tokens),
+                f"{speed:.1f}" if speed else "-",
+            )
+        return table
+
+    def print_replies(self, replies: List[ModelReply]) -> None:
+        """Print the answers side by side, followed by their stats"""
+        grid = Table.grid(expand=True, padding=(0, 1))
+        for _ in replies:
+            grid.add_column(ratio=1)
+        grid.add_row(
+            *(
+                Panel(
+                    Markdown(reply.content) if reply.content else "[dim]No answer[/dim]",
+                    title=f"{i}. {reply.label}",
+                    border_style=TABLE_STYLE["table.border"],
+                )
+                for i, reply in enumerate(replies, 1)
+            )
+        )
+        console.print(grid)
+        console.print(self._stats_table(replies))
+
+    def print_stats(self) -> None:
+        """Print the latency statistics of every model since the session started"""
+        table = Table(
+            title=f"Fan-out ({self.policy})",
+            box=TABLE_STYLE["box"],
+            title_style=TABLE_STYLE["table.title"],
+            header_style=TABLE_STYLE["table.header"],
+            border_style=TABLE_STYLE["table.border"],
+        )
+        table.add_column("Model", style="yellow")
+        table.add_column("Turns", justify="right")
+        table.add_column("Wins" if self.policy == "race" else "Kept", justify="right")
+        table.add_column("Failures", justify="right")
+        table.add_column("TTFT p50 / p90", justify="right")
+        table.add_column("Total p50 / p90", justify="right")
+
+        def pair(values) -> str:
+            p50, p90 = ModelStats.percentile(values, 50), ModelStats.percentile(values, 90)
+            return f"{p50:.0f} / {p90:.0f} ms" if p50 is not None else "-"
+
+        for label, stats in self.stats.items():
+            table.add_row(
+                label,
+                str(stats.turns),
+                str(stats.wins),
+                str(stats.failures),
+                pair(stats.ttfts),
+                pair(stats.elapsed),
+            )
+        console.print(table)
@@ -0,0 +1,284 @@
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from think_llm_client.utils.logger import logging
+
+from think_mcp_host.utils.settings import HOST_DIR
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    title TEXT,
+    model_type TEXT,
+    provider TEXT,
+    model TEXT,
+    timestamp TEXT,
+    mtime REAL NOT NULL,
+    turns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_timestamp ON sessions (timestamp);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts USING fts5(
+    title, content, tokenize = 'unicode61', prefix = '2 3'
+);
+"""
+
+TITLE_LENGTH = 80
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    """Text of a message, VLM messages keep only their text parts"""
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return " ".join(
+            part.get("text", "")
+            for part in content
+            if isinstance(part, dict) and part.get("type") == "text"
+        )
+    return str(content)
+
+
+def _fts_query(terms: str) -> str:
+    """Quote each term so user input can't break the FTS5 query syntax, terms are ANDed"""
+    words = [word.replace('"', '""') for word in terms.split()]
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _snippet(content: str, terms: str, width: int = 60) -> str:
+    """Text around the first occurrence of any of the terms"""
+    lowered = content.lower()
+    positions = [lowered.find(word.lower()) for word in terms.split()]
+    positions = [position for position in positions if position >= 0]
+    if not positions:
+        return content[:width].replace("\n", " ")
+    start = max(min(positions) - width // 3, 0)
+    text = content[start : start + width].replace("\n", " ")
+    return ("…" if start else "") + text + ("…" if start + width < len(content) else "")
+
+
+class HistoryIndex:
+    """Persistent index of saved conversations
+
+    Keeps title, model, timestamp and turn count of every history file plus an FTS5
+    full-text index of its messages in SQLite, so the history picker pages and searches
+    without parsing every history file. Files are only re-parsed when their mtime changes.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None):
+        """Initialize history index
+
+        Args:
+            db_path: SQLite file, default is ~/.think-mcp-host/history_index.sqlite3
+        """
+        self.db_path = db_path or HOST_DIR / "history_index.sqlite3"
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        try:
+            self._conn.executescript(_FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5, search falls back to LIKE on titles
+            logger.warning(f"FTS5 unavailable, history search is limited to titles: {e}")
+            self.fts = False
+        self._conn.commit()
+
+    def update(
+        self,
+        history_file: Path,
+        header: Dict[str, Any],
+        messages: List[Dict[str, Any]],
+        mtime: Optional[float] = None,
+        commit: bool = True,
+    ) -> None:
+        """Index or re-index a conversation
+
+        Args:
+            history_file: History file path
+            header: Metadata with timestamp, model_type, provider and model
+            messages: Messages of the conversation
+            mtime: File modification time, read from the file if not specified
+            commit: Whether to commit now, sync() commits in batches
+        """
+        path = str(history_file)
+        if mtime is None:
+            mtime = os.stat(path).st_mtime
+        title = (
+            next((_message_text(m) for m in messages if m.get("role") == "user"), "")
+            .strip()
+            .replace("\n", " ")[:TITLE_LENGTH]
+        )
+        turns = sum(1 for m in messages if m.get("role") == "user")
+        with self._lock:
+            # Full-text rows share the rowid of their session
+            session_id = self._conn.execute(
+                "INSERT INTO sessions "
+                "(path, title, model_type, provider, model, timestamp, mtime, turns) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (path) DO UPDATE SET title = excluded.title, "
+                "model_type = excluded.model_type, provider = excluded.provider, "
+                "model = excluded.model, timestamp = excluded.timestamp, "
+                "mtime = excluded.mtime, turns = excluded.turns "
+                "RETURNING id",
+                (
+                    path,
+                    title,
+                    header.get("model_type"),
+                    header.get("provider"),
+                    header.get("model"),
+                    header.get("timestamp") or "",
+                    mtime,
+                    turns,
+                ),
+            ).fetchone()[0]
+            if self.fts:
+                self._conn.execute("DELETE FROM sessions_fts WHERE rowid = ?", (session_id,))
+                self._conn.execute(
+                    "INSERT INTO sessions_fts (rowid, title, content) VALUES (?, ?, ?)",
+                    (session_id, title, "\n".join(_message_text(m) for m in messages)),
+                )
+            if commit:
+                self._conn.commit()
+
+    def update_file(self, history_file: Path, commit: bool = True) -> bool:
+        """Parse and index a history file
+
+        Returns:
+            bool: Whether the file was indexed
+        """
+        try:
+            mtime = os.stat(history_file).st_mtime
+            with open(history_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.update(history_file, data, data.get("messages", []), mtime=mtime, commit=commit)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to index history file {history_file}: {e}")
+            return False
+
+    def remove(self, paths: List[str]) -> None:
+        with self._lock:
+            for path in paths:
+                row = self._conn.execute(
+                    "DELETE FROM sessions WHERE path = ? RETURNING id", (path,)
+                ).fetchone()
+                if row and self.fts:
+                    self._conn.execute("DELETE FROM sessions_fts WHERE rowid = ?", (row[0],))
+            self._conn.commit()
+
+    def sync(self, history_dir: Path) -> int:
+        """Bring the index up to date with the history directory
+
+        Only new and modified files are parsed, unchanged files cost a stat.
+
+        Args:
+            history_dir: Directory of chat_*.json history files
+
+        Returns:
+            int: Number of files (re)indexed
+        """
+        with self._lock:
+            indexed = dict(self._conn.execute("SELECT path, mtime FROM sessions").fetchall())
+
+        updated = 0
+        seen = set()
+        if history_dir.exists():
+            with os.scandir(history_dir) as entries:
+                for entry in entries:
+                    if not (entry.name.startswith("chat_") and entry.name.endswith(".json")):
+                        continue
+                    seen.add(entry.path)
+                    if indexed.get(entry.path) != entry.stat().st_mtime:
+                        updated += self.update_file(Path(entry.path), commit=False)
+        with self._lock:
+            self._conn.commit()
+
+        removed = [path for path in indexed if path not in seen]
+        if removed:
+            self.remove(removed)
+        if updated or removed:
+            logger.info(f"History index synced: {updated} indexed, {len(removed)} removed")
+        return updated
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def page(self, offset: int = 0, limit: int = 10) -> List[Dict[str, Any]]:
+        """Conversations, newest first
+
+        Args:
+            offset: Number of conversations to skip
+            limit: Page size
+
+        Returns:
+            List[Dict[str, Any]]: path, title, model, timestamp and turns of each conversation
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, title, model, timestamp, turns FROM sessions "
+                "ORDER BY timestamp DESC, path DESC LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+        return [
+            {"path": Path(r[0]), "title": r[1], "model": r[2], "timestamp": r[3], "turns": r[4]}
+            for r in rows
+        ]
+
+    def search(self, terms: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Full-text search of titles and messages, best matches first
+
+        Args:
+            terms: Search terms, all of them must match (prefix match)
+            limit: Maximum number of results
+
+        Returns:
+            List[Dict[str, Any]]: Same fields as page() plus a "snippet" of the match
+        """
+        if not terms.strip():
+            return []
+        with self._lock:
+            if self.fts:
+                # FTS5's snippet() rescans every hit of a document, so only rank here
+                # and cut snippets of the returned page at the first hit
+                rows = self._conn.execute(
+                    "SELECT s.path, s.title, s.model, s.timestamp, s.turns, f.content "
+                    "FROM sessions_fts f JOIN sessions s ON s.id = f.rowid "
+                    "WHERE sessions_fts MATCH ? ORDER BY f.rank LIMIT ?",
+                    (_fts_query(terms), limit),
+                ).fetchall()
+                rows = [row[:5] + (_snippet(row[5], terms),) for row in rows]
+            else:
+                rows = self._conn.execute(
+                    "SELECT path, title, model, timestamp, turns, title FROM sessions "
+                    "WHERE title LIKE ? ORDER BY timestamp DESC LIMIT ?",
+                    (f"%{terms}%", limit),
+                ).fetchall()
+        return [
+            {
+                "path": Path(r[0]),
+                "title": r[1],
+                "model": r[2],
+                "timestamp": r[3],
+                "turns": r[4],
+                "snippet": r[5],
+            }
+            for r in rows
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,298 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from think_llm_client.utils.logger import logging
+
+from think_mcp_host.tracing import tracer
+from think_mcp_host.utils.settings import HOST_DIR
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+DEFAULT_JOURNAL_DIR = HOST_DIR / "journal"
+
+_CLOSE = object()
+
+
+def replay_journal(path: Path) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Rebuild a conversation from its journal, one record at a time
+
+    Args:
+        path: Journal file path
+
+    Returns:
+        Tuple[Dict[str, Any], List[Dict[str, Any]]]: (header, messages), the header holds
+        system_prompt, model_type, provider, model and timestamp
+    """
+    header: Dict[str, Any] = {}
+    messages: List[Dict[str, Any]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a partial last line, everything before it is intact
+                logger.warning(f"Skipping corrupt journal record {path}:{line_number}")
+                continue
+            op = record.get("op")
+            if op == "header":
+                header.update({k: v for k, v in record.items() if k != "op"})
+            elif op == "turn":
+                messages.extend(record["messages"])
+            elif op == "clear":
+                messages = []
+    return header, messages
+
+
+def write_history_file(
+    history_file: Path, header: Dict[str, Any], messages: List[Dict[str, Any]]
+) -> None:
+    """Save a conversation in the format of LLMClient.save_chat_history"""
+    history = {
+        "timestamp": header.get("timestamp") or datetime.now().strftime("%Y%m%d_%H%M%S"),
+        "messages": messages,
+        "system_prompt": header.get("system_prompt"),
+        "model_type": header.get("model_type"),
+        "provider": header.get("provider"),
+        "model": header.get("model"),
+    }
+    history_file.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = history_file.with_suffix(".json.tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(history, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, history_file)
+
+
+class HistoryJournal:
+    """Append-only JSONL journal of a conversation
+
+    Every turn is appended as one record by a background writer, so a save costs the size
+    of the turn rather than of the whole history and a crash loses at most the turn in
+    flight. Every compact_every turns the journal is rewritten without superseded records.
+    The conversation is saved in the usual history format only when the user saves it, so
+    the history list and markdown export keep working and a declined save leaves nothing
+    behind. Records are:
+
+        {"op": "header", "system_prompt": ..., "model_type": ..., "provider": ..., "model": ...}
+        {"op": "turn", "messages": [user_message, assistant_message]}
+        {"op": "clear"}
+    """
+
+    def __init__(
+        self,
+        llm_client,
+        journal_dir: Optional[Path] = None,
+        compact_every: int = 20,
+        history_index=None,
+    ):
+        """Initialize history journal
+
+        Args:
+            llm_client: LLM client whose conversation is journaled
+            journal_dir: Journal directory, default is ~/.think-mcp-host/journal
+            compact_every: Turns between compactions, 0 disables periodic compaction
+            history_index: Optional HistoryIndex updated whenever a history file is saved
+        """
+        self.llm_client = llm_client
+        self.history_index = history_index
+        self.journal_dir = journal_dir or DEFAULT_JOURNAL_DIR
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        self.compact_every = compact_every
+        self.history_file: Optional[Path] = None
+        self.path: Optional[Path] = None
+        self._turns_since_compaction = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+
+    def journal_path(self, history_file: Path) -> Path:
+        """Journal of a history file, both share the chat_YYYYMMDD_HHMMSS stem"""
+        return self.journal_dir / f"{Path(history_file).stem}.jsonl"
+
+    def _header(self) -> Dict[str, Any]:
+        return {
+            "op": "header",
+            "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
+            "system_prompt": self.llm_client.system_prompt,
+            "model_type": self.llm_client.current_model_type,
+            "provider": self.llm_client.current_provider,
+            "model": self.llm_client.current_model,
+        }
+
+    def _snapshot(self) -> List[Dict[str, Any]]:
+        """Header and turns of the current conversation, without superseded records"""
+        records = [self._header()]
+        messages = self.llm_client.messages
+        for i in range(0, len(messages) - 1, 2):
+            if messages[i]["role"] == "user" and messages[i + 1]["role"] == "assistant":
+                records.append({"op": "turn", "messages": messages[i : i + 2]})
+        return records
+
+    def start(self, history_file: Optional[Path] = None) -> None:
+        """Start journaling, continuing the journal of history_file if it has one
+
+        Args:
+            history_file: History file of a loaded conversation, a new one is named otherwise
+        """
+        if history_file is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            history_file = self.llm_client.history_dir / f"chat_{timestamp}.json"
+        self.history_file = Path(history_file)
+        self.path = self.journal_path(self.history_file)
+        self._queue = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write_loop(), name="history-journal")
+        if not self.path.exists():
+            # A conversation loaded from a plain history file is written once in full
+            self._queue.put_nowait(("rewrite", self._snapshot()))
+        logger.info(f"Journaling conversation to: {self.path}")
+
+    def load(self, history_file: Path) -> bool:
+        """Load a conversation into the LLM client, replaying its journal when there is one
+
+        Args:
+            history_file: History file selected by the user
+
+        Returns:
+            bool: Whether the conversation was loaded
+        """
+        path = self.journal_path(history_file)
+        if not path.exists():
+            success, _ = self.llm_client.load_chat_history_from_file(history_file)
+            return bool(success)
+        try:
+            header, messages = replay_journal(path)
+        except Exception as e:
+            logger.error(f"Failed to replay journal {path}: {e}")
+            return False
+        self.llm_client.messages = messages
+        self.llm_client.system_prompt = header.get("system_prompt")
+        logger.info(f"Replayed {len(messages)} message(s) from journal: {path}")
+        return True
+
+    def append_turn(self, messages: List[Dict[str, Any]]) -> None:
+        """Queue a finished turn, returns immediately"""
+        self._put(("append", {"op": "turn", "messages": messages}))
+        self._turns_since_compaction += 1
+        if self.compact_every and self._turns_since_compaction >= self.compact_every:
+            self._turns_since_compaction = 0
+            # Snapshot now, turns queued after this one are appended after the rewrite
+            self._put(("rewrite", self._snapshot()))
+
+    def record_clear(self) -> None:
+        """Queue a record discarding all previous turns"""
+        self._put(("append", {"op": "clear"}))
+
+    def _put(self, item) -> None:
+        if self._queue is None:
+            logger.warning("History journal is not started, record dropped")
+            return
+        self._queue.put_nowait(item)
+
+    async def compact(self) -> Optional[Path]:
+        """Wait for pending writes, then compact the journal and save the history file
+
+        Returns:
+            Optional[Path]: Saved history file, None if there was nothing to save
+        """
+        if self._queue is None:
+            return None
+        future = asyncio.get_running_loop().create_future()
+        self._turns_since_compaction = 0
+        self._queue.put_nowait(("compact", (self._snapshot(), future)))
+        return await future
+
+    async def close(self, keep: bool = True) -> None:
+        """Flush and stop the writer
+
+        Args:
+            keep: Whether to keep the journal, False deletes it and the conversation is
+                left as it was last saved
+        """
+        if self._writer is None:
+            return
+        self._queue.put_nowait((_CLOSE, None))
+        await self._writer
+        self._writer = None
+        self._queue = None
+        if not keep and self.path and self.path.exists():
+            self.path.unlink()
+            logger.info(f"Discarded journal: {self.path}")
+
+    async def _write_loop(self) -> None:
+        """Apply queued operations in order, file I/O runs on a worker thread"""
+        while True:
+            op, payload = await self._queue.get()
+            if op is _CLOSE:
+                return
+            try:
+                with tracer.span(f"persist.journal.{op}", category="persist"):
+                    if op == "append":
+                        await asyncio.to_thread(self._append, payload)
+                    elif op == "rewrite":
+                        await asyncio.to_thread(self._rewrite, payload)
+                    elif op == "compact":
+                        records, future = payload
+                        saved = await asyncio.to_thread(self._compact, records)
+                        future.set_result(saved)
+            except Exception as e:
+                logger.error(f"History journal {op} failed: {e}")
+                if op == "compact" and not payload[1].done():
+                    payload[1].set_result(None)
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+
+    def _rewrite(self, records: List[Dict[str, Any]]) -> None:
+        """Atomically replace the journal"""
+        temp_path = self.path.with_suffix(".jsonl.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+    def _compact(self, records: List[Dict[str, Any]]) -> Optional[Path]:
+        """Rewrite the journal from a snapshot and save it in the history format"""
+        self._rewrite(records)
+        if len(records) == 1:
+            return None
+        messages = [message for record in records[1:] for message in record["messages"]]
+        write_history_file(self.history_file, records[0], messages)
+        if self.history_index:
+            self.history_index.update(self.history_file, records[0], messages)
+        logger.info(f"Compacted journal {self.path} into {self.history_file}")
+        return self.history_file
+
+    def recover(self) -> int:
+        """Save journals left behind by crashed sessions in the history format
+
+        Returns:
+            int: Number of recovered conversations
+        """
+        recovered = 0
+        for path in sorted(self.journal_dir.glob("chat_*.jsonl")):
+            history_file = self.llm_client.history_dir / f"{path.stem}.json"
+            if path == self.path or (
+                history_file.exists() and history_file.stat().st_mtime >= path.stat().st_mtime
+            ):
+                continue
+            try:
+                header, messages = replay_journal(path)
+                if not messages:
+                    continue
+                write_history_file(history_file, header, messages)
+                if self.history_index:
+                    self.history_index.update(history_file, header, messages)
+                recovered += 1
+                logger.info(f"Recovered conversation from journal: {path}")
+            except Exception as e:
+                logger.error(f"Failed to recover journal {path}: {e}")
+        return recovered
@@ -0,0 +1,490 @@
+import asyncio
+import email.utils
+import json
+import random
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional
+
+from rich.table import Table
+from think_llm_client.utils.logger import logging
+from think_llm_client.utils.terminal_config import TABLE_STYLE, console
+
+from think_mcp_host.tracing import tracer
+from think_mcp_host.utils.tokens import MESSAGE_OVERHEAD_TOKENS, estimate_tokens
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+# Request of the running task, set while it holds a slot
+_current_request: ContextVar[Optional["Request"]] = ContextVar("llm_request", default=None)
+
+# HTTP statuses that mean "slow down": rate limited, Anthropic overloaded
+THROTTLE_STATUS = {429, 529}
+
+
+def is_throttled(error: Optional[BaseException]) -> bool:
+    """Whether a provider error is a rate limit or overload response"""
+    return getattr(error, "status_code", None) in THROTTLE_STATUS
+
+
+def is_transient(error: Optional[BaseException]) -> bool:
+    """Whether a provider error is worth sending the request again for
+
+    The errors the provider SDKs retry themselves: timeouts, lost connections, 408, 409
+    and server errors. Throttling is handled separately.
+    """
+    if error is None or is_throttled(error):
+        return False
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in (408, 409) or status >= 500
+    # APITimeoutError subclasses it, in both the OpenAI and the Anthropic SDK
+    return any(cls.__name__ == "APIConnectionError" for cls in type(error).__mro__)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds to wait from the Retry-After(-ms) header of a provider error, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            # HTTP date
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def prompt_tokens(llm_client, message: Any) -> int:
+    """Estimated prompt tokens of the request chat_stream would send"""
+    tokens = estimate_tokens(getattr(llm_client, "system_prompt", None)) + estimate_tokens(message)
+    for msg in getattr(llm_client, "messages", []):
+        tokens += estimate_tokens(msg.get("content")) + MESSAGE_OVERHEAD_TOKENS
+    return tokens
+
+
+class TokenBucket:
+    """Per-minute budget that refills continuously
+
+    Reservations may overdraw the bucket, later callers then wait until the debt is
+    refilled, so requests are admitted in arrival order at the configured rate.
+    """
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60
+        self.tokens = float(per_minute)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.per_minute, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take amount from the bucket
+
+        Returns:
+            float: Seconds to wait before the reservation is covered
+        """
+        self._refill()
+        self.tokens -= amount
+        return max(0.0, -self.tokens / self.rate)
+
+    def charge(self, amount: float) -> None:
+        """Take amount after the fact, e.g. completion tokens of a finished request"""
+        self._refill()
+        self.tokens -= amount
+
+    def refund(self, amount: float) -> None:
+        """Give back a reservation that was never used"""
+        self._refill()
+        self.tokens = min(self.per_minute, self.tokens + amount)
+
+
+class AIMDLimit:
+    """Concurrency limit that adapts to latency and throttling
+
+    Each request finishing within latency_tolerance times the baseline TTFT grows the limit
+    by 1/limit (about +1 per round of requests). Slower requests shrink it by 10%, throttled
+    ones halve it.
+    """
+
+    def __init__(
+        self,
+        initial: float,
+        minimum: float,
+        maximum: float,
+        latency_tolerance: float = 2.0,
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.value = min(max(initial, minimum), maximum)
+        self.latency_tolerance = latency_tolerance
+        # Lowest TTFT seen, drifting up slowly so a provider that got slower for good resets it
+        self.baseline_ms: Optional[float] = None
+
+    def on_success(self, ttft_ms: float) -> None:
+        if self.baseline_ms is None:
+            self.baseline_ms = ttft_ms
+        else:
+            self.baseline_ms = min(ttft_ms, self.baseline_ms * 1.02)
+        if ttft_ms > self.baseline_ms * self.latency_tolerance:
+            self.value = max(self.minimum, self.value * 0.9)
+        else:
+            self.value = min(self.maximum, self.value + 1 / self.value)
+
+    def on_throttle(self) -> None:
+        self.value = max(self.minimum, self.value / 2)
+
+
+@dataclass
+class Request:
+    """One admitted LLM request"""
+
+    prompt_tokens: int
+    started: float = field(default_factory=time.perf_counter)
+    ttft_ms: Optional[float] = None
+    completion_tokens: int = 0
+    error: Optional[BaseException] = None
+
+    def first_chunk(self) -> None:
+        if self.ttft_ms is None:
+            self.ttft_ms = (time.perf_counter() - self.started) * 1000
+
+
+class _Lane:
+    """Limits, queue and metrics of one provider/model"""
+
+    def __init__(self, name: str, rpm: Optional[float], tpm: Optional[float], limit: AIMDLimit):
+        self.name = name
+        self.rpm = TokenBucket(rpm) if rpm else None
+        self.tpm = TokenBucket(tpm) if tpm else None
+        self.limit = limit
+        self.queued = 0
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.streak = 0  # Consecutive throttled requests, sets the backoff without Retry-After
+        self.paused_until = 0.0
+        self.waits_ms: Deque[float] = deque(maxlen=500)
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self, tokens: int) -> float:
+        """Wait for a pause to end, for the budgets and for a concurrency slot
+
+        Returns:
+            float: Milliseconds waited
+        """
+        start = time.perf_counter()
+        self.queued += 1
+        reserved = False
+        try:
+            while self.paused_until > time.monotonic():
+                await asyncio.sleep(self.paused_until - time.monotonic())
+            delay = max(
+                self.rpm.reserve(1) if self.rpm else 0.0,
+                self.tpm.reserve(tokens) if self.tpm else 0.0,
+            )
+            reserved = True
+            if delay:
+                await asyncio.sleep(delay)
+            while self.in_flight >= max(1, int(self.limit.value)):
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+                try:
+                    await waiter
+                finally:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+            self.in_flight += 1
+        except BaseException:
+            # Cancelled while queued, the request is never sent
+            if reserved:
+                if self.rpm:
+                    self.rpm.refund(1)
+                if self.tpm:
+                    self.tpm.refund(tokens)
+            raise
+        finally:
+            self.queued -= 1
+        wait_ms = (time.perf_counter() - start) * 1000
+        self.waits_ms.append(wait_ms)
+        self.requests += 1
+        return wait_ms
+
+    def release(self, request: Request, backoff: float) -> None:
+        if is_throttled(request.error):
+            self.throttled += 1
+            self.streak += 1
+            self.limit.on_throttle()
+            # The whole lane waits, not only the request that was told to
+            self.paused_until = max(self.paused_until, time.monotonic() + backoff)
+            logger.warning(
+                f"LLM {self.name} throttled ({request.error.status_code}), pausing "
+                f"{backoff:.1f}s, concurrency limit now {self.limit.value:.1f}"
+            )
+        elif request.error is None and request.ttft_ms is not None:
+            self.streak = 0
+            self.limit.on_success(request.ttft_ms)
+        if self.tpm and request.completion_tokens:
+            self.tpm.charge(request.completion_tokens)
+        self.in_flight -= 1
+        # Waiters check the limit again, in arrival order
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def metrics(self) -> Dict[str, Any]:
+        waits = sorted(self.waits_ms)
+
+        def percentile(p: float) -> Optional[float]:
+            return waits[min(int(len(waits) * p / 100), len(waits) - 1)] if waits else None
+
+        return {
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "concurrency_limit": round(self.limit.value, 2),
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "wait_p50_ms": percentile(50),
+            "wait_p95_ms": percentile(95),
+            "wait_max_ms": waits[-1] if waits else None,
+            "paused_s": max(0.0, round(self.paused_until - time.monotonic(), 1)),
+            "rpm": self.rpm.per_minute if self.rpm else None,
+            "tpm": self.tpm.per_minute if self.tpm else None,
+        }
+
+
+class LLMScheduler:
+    """Coordinates every LLM request of the host
+
+    Requests of the same provider/model share a lane with requests-per-minute and
+    tokens-per-minute token buckets and an adaptive (AIMD) concurrency limit. Throttled
+    requests pause their lane for the Retry-After time the provider asked for, or an
+    exponential backoff, and are retried. Requests failing with a transient error (timeout,
+    connection error, server error) are retried after a backoff of their own. Stays
+    inactive until configure() is called.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.settings: Dict[str, Any] = {}
+        self._provider_limits: Dict[str, Dict[str, float]] = {}
+        self._lanes: Dict[str, _Lane] = {}
+        # LLM client -> provider client whose create() reports errors to the current request
+        self._observed: "weakref.WeakKeyDictionary[Any, Any]" = weakref.WeakKeyDictionary()
+
+    def configure(self, settings: Dict[str, Any], llm_config_path=None) -> None:
+        """Start scheduling
+
+        Args:
+            settings: The "llm_scheduler" block of the host settings
+            llm_config_path: LLM config, providers may set "rate_limits": {"rpm", "tpm"}
+        """
+        self.settings = settings
+        self._provider_limits = {}
+        if llm_config_path:
+            try:
+                with open(llm_config_path, "r", encoding="utf-8") as f:
+                    config = json.load(f)
+                for model_type in config.values():
+                    for name, provider in model_type.get("providers", {}).items():
+                        if isinstance(provider.get("rate_limits"), dict):
+                            self._provider_limits[name] = provider["rate_limits"]
+            except Exception as e:
+                logger.error(f"Failed to read rate limits from the LLM config: {e}")
+        self._lanes.clear()
+        self.enabled = True
+
+    def _lane(self, llm_client) -> _Lane:
+        provider = getattr(llm_client, "current_provider", "") or ""
+        model = getattr(llm_client, "current_model", "") or ""
+        name = f"{provider}/{model}"
+        lane = self._lanes.get(name)
+        if lane is None:
+            configured = self.settings.get("limits", {})
+            limits = (
+                configured.get(name)
+                or configured.get(provider)
+                or self._provider_limits.get(provider)
+                or {}
+            )
+            lane = _Lane(
+                name,
+                limits.get("rpm"),
+                limits.get("tpm"),
+                AIMDLimit(
+                    self.settings["initial_concurrency"],
+                    self.settings["min_concurrency"],
+                    self.settings["max_concurrency"],
+                    self.settings["latency_tolerance"],
+                ),
+            )
+            self._lanes[name] = lane
+        return lane
+
+    def _observe(self, llm_client) -> None:
+        """Route errors of the provider client's create() to the current request
+
+        LLMClient.chat_stream logs and swallows provider errors, so they are recorded on
+        their way through. The provider SDK's own retries are turned off so throttling
+        reaches the scheduler, which pauses the whole lane; should_retry() retries the
+        errors the SDK would have retried.
+        """
+        client = getattr(llm_client, "client", None)
+        if client is None or self._observed.get(llm_client) is client:
+            return
+        if hasattr(client, "with_options"):
+            client = client.with_options(max_retries=0)
+        anthropic = (getattr(llm_client, "current_provider", "") or "").lower() == "anthropic"
+        api = client.messages if anthropic else client.chat.completions
+        create = api.create
+
+        def observed_create(*args, **kwargs):
+            try:
+                return create(*args, **kwargs)
+            except Exception as e:
+                request = _current_request.get()
+                if request is not None:
+                    request.error = e
+                raise
+
+        api.create = observed_create
+        llm_client.client = client
+        self._observed[llm_client] = client
+
+    @asynccontextmanager
+    async def slot(self, llm_client, tokens: int = 0) -> AsyncIterator[Optional[Request]]:
+        """Hold a request slot of the client's provider/model
+
+        Yields:
+            Optional[Request]: The admitted request, None while the scheduler is off
+        """
+        if not self.enabled:
+            yield None
+            return
+        lane = self._lane(llm_client)
+        start_us = tracer.now()
+        wait_ms = await lane.acquire(tokens)
+        tracer.complete("llm.queue", start_us, category="llm", lane=lane.name)
+        if wait_ms >= 1000:
+            logger.info(f"LLM request to {lane.name} waited {wait_ms:.0f} ms in the queue")
+        request = Request(prompt_tokens=tokens)
+        self._observe(llm_client)
+        # Worker threads of the request must run in a copy of this context to report errors
+        token = _current_request.set(request)
+        try:
+            yield request
+        except BaseException as e:
+            request.error = request.error or e
+            raise
+        finally:
+            try:
+                _current_request.reset(token)
+            except ValueError:
+                # A stream started by one task and finished by another (fan-out race) exits
+                # in a different context, the one it was entered in is gone with its task
+                _current_request.set(None)
+            backoff = 0.0
+            if is_throttled(request.error):
+                backoff = self.backoff(request.error, lane.streak)
+            lane.release(request, backoff)
+
+    def backoff(self, error: BaseException, attempt: int) -> float:
+        """Retry-After of the error, or an exponential backoff with jitter"""
+        delay = retry_after(error)
+        if delay is None:
+            delay = min(self.settings["backoff_max"], self.settings["backoff_base"] * 2**attempt)
+            delay *= random.uniform(0.5, 1.0)
+        return delay
+
+    async def should_retry(self, llm_client, request: Optional[Request], attempt: int) -> bool:
+        """Whether a failed request is retried, counts the retry
+
+        Throttled requests are held back by their lane's pause when they are sent again,
+        requests that failed with a transient error wait out their own backoff here.
+        """
+        if request is None or attempt >= self.settings["max_retries"]:
+            return False
+        if is_transient(request.error):
+            delay = self.backoff(request.error, attempt)
+            logger.warning(
+                f"LLM request failed ({type(request.error).__name__}: {request.error}), "
+                f"retrying in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+        elif not is_throttled(request.error):
+            return False
+        self._lane(llm_client).retries += 1
+        return True
+
+    async def call(self, llm_client, tokens: int, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run a non-streaming request in a slot, retrying throttled and transient failures"""
+        attempt = 0
+        while True:
+            request = None
+            try:
+                async with self.slot(llm_client, tokens) as request:
+                    return await fn()
+            except Exception:
+                if not await self.should_retry(llm_client, request, attempt):
+                    raise
+            attempt += 1
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Queue depth, concurrency, throttling and wait times of every provider/model"""
+        return {name: lane.metrics() for name, lane in self._lanes.items()}
+
+    def print_metrics(self) -> None:
+        table = Table(
+            title="LLM Scheduler",
+            box=TABLE_STYLE["box"],
+            title_style=TABLE_STYLE["table.title"],
+            header_style=TABLE_STYLE["table.header"],
+            border_style=TABLE_STYLE["table.border"],
+        )
+        table.add_column("Model", style="yellow")
+        table.add_column("Queued", justify="right")
+        table.add_column("In flight / limit", justify="right")
+        table.add_column("Requests", justify="right")
+        table.add_column("Throttled / retried", justify="right")
+        table.add_column("Wait p50 / p95", justify="right")
+        table.add_column("RPM / TPM", justify="right")
+
+        for name, metrics in self.metrics().items():
+            waits = (
+                f"{metrics['wait_p50_ms']:.0f} / {metrics['wait_p95_ms']:.0f} ms"
+                if metrics["wait_p50_ms"] is not None
+                else "-"
+            )
+            paused = f" (paused {metrics['paused_s']:g}s)" if metrics["paused_s"] else ""
+            table.add_row(
+                name,
+                str(metrics["queued"]),
+                f"{metrics['in_flight']} / {metrics['concurrency_limit']:g}",
+                str(metrics["requests"]),
+                f"{metrics['throttled']} / {metrics['retries']}{paused}",
+                waits,
+                f"{metrics['rpm'] or '-'} / {metrics['tpm'] or '-'}",
+            )
+        console.print(table)
+
+
+# Global scheduler, configured by the host
+llm_scheduler = LLMScheduler()
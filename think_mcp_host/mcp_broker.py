@@ -0,0 +1,719 @@
+"""MCP server broker
+
+A local daemon that owns the MCP server processes and shares them between host processes
+over a Unix domain socket, so servers survive host restarts instead of being respawned on
+every launch. The host side (BrokerClient) replaces each client's stdio transport with a
+connection to the broker; the MCP session on top of it is unchanged.
+
+Protocol: newline-delimited JSON. A connection starts with one control message, either
+{"broker": "attach", "server": name, "config": {...}} followed by plain JSON-RPC, or
+{"broker": "status"} / {"broker": "stop"} answered with a single reply.
+
+Only the standard library is imported at module level, the daemon must start without
+paying for the LLM and MCP clients.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+DEFAULT_SOCKET_PATH = Path.home() / ".think-mcp-host" / "broker.sock"
+BROKER_LOG_PATH = Path.home() / ".think-mcp-host" / "log" / "broker.log"
+
+# Largest JSON-RPC message, resources are sent as a single line
+MAX_LINE = 256 * 1024 * 1024
+
+# Seconds the host waits for a broker it started to accept connections
+BROKER_START_TIMEOUT = 10
+
+# JSON-RPC error code of requests the broker answers itself
+BROKER_ERROR = -32000
+
+_INIT_ID = "broker-initialize"
+
+
+def _encode(message: Dict[str, Any]) -> bytes:
+    return (json.dumps(message, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _server_key(name: str, config: Dict[str, Any]) -> str:
+    """Servers are shared only between hosts that would start them identically"""
+    payload = json.dumps(config, sort_keys=True, default=str)
+    return f"{name}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]}"
+
+
+class BrokerError(Exception):
+    """The broker refused an attach, e.g. because the server could not be started"""
+
+
+class _Connection:
+    """One host connection attached to a server"""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.last_active = time.monotonic()
+        # Request id of the host -> id sent to the server
+        self.requests: Dict[Any, int] = {}
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        try:
+            self.writer.write(_encode(message))
+            await self.writer.drain()
+        except (ConnectionError, RuntimeError):
+            pass
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class _Server:
+    """A running MCP server shared by the connections attached to it
+
+    The server is initialized once, with the parameters of the first host, and later hosts
+    get the same initialize result. Request ids are rewritten so that requests of different
+    connections can't collide, responses go back to the connection that sent the request.
+    Notifications of the server go to every connection, its requests to the most recently
+    active one.
+    """
+
+    def __init__(self, key: str, name: str, config: Dict[str, Any]):
+        self.key = key
+        self.name = name
+        self.config = config
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.connections: Set[_Connection] = set()
+        self.started = time.time()
+        self.idle_since: Optional[float] = time.monotonic()
+        self.requests = 0
+        self._pending: Dict[int, Tuple[_Connection, Any]] = {}
+        self._next_id = 0
+        self._init_result: Optional[Dict[str, Any]] = None
+        self._init_future: Optional[asyncio.Future] = None
+        self._init_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        self._reader: Optional[asyncio.Task] = None
+        self.on_exit = None
+
+    async def start(self) -> None:
+        self.process = await asyncio.create_subprocess_exec(
+            self.config["command"],
+            *self.config.get("args", []),
+            env=self.config.get("env") or None,
+            cwd=self.config.get("cwd") or None,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            limit=MAX_LINE,
+        )
+        self._reader = asyncio.create_task(self._read_loop())
+        logger.info(f"Started MCP server {self.key} (pid {self.process.pid})")
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        async with self._write_lock:
+            self.process.stdin.write(_encode(message))
+            await self.process.stdin.drain()
+
+    async def initialize(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Initialize result of the server, the handshake runs once"""
+        async with self._init_lock:
+            if self._init_result is None:
+                self._init_future = asyncio.get_running_loop().create_future()
+                await self.send(
+                    {"jsonrpc": "2.0", "id": _INIT_ID, "method": "initialize", "params": params}
+                )
+                self._init_result = await self._init_future
+                await self.send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+        return self._init_result
+
+    def attach(self, connection: _Connection) -> None:
+        self.connections.add(connection)
+        self.idle_since = None
+
+    def detach(self, connection: _Connection) -> None:
+        self.connections.discard(connection)
+        for request_id in connection.requests.values():
+            self._pending.pop(request_id, None)
+        if not self.connections:
+            self.idle_since = time.monotonic()
+
+    async def forward(self, connection: _Connection, message: Dict[str, Any]) -> None:
+        """Send a message of a host connection to the server"""
+        connection.last_active = time.monotonic()
+        method = message.get("method")
+        if method == "initialize" and "id" in message:
+            try:
+                result = await self.initialize(message.get("params", {}))
+                await connection.send({"jsonrpc": "2.0", "id": message["id"], "result": result})
+            except Exception as e:
+                await connection.send(
+                    {
+                        "jsonrpc": "2.0",
+                        "id": message["id"],
+                        "error": {"code": BROKER_ERROR, "message": f"initialize failed: {e}"},
+                    }
+                )
+            return
+        if method == "notifications/initialized":
+            # Sent once by the broker itself
+            return
+        if method == "notifications/cancelled":
+            params = dict(message.get("params") or {})
+            request_id = connection.requests.get(params.get("requestId"))
+            if request_id is None:
+                return
+            params["requestId"] = request_id
+            message = {**message, "params": params}
+        elif method is not None and "id" in message:
+            self._next_id += 1
+            self._pending[self._next_id] = (connection, message["id"])
+            connection.requests[message["id"]] = self._next_id
+            message = {**message, "id": self._next_id}
+            self.requests += 1
+        # Responses to requests of the server keep the server's ids
+        await self.send(message)
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                line = await self.process.stdout.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"MCP server {self.name} wrote a non-JSON line")
+                    continue
+                await self._dispatch(message)
+        except Exception as e:
+            logger.error(f"Reading from MCP server {self.key} failed: {e}")
+        finally:
+            await self._exited()
+
+    async def _dispatch(self, message: Dict[str, Any]) -> None:
+        """Route a message of the server"""
+        if "method" not in message:
+            if message.get("id") == _INIT_ID:
+                if "error" in message:
+                    self._init_future.set_exception(
+                        BrokerError(message["error"].get("message", "initialize failed"))
+                    )
+                else:
+                    self._init_future.set_result(message.get("result", {}))
+                return
+            pending = self._pending.pop(message.get("id"), None)
+            if pending is None:
+                return
+            connection, request_id = pending
+            connection.requests.pop(request_id, None)
+            await connection.send({**message, "id": request_id})
+        elif "id" in message:
+            if message["method"] == "ping":
+                await self.send({"jsonrpc": "2.0", "id": message["id"], "result": {}})
+            elif self.connections:
+                target = max(self.connections, key=lambda c: c.last_active)
+                await target.send(message)
+            else:
+                await self.send(
+                    {
+                        "jsonrpc": "2.0",
+                        "id": message["id"],
+                        "error": {"code": BROKER_ERROR, "message": "No host attached"},
+                    }
+                )
+        else:
+            for connection in list(self.connections):
+                await connection.send(message)
+
+    async def _exited(self) -> None:
+        """Fail pending requests and drop the connections, hosts reconnect to a new process"""
+        if self.process.returncode is None:
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                pass
+        logger.info(f"MCP server {self.key} exited ({self.process.returncode})")
+        if self._init_future and not self._init_future.done():
+            self._init_future.set_exception(BrokerError("MCP server exited"))
+        for connection, request_id in self._pending.values():
+            await connection.send(
+                {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": BROKER_ERROR, "message": "MCP server exited"},
+                }
+            )
+        self._pending.clear()
+        for connection in list(self.connections):
+            connection.close()
+        self.connections.clear()
+        if self.on_exit:
+            self.on_exit(self)
+
+    async def stop(self) -> None:
+        """Close stdin, then terminate and kill the server if it doesn't exit"""
+        if not self.running:
+            return
+        try:
+            self.process.stdin.close()
+            await asyncio.wait_for(self.process.wait(), timeout=2)
+        except asyncio.TimeoutError:
+            self.process.terminate()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=2)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        if self._reader:
+            await self._reader
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "pid": self.process.pid if self.process else None,
+            "connections": len(self.connections),
+            "requests": self.requests,
+            "uptime_s": round(time.time() - self.started),
+            "idle_s": round(time.monotonic() - self.idle_since) if self.idle_since else 0,
+        }
+
+
+class MCPBroker:
+    """Broker daemon: starts MCP servers on demand and stops them when unused
+
+    Servers without attached hosts for idle_timeout seconds are stopped, and the broker
+    exits once it has had no servers and no connections for as long.
+    """
+
+    def __init__(self, socket_path: Optional[Path] = None, idle_timeout: float = 600):
+        self.socket_path = Path(socket_path) if socket_path else DEFAULT_SOCKET_PATH
+        self.idle_timeout = idle_timeout
+        self.servers: Dict[str, _Server] = {}
+        self.connections = 0
+        self._idle_since = time.monotonic()
+        self._starting: Dict[str, asyncio.Lock] = {}
+        self._stopped = asyncio.Event()
+
+    async def serve(self) -> None:
+        """Serve until stopped or idle"""
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        # Attaching starts arbitrary commands, only the user may connect. The socket is
+        # created with those permissions, a chmod afterwards would leave a window
+        umask = os.umask(0o077)
+        try:
+            server = await asyncio.start_unix_server(
+                self._handle, path=str(self.socket_path), limit=MAX_LINE
+            )
+        finally:
+            os.umask(umask)
+        logger.info(f"MCP broker listening on {self.socket_path} (pid {os.getpid()})")
+        reaper = asyncio.create_task(self._reap_loop())
+        try:
+            async with server:
+                await self._stopped.wait()
+        finally:
+            reaper.cancel()
+            await asyncio.gather(*(s.stop() for s in list(self.servers.values())))
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+            logger.info("MCP broker stopped")
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    async def _reap_loop(self) -> None:
+        while True:
+            await asyncio.sleep(max(1.0, min(30.0, self.idle_timeout / 4)))
+            now = time.monotonic()
+            for server in list(self.servers.values()):
+                if server.idle_since is not None and now - server.idle_since > self.idle_timeout:
+                    logger.info(f"Stopping idle MCP server {server.key}")
+                    self.servers.pop(server.key, None)
+                    await server.stop()
+            if self.servers or self.connections:
+                self._idle_since = now
+            elif now - self._idle_since > self.idle_timeout:
+                logger.info("MCP broker idle, exiting")
+                self.stop()
+
+    async def _server(self, name: str, config: Dict[str, Any]) -> _Server:
+        """The running server of a config, started on first use"""
+        key = _server_key(name, config)
+        lock = self._starting.setdefault(key, asyncio.Lock())
+        async with lock:
+            server = self.servers.get(key)
+            if server is None or not server.running:
+                server = _Server(key, name, config)
+                server.on_exit = self._forget
+                await server.start()
+                self.servers[key] = server
+        return server
+
+    def _forget(self, server: _Server) -> None:
+        if self.servers.get(server.key) is server:
+            del self.servers[server.key]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        connection = _Connection(writer)
+        server = None
+        try:
+            line = await reader.readline()
+            if not line:
+                return
+            control = json.loads(line)
+            command = control.get("broker")
+            if command == "status":
+                await connection.send(
+                    {
+                        "broker": "status",
+                        "pid": os.getpid(),
+                        "servers": [s.status() for s in self.servers.values()],
+                    }
+                )
+                return
+            if command == "stop":
+                await connection.send({"broker": "stopping"})
+                self.stop()
+                return
+            if command != "attach":
+                await connection.send({"broker": "error", "message": f"Unknown command {command}"})
+                return
+
+            try:
+                server = await self._server(control["server"], control["config"])
+            except Exception as e:
+                await connection.send({"broker": "error", "message": str(e)})
+                return
+            server.attach(connection)
+            await connection.send({"broker": "attached", "pid": server.process.pid})
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not server.running:
+                    break
+                await server.forward(connection, message)
+        except (ConnectionError, ValueError, KeyError) as e:
+            logger.info(f"Broker connection closed: {e}")
+        finally:
+            if server:
+                server.detach(connection)
+            self.connections -= 1
+            connection.close()
+
+
+async def request(socket_path: Path, command: str) -> Dict[str, Any]:
+    """Send a control command (status, stop) to a running broker
+
+    Raises:
+        OSError: No broker is listening on the socket
+    """
+    reader, writer = await asyncio.open_unix_connection(str(socket_path), limit=MAX_LINE)
+    try:
+        writer.write(_encode({"broker": command}))
+        await writer.drain()
+        return json.loads(await reader.readline())
+    finally:
+        writer.close()
+
+
+def spawn(socket_path: Path, idle_timeout: float) -> None:
+    """Start the broker daemon in its own session, detached from the host"""
+    BROKER_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    if getattr(sys, "frozen", False):
+        command = [sys.executable, "broker"]
+    else:
+        command = [sys.executable, "-m", "think_mcp_host.mcp_broker"]
+    command += ["--socket", str(socket_path), "--idle-timeout", str(idle_timeout)]
+    with open(BROKER_LOG_PATH, "ab") as log:
+        subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+            close_fds=True,
+        )
+    logger.info(f"Started MCP broker: {' '.join(command)}")
+
+
+class BrokerClient:
+    """Routes the MCP clients of a manager through the broker
+
+    Each client's init_client connects to the broker instead of spawning the server, the
+    broker is started on first use when autostart is on. If the broker can't be reached
+    the client falls back to spawning its server itself. Closing a client only closes its
+    connection, the server keeps running in the broker.
+    """
+
+    def __init__(
+        self, socket_path: Optional[Path] = None, idle_timeout: float = 600, autostart: bool = True
+    ):
+        """Initialize broker client
+
+        Args:
+            socket_path: Unix socket of the broker, default is ~/.think-mcp-host/broker.sock
+            idle_timeout: Idle timeout of servers (and of the broker) when it is started here
+            autostart: Start the broker when no broker is listening
+        """
+        self.socket_path = Path(socket_path).expanduser() if socket_path else DEFAULT_SOCKET_PATH
+        self.idle_timeout = idle_timeout
+        self.autostart = autostart
+        self._start_lock = asyncio.Lock()
+        self._warned = False
+
+    def attach(self, mcp_manager) -> None:
+        """Replace init_client of every client of the manager"""
+        for name, client in mcp_manager.get_all_clients().items():
+            self._wrap_client(name, client)
+
+    def _wrap_client(self, name: str, client) -> None:
+        original_init = client.init_client
+
+        async def init_client():
+            try:
+                stream = await self.connect()
+            except OSError as e:
+                if not self._warned:
+                    self._warned = True
+                    logger.warning(f"MCP broker unavailable, spawning servers directly: {e}")
+                await original_init()
+                return
+
+            from think_mcp_host.mcp_session import open_session
+
+            config = {
+                "command": client.command,
+                "args": client.args,
+                "env": client.env,
+                "cwd": os.getcwd(),
+            }
+            try:
+                read, write = await client.exit_stack.enter_async_context(
+                    broker_transport(stream, name, config)
+                )
+                await open_session(client, read, write)
+            except BaseException:
+                await client.cleanup()
+                raise
+
+        client.init_client = init_client
+
+    async def connect(self):
+        """Connect to the broker, starting it if needed
+
+        Raises:
+            OSError: No broker could be reached
+        """
+        import anyio
+
+        try:
+            return await anyio.connect_unix(str(self.socket_path))
+        except OSError:
+            if not self.autostart:
+                raise
+        async with self._start_lock:
+            try:
+                return await anyio.connect_unix(str(self.socket_path))
+            except OSError:
+                pass
+            spawn(self.socket_path, self.idle_timeout)
+            deadline = time.monotonic() + BROKER_START_TIMEOUT
+            while True:
+                await asyncio.sleep(0.05)
+                try:
+                    return await anyio.connect_unix(str(self.socket_path))
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise
+
+
+@asynccontextmanager
+async def broker_transport(stream, server: str, config: Dict[str, Any]):
+    """MCP client transport over a broker connection, the counterpart of stdio_client
+
+    Args:
+        stream: Connected anyio socket stream of the broker
+        server: Server name
+        config: command, args, env and cwd of the server
+
+    Raises:
+        BrokerError: The broker could not start the server
+    """
+    import anyio
+    from anyio.streams.buffered import BufferedByteReceiveStream
+    from mcp import types
+
+    try:
+        from mcp.shared.message import SessionMessage
+    except ImportError:
+        # Older MCP SDKs pass bare JSONRPCMessage objects
+        SessionMessage = None
+
+    async with stream:
+        received = BufferedByteReceiveStream(stream)
+        await stream.send(_encode({"broker": "attach", "server": server, "config": config}))
+        reply = json.loads(await received.receive_until(b"\n", MAX_LINE))
+        if reply.get("broker") != "attached":
+            raise BrokerError(reply.get("message") or f"Broker refused {server}")
+
+        read_stream_writer, read_stream = anyio.create_memory_object_stream(0)
+        write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+
+        async def socket_reader():
+            async with read_stream_writer:
+                while True:
+                    try:
+                        line = await received.receive_until(b"\n", MAX_LINE)
+                    except (
+                        anyio.EndOfStream,
+                        anyio.IncompleteRead,
+                        anyio.BrokenResourceError,
+                        anyio.ClosedResourceError,
+                    ):
+                        break
+                    try:
+                        message = types.JSONRPCMessage.model_validate_json(line)
+                    except Exception as exc:
+                        await read_stream_writer.send(exc)
+                        continue
+                    await read_stream_writer.send(
+                        SessionMessage(message) if SessionMessage else message
+                    )
+
+        async def socket_writer():
+            try:
+                async with write_stream_reader:
+                    async for message in write_stream_reader:
+                        if SessionMessage:
+                            message = message.message
+                        data = message.model_dump_json(by_alias=True, exclude_none=True)
+                        await stream.send((data + "\n").encode("utf-8"))
+            except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+                await anyio.lowlevel.checkpoint()
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(socket_reader)
+            tg.start_soon(socket_writer)
+            try:
+                yield read_stream, write_stream
+            finally:
+                tg.cancel_scope.cancel()
+
+
+def print_status(socket_path: Path) -> bool:
+    """Print the servers of a running broker"""
+    from rich.table import Table
+    from think_llm_client.utils.terminal_config import TABLE_STYLE, console
+
+    try:
+        status = asyncio.run(request(socket_path, "status"))
+    except OSError:
+        console.print(f"[yellow]No MCP broker is running on {socket_path}[/yellow]")
+        return False
+    table = Table(
+        title=f"MCP Broker (pid {status['pid']})",
+        box=TABLE_STYLE["box"],
+        title_style=TABLE_STYLE["table.title"],
+        header_style=TABLE_STYLE["table.header"],
+        border_style=TABLE_STYLE["table.border"],
+    )
+    table.add_column("Server", style="yellow")
+    table.add_column("PID", justify="right")
+    table.add_column("Hosts", justify="right")
+    table.add_column("Requests", justify="right")
+    table.add_column("Uptime", justify="right")
+    table.add_column("Idle", justify="right")
+    for server in status["servers"]:
+        table.add_row(
+            server["name"],
+            str(server["pid"]),
+            str(server["connections"]),
+            str(server["requests"]),
+            f"{server['uptime_s']}s",
+            f"{server['idle_s']}s" if server["idle_s"] else "-",
+        )
+    console.print(table)
+    return True
+
+
+def run_broker(socket_path: Path, idle_timeout: float) -> bool:
+    """Run the broker in the foreground, unless one is already running"""
+    import fcntl
+
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    # Hosts starting at the same time may each spawn a broker, only one of them serves
+    with open(socket_path.with_suffix(".lock"), "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            logger.info(f"An MCP broker is already running on {socket_path}")
+            return True
+        broker = MCPBroker(socket_path, idle_timeout)
+        try:
+            asyncio.run(broker.serve())
+        except KeyboardInterrupt:
+            pass
+    return True
+
+
+def run_broker_command(settings: Dict[str, Any], args) -> bool:
+    """The broker subcommand: run the broker, or show or stop the running one
+
+    Args:
+        settings: The "broker" block of the host settings
+        args: Parsed arguments of the subcommand
+    """
+    from think_llm_client.utils.terminal_config import console
+
+    socket_path = Path(args.socket or settings["socket"] or DEFAULT_SOCKET_PATH).expanduser()
+    if args.status:
+        return print_status(socket_path)
+    if args.stop:
+        try:
+            asyncio.run(request(socket_path, "stop"))
+        except OSError:
+            console.print(f"[yellow]No MCP broker is running on {socket_path}[/yellow]")
+            return False
+        console.print("[green]MCP broker stopped[/green]")
+        return True
+    return run_broker(socket_path, args.idle_timeout or settings["idle_timeout"])
+
+
+def main() -> None:
+    """Daemon entry point used by spawn()"""
+    parser = argparse.ArgumentParser(description="Think MCP Host broker")
+    parser.add_argument("--socket", default=str(DEFAULT_SOCKET_PATH))
+    parser.add_argument("--idle-timeout", type=float, default=600)
+    args = parser.parse_args()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    run_broker(Path(args.socket), args.idle_timeout)
+
+
+if __name__ == "__main__":
+    main()
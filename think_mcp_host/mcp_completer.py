@@ -0,0 +1,240 @@
+import asyncio
+import bisect
+import re
+import urllib.parse
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from prompt_toolkit.completion import CompleteEvent, Completer, Completion
+from prompt_toolkit.document import Document
+from think_llm_client.utils.logger import logging
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+# Placeholder kind -> capability list it completes from
+PLACEHOLDER_KINDS = {
+    "resources": "resources",
+    "prompts": "prompts",
+    "tools": "tools",
+    "rag": "resources",
+}
+
+# The placeholder being typed at the cursor, from "->m" up to the partial item name
+_PARTIAL_PLACEHOLDER = re.compile(
+    r"(?:^|(?<=\s))(?P<token>->(?P<word>m[a-z_]*)"
+    r"(?:\[(?P<server>[^\]\s]*)(?:(?P<close>\])(?P<colon>:?)(?P<name>[^\s{]*))?)?)$"
+)
+
+
+@dataclass(frozen=True)
+class IndexEntry:
+    """A completable capability of a server"""
+
+    text: str  # Inserted after "]:", URL-encoded if needed, with a {param:} template
+    name: str  # Name or URI as shown
+    description: str
+
+
+class _Bucket:
+    """Entries of one server and kind, searchable by prefix and by subsequence
+
+    Keys are kept sorted for prefix lookups with bisect, and joined into one string so a
+    subsequence match over all of them is a single regex scan in C.
+    """
+
+    __slots__ = ("keys", "entries", "blob", "offsets")
+
+    def __init__(self, entries: List[IndexEntry]):
+        pairs = sorted((entry.name.lower(), entry) for entry in entries)
+        self.keys = [key for key, _ in pairs]
+        self.entries = [entry for _, entry in pairs]
+        self.blob = "\n".join(self.keys)
+        self.offsets = []
+        position = 0
+        for key in self.keys:
+            self.offsets.append(position)
+            position += len(key) + 1
+
+    def search(self, query: str, limit: int) -> List[IndexEntry]:
+        """Prefix matches first, then fuzzy (subsequence) matches, in name order"""
+        query = query.lower()
+        results: List[IndexEntry] = []
+        start = bisect.bisect_left(self.keys, query)
+        end = start
+        while end < len(self.keys) and len(results) < limit and self.keys[end].startswith(query):
+            results.append(self.entries[end])
+            end += 1
+        if not query or len(results) >= limit:
+            return results
+
+        # Greedy subsequence match from the first character on, it never crosses a line
+        chars = [re.escape(char) for char in query]
+        pattern = re.compile(chars[0] + "".join(f"[^{char}\n]*{char}" for char in chars[1:]))
+        last = -1
+        for match in pattern.finditer(self.blob):
+            index = bisect.bisect_right(self.offsets, match.start()) - 1
+            if index == last or start <= index < end:
+                continue
+            last = index
+            results.append(self.entries[index])
+            if len(results) >= limit:
+                break
+        return results
+
+
+class CapabilityIndex:
+    """In-memory index of the resources, prompts and tools of all MCP servers
+
+    Seeded from the capability cache snapshot, so completions work before servers boot, and
+    updated one server and kind at a time whenever a capability list is fetched or a server
+    reports that one changed.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[str, str], _Bucket] = {}
+        self.servers: List[str] = []
+        self._mcp_manager = None
+        self._refreshes: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    def attach(self, mcp_manager, capability_cache=None) -> None:
+        """Index the servers of a manager, following the capability cache's updates
+
+        Args:
+            mcp_manager: MCP client manager, used for server names and refetching lists
+            capability_cache: Optional CapabilityCache to seed from and listen to
+        """
+        self._mcp_manager = mcp_manager
+        self.servers = sorted(mcp_manager.get_all_clients())
+        if capability_cache is None:
+            return
+        for server, key in capability_cache.keys.items():
+            for kind in PLACEHOLDER_KINDS.values():
+                items = capability_cache.peek(key, kind)
+                if items is not None:
+                    self.update(server, kind, items)
+        capability_cache.add_listener(self._on_cache_change)
+
+    def update(self, server: str, kind: str, items: Iterable) -> None:
+        """Replace the indexed items of one server and kind"""
+        entries = [_entry(kind, item) for item in items]
+        self._buckets[(server, kind)] = _Bucket(entries)
+
+    def search(self, server: str, kind: str, query: str, limit: int = 50) -> List[IndexEntry]:
+        bucket = self._buckets.get((server, kind))
+        return bucket.search(query, limit) if bucket else []
+
+    def servers_with(self, kind: str) -> List[str]:
+        """Servers that have indexed items of a kind, or all servers if none are indexed yet"""
+        servers = [server for server in self.servers if self._buckets.get((server, kind))]
+        return servers or self.servers
+
+    async def refresh(self) -> None:
+        """Index every connected server, e.g. after the warm-up"""
+        if not self._mcp_manager:
+            return
+        await asyncio.gather(
+            *(
+                self._refetch(server, kind)
+                for server in self.servers
+                for kind in PLACEHOLDER_KINDS.values()
+            )
+        )
+
+    async def _refetch(self, server: str, kind: str) -> None:
+        client = self._mcp_manager.get_client(server)
+        # Connections are only opened by their owners, never for completions
+        if not client or not client.session:
+            return
+        try:
+            items = await getattr(client, f"list_{kind}")()
+        except Exception as e:
+            logger.info(f"Could not index {kind} of {server}: {e}")
+            return
+        self.update(server, kind, items)
+
+    def _on_cache_change(self, key: Optional[str], kind: Optional[str], items) -> None:
+        """Capability cache listener: index stored lists, refetch lists reported as changed"""
+        if key is None or kind is None:
+            return
+        server = key.rsplit(":", 1)[0]
+        if items is not None:
+            self.update(server, kind, items)
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = self._refreshes.get((server, kind))
+        if task is None or task.done():
+            self._refreshes[(server, kind)] = loop.create_task(self._refetch(server, kind))
+
+
+def _entry(kind: str, item) -> IndexEntry:
+    """Index entry of a Resource, Prompt or Tool"""
+    if kind == "resources":
+        name = item.uri
+        text = urllib.parse.quote(name, safe=":/?&=%#@+,;~*'()[]!$") if " " in name else name
+        return IndexEntry(text, name, item.description or item.name or "")
+
+    if kind == "prompts":
+        params = [arg.get("name") for arg in item.arguments or [] if isinstance(arg, dict)]
+    else:
+        params = list((item.input_schema or {}).get("properties", {}))
+    text = urllib.parse.quote(item.name) if " " in item.name else item.name
+    if params:
+        text += "{" + ",".join(f"{param}:" for param in params if param) + "}"
+    return IndexEntry(text, item.name, item.description or "")
+
+
+class MCPCompleter(Completer):
+    """Complete ->mcp_resources[server]:uri, ->mcp_prompts[...], ->mcp_tools[...] and ->mcp_rag
+
+    Completions come from the CapabilityIndex only, typing never waits for a server.
+    """
+
+    def __init__(self, index: CapabilityIndex, max_results: int = 50):
+        self.index = index
+        self.max_results = max_results
+
+    def get_completions(
+        self, document: Document, complete_event: CompleteEvent
+    ) -> Iterable[Completion]:
+        text = document.text_before_cursor
+        if "->m" not in text[-200:]:
+            return
+        match = _PARTIAL_PLACEHOLDER.search(text)
+        if not match:
+            return
+
+        word = match.group("word")
+        server_prefix = match.group("server")
+        if server_prefix is None:
+            # ->mcp_re: complete the placeholder kind
+            token = match.group("token")
+            for kind in PLACEHOLDER_KINDS:
+                if f"mcp_{kind}".startswith(word):
+                    yield Completion(f"->mcp_{kind}[", start_position=-len(token))
+            return
+
+        kind = PLACEHOLDER_KINDS.get(word[len("mcp_") :]) if word.startswith("mcp_") else None
+        if kind is None:
+            return
+        if match.group("close") is None:
+            # ->mcp_resources[se: complete the server
+            for server in self.index.servers_with(kind):
+                if server.startswith(server_prefix):
+                    yield Completion(f"{server}]:", start_position=-len(server_prefix))
+            return
+
+        # ->mcp_resources[server]:na: complete the item
+        name_prefix = match.group("name")
+        colon = "" if match.group("colon") else ":"
+        for entry in self.index.search(server_prefix, kind, name_prefix, self.max_results):
+            description = entry.description.splitlines()[0] if entry.description else ""
+            yield Completion(
+                colon + entry.text,
+                start_position=-len(name_prefix),
+                display=entry.name,
+                display_meta=description[:60],
+            )
@@ -0,0 +1,40 @@
+async def open_session(client, read, write) -> None:
+    """Open and initialize the MCP session of a client on a connected transport
+
+    The session is entered into the client's exit stack like MCPClient.init_client does.
+    Server messages are passed to client.message_handler when one is set, e.g. by the
+    capability cache to see list_changed notifications.
+    """
+    from mcp import ClientSession
+
+    handler = getattr(client, "message_handler", None)
+    session = ClientSession(read, write, message_handler=handler)
+    client.session = await client.exit_stack.enter_async_context(session)
+    init_result = await client.session.initialize()
+    server_info = getattr(init_result, "serverInfo", None)
+    client.server_version = getattr(server_info, "version", None) or "unknown"
+
+
+def attach(mcp_manager) -> None:
+    """Connect every client of the manager through open_session
+
+    Replaces MCPClient.init_client, which creates its ClientSession without handlers.
+    """
+    for client in mcp_manager.get_all_clients().values():
+        client.init_client = _stdio_init_client(client)
+
+
+def _stdio_init_client(client):
+    async def init_client():
+        from mcp import StdioServerParameters
+        from mcp.client.stdio import stdio_client
+
+        try:
+            params = StdioServerParameters(command=client.command, args=client.args, env=client.env)
+            read, write = await client.exit_stack.enter_async_context(stdio_client(params))
+            await open_session(client, read, write)
+        except BaseException:
+            await client.cleanup()
+            raise
+
+    return init_client
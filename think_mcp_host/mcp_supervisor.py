@@ -0,0 +1,360 @@
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+import anyio
+from rich.table import Table
+from rich.text import Text
+from think_llm_client.utils.logger import logging
+from think_llm_client.utils.terminal_config import TABLE_STYLE, console
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+# Errors of a transport whose process or stream is gone, only a reconnect helps
+CONNECTION_ERRORS = (
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    BrokenPipeError,
+    ConnectionResetError,
+    EOFError,
+)
+
+
+class ConnectionLostError(ConnectionError):
+    """An MCP server is down, or its connection was lost while a request was in flight"""
+
+
+@dataclass
+class ServerHealth:
+    """Connection health of a single supervised MCP server"""
+
+    name: str
+    status: str = "down"  # up / degraded / down / failed (reconnecting given up)
+    reconnects: int = 0
+    replayed: int = 0
+    missed_pings: int = 0
+    last_error: str = ""
+    rtts: Deque[float] = field(default_factory=lambda: deque(maxlen=100), repr=False)
+    up: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    wake: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    # Resolved when the current connection is declared dead, replaced on reconnect
+    lost: Optional[asyncio.Future] = field(default=None, repr=False)
+
+    def rtt_percentile(self, percentile: float) -> Optional[float]:
+        """Ping round-trip time percentile in ms over the recent pings"""
+        if not self.rtts:
+            return None
+        ordered = sorted(self.rtts)
+        return ordered[min(int(len(ordered) * percentile / 100), len(ordered) - 1)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "reconnects": self.reconnects,
+            "replayed": self.replayed,
+            "rtt_p50_ms": self.rtt_percentile(50),
+            "rtt_p99_ms": self.rtt_percentile(99),
+            "last_error": self.last_error,
+        }
+
+
+class MCPSupervisor:
+    """Keep the connections of the warm-up owner tasks alive
+
+    Runs inside each server's owner task, since only the task that opened a stdio
+    transport can close it: the server is pinged periodically, and a dead pipe or too many
+    missed pings tear the connection down and reconnect it with jittered exponential
+    backoff. A server that can't be reconnected within max_reconnect_attempts is marked
+    failed and no longer supervised. Requests made through call() wait for the server to be
+    up, and requests in
+    flight when a connection is lost are failed at once, or replayed after the reconnect
+    when they are idempotent.
+    """
+
+    def __init__(
+        self,
+        ping_interval: float = 15,
+        ping_timeout: float = 5,
+        max_missed_pings: int = 3,
+        degraded_ms: float = 1000,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30,
+        max_reconnect_attempts: int = 10,
+        connect_timeout: float = 10,
+        wait_timeout: float = 5,
+        policy=None,
+    ):
+        """Initialize supervisor
+
+        Args:
+            ping_interval: Seconds between pings of a healthy server
+            ping_timeout: Seconds before a ping counts as missed
+            max_missed_pings: Missed pings in a row before the server is declared down
+            degraded_ms: Ping round-trip time above which a server is degraded
+            backoff_base: First reconnect delay in seconds, doubled on every failure
+            backoff_max: Maximum reconnect delay in seconds
+            max_reconnect_attempts: Failed reconnects in a row before the server is marked
+                failed, 0 retries forever
+            connect_timeout: Seconds before a reconnect attempt is given up
+            wait_timeout: Seconds a request waits for a down server before failing
+            policy: Optional CachePolicy, tools it allows to cache are replayed as idempotent
+        """
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.max_missed_pings = max_missed_pings
+        self.degraded_ms = degraded_ms
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_reconnect_attempts = max_reconnect_attempts
+        self.connect_timeout = connect_timeout
+        self.wait_timeout = wait_timeout
+        self.policy = policy
+        self.servers: Dict[str, ServerHealth] = {}
+
+    def supervises(self, name: str) -> bool:
+        return name in self.servers
+
+    def is_idempotent(self, server: str, kind: str, name: str) -> bool:
+        """Resource reads and prompts are always safe to replay, tools only if cacheable"""
+        if kind != "tool":
+            return True
+        return self.policy is not None and self.policy.ttl(server, kind, name) is not None
+
+    def report_failure(self, name: str) -> None:
+        """Check a server right away instead of at its next ping, e.g. after a request failed"""
+        health = self.servers.get(name)
+        if health:
+            health.wake.set()
+
+    async def wait_up(self, name: str) -> None:
+        """Wait until a supervised server is connected
+
+        Raises:
+            ConnectionLostError: The server is still down after wait_timeout
+        """
+        health = self.servers.get(name)
+        if health is None or health.up.is_set():
+            return
+        if health.status == "failed":
+            raise ConnectionLostError(f"MCP server {name} is down ({health.last_error})")
+        try:
+            await asyncio.wait_for(health.up.wait(), timeout=self.wait_timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionLostError(
+                f"MCP server {name} is down ({health.last_error or 'reconnecting'})"
+            )
+
+    async def call(
+        self, name: str, request: Callable[[], Awaitable[Any]], idempotent: bool = False
+    ) -> Any:
+        """Run a request against a supervised server
+
+        Args:
+            name: Server name
+            request: Factory of the request coroutine, called again for a replay
+            idempotent: Whether the request may be replayed after a reconnect
+
+        Raises:
+            ConnectionLostError: The server is down or its connection was lost
+        """
+        health = self.servers.get(name)
+        if health is None:
+            return await request()
+
+        attempts = 2 if idempotent else 1
+        for attempt in range(attempts):
+            await self.wait_up(name)
+            lost = health.lost
+            task = asyncio.ensure_future(request())
+            try:
+                await asyncio.wait({task, lost}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                if not task.done():
+                    task.cancel()
+
+            if task.done() and not task.cancelled():
+                error = task.exception()
+                if error is None:
+                    return task.result()
+                if not isinstance(error, CONNECTION_ERRORS):
+                    raise error
+                # Let the owner task confirm the loss first, so the replay doesn't reuse
+                # the dead session
+                self.report_failure(name)
+                await asyncio.wait({lost}, timeout=self.ping_timeout)
+
+            if attempt + 1 < attempts:
+                health.replayed += 1
+                logger.warning(f"Connection to MCP server {name} lost, replaying request")
+        raise ConnectionLostError(f"Connection to MCP server {name} lost during the request")
+
+    async def supervise(self, name: str, client, stop: asyncio.Event, connected: bool) -> None:
+        """Watch one server until stop is set, must run in the task owning its connection
+
+        Args:
+            name: Server name
+            client: MCP client of the server
+            stop: Event set at shutdown
+            connected: Whether the client is connected already
+        """
+        health = self.servers.setdefault(name, ServerHealth(name=name))
+        if connected:
+            self._mark_up(health)
+        else:
+            health.last_error = "warm-up failed"
+            if not await self._reconnect(health, client, stop):
+                return
+
+        while not stop.is_set():
+            await self._sleep(stop, self.ping_interval, health.wake)
+            if stop.is_set():
+                return
+            if not await self._ping(health, client) and not await self._reconnect(
+                health, client, stop
+            ):
+                return
+
+    async def _ping(self, health: ServerHealth, client) -> bool:
+        """Ping the server and update its state
+
+        Returns:
+            bool: False if the connection has to be re-established
+        """
+        health.wake.clear()
+        start = time.perf_counter()
+        try:
+            if client.session is None:
+                raise ConnectionLostError("session closed")
+            async with asyncio.timeout(self.ping_timeout):
+                await client.session.send_ping()
+        except (ConnectionLostError, *CONNECTION_ERRORS) as e:
+            self._mark_down(health, f"connection closed ({type(e).__name__})")
+            return False
+        except Exception as e:
+            health.missed_pings += 1
+            error = "ping timed out" if isinstance(e, TimeoutError) else f"ping failed: {e}"
+            if health.missed_pings >= self.max_missed_pings:
+                self._mark_down(health, f"{error} {health.missed_pings} time(s) in a row")
+                return False
+            health.status = "degraded"
+            health.last_error = error
+            logger.warning(f"MCP server {health.name} degraded: {error}")
+            return True
+
+        rtt_ms = (time.perf_counter() - start) * 1000
+        health.rtts.append(rtt_ms)
+        health.missed_pings = 0
+        health.status = "degraded" if rtt_ms > self.degraded_ms else "up"
+        return True
+
+    async def _reconnect(self, health: ServerHealth, client, stop: asyncio.Event) -> bool:
+        """Close the dead connection and reconnect with jittered exponential backoff
+
+        Returns:
+            bool: Whether the server is connected again, False at shutdown or when
+            max_reconnect_attempts were exhausted and the server is marked failed
+        """
+        await client.cleanup()
+        attempt = 0
+        start = time.perf_counter()
+        while not stop.is_set():
+            if self.max_reconnect_attempts and attempt >= self.max_reconnect_attempts:
+                health.status = "failed"
+                logger.error(
+                    f"MCP server {health.name} gave up after {attempt} reconnect attempt(s): "
+                    f"{health.last_error}"
+                )
+                return False
+            delay = min(self.backoff_max, self.backoff_base * 2**attempt)
+            # Equal jitter: servers dropped together don't come back in lockstep
+            await self._sleep(stop, random.uniform(delay / 2, delay))
+            if stop.is_set():
+                return False
+            attempt += 1
+            try:
+                async with asyncio.timeout(self.connect_timeout):
+                    await client.init_client()
+            except Exception as e:
+                await client.cleanup()
+                health.last_error = f"reconnect failed: {e or type(e).__name__}"
+                log = logger.warning if attempt == 1 else logger.debug
+                log(f"MCP server {health.name} reconnect attempt {attempt} failed: {e}")
+                continue
+
+            health.reconnects += 1
+            self._mark_up(health)
+            logger.info(
+                f"MCP server {health.name} reconnected after {attempt} attempt(s) "
+                f"in {(time.perf_counter() - start) * 1000:.0f} ms"
+            )
+            return True
+        return False
+
+    def _mark_up(self, health: ServerHealth) -> None:
+        health.status = "up"
+        health.missed_pings = 0
+        health.lost = asyncio.get_running_loop().create_future()
+        health.up.set()
+
+    def _mark_down(self, health: ServerHealth, error: str) -> None:
+        health.status = "down"
+        health.last_error = error
+        health.up.clear()
+        if health.lost and not health.lost.done():
+            health.lost.set_result(None)
+        logger.warning(f"MCP server {health.name} is down: {error}, reconnecting")
+
+    @staticmethod
+    async def _sleep(
+        stop: asyncio.Event, seconds: float, wake: Optional[asyncio.Event] = None
+    ) -> None:
+        """Sleep until the timeout, shutdown or a wake-up request"""
+        waiters = [asyncio.ensure_future(stop.wait())]
+        if wake is not None:
+            waiters.append(asyncio.ensure_future(wake.wait()))
+        try:
+            await asyncio.wait(waiters, timeout=seconds, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+    def print_report(self) -> None:
+        """Print per-server connection health table"""
+        table = Table(
+            title="🩺 MCP Server Health",
+            title_style=TABLE_STYLE["table.title"],
+            box=TABLE_STYLE["box"],
+            header_style=TABLE_STYLE["table.header"],
+            border_style=TABLE_STYLE["table.border"],
+        )
+        table.add_column("Server", style=TABLE_STYLE["green"])
+        table.add_column("Status")
+        table.add_column("Reconnects", justify="right")
+        table.add_column("Replayed", justify="right")
+        table.add_column("RTT p50 (ms)", justify="right")
+        table.add_column("RTT p99 (ms)", justify="right")
+        table.add_column("Last error", style=TABLE_STYLE["red"], max_width=40)
+
+        status_styles = {
+            "up": TABLE_STYLE["green"],
+            "degraded": TABLE_STYLE["yellow"],
+            "down": TABLE_STYLE["red"],
+            "failed": TABLE_STYLE["red"],
+        }
+        for health in self.servers.values():
+            p50, p99 = health.rtt_percentile(50), health.rtt_percentile(99)
+            table.add_row(
+                health.name,
+                f"[{status_styles[health.status]}]{health.status}[/]",
+                str(health.reconnects),
+                str(health.replayed),
+                "-" if p50 is None else f"{p50:.1f}",
+                "-" if p99 is None else f"{p99:.1f}",
+                Text(health.last_error),
+            )
+        console.print(table)
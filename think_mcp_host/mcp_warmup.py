@@ -0,0 +1,203 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from rich.table import Table
+from think_llm_client.utils.logger import logging
+from think_llm_client.utils.terminal_config import TABLE_STYLE, console
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+
+@dataclass
+class ServerReadiness:
+    """Warm-up state of a single MCP server"""
+
+    name: str
+    status: str = "pending"  # pending / ready / timeout / failed
+    connect_ms: Optional[float] = None
+    prefetch_ms: Optional[float] = None
+    tools: Optional[List[Any]] = None
+    resources: Optional[List[Any]] = None
+    prompts: Optional[List[Any]] = None
+    error: str = ""
+    ready: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+
+class MCPWarmup:
+    """Eagerly connect every configured MCP server concurrently
+
+    Each server gets its own long-lived owner task: the MCP stdio transport is entered
+    through an AsyncExitStack, and it has to be closed by the same task that opened it.
+    The owner task connects, prefetches tools/resources/prompts in parallel, then holds
+    the connection until shutdown() is called.
+    """
+
+    def __init__(self, mcp_manager, timeout: float = 10.0, supervisor=None):
+        """Initialize warm-up
+
+        Args:
+            mcp_manager: MCP client manager whose clients will be connected
+            timeout: Per-server timeout in seconds for connecting and prefetching
+            supervisor: Optional MCPSupervisor keeping the connections alive until shutdown
+        """
+        self.mcp_manager = mcp_manager
+        self.timeout = timeout
+        self.supervisor = supervisor
+        self.servers: Dict[str, ServerReadiness] = {}
+        self._owners: Dict[str, asyncio.Task] = {}
+        self._stop = asyncio.Event()
+        self._waiter: Optional[asyncio.Task] = None
+        self.started_at: Optional[float] = None
+        self.elapsed_ms: Optional[float] = None
+
+    def start(self) -> None:
+        """Start connecting all servers in the background"""
+        if self._waiter:
+            return
+        self.started_at = time.perf_counter()
+        for name, client in self.mcp_manager.get_all_clients().items():
+            self.servers[name] = ServerReadiness(name=name)
+            self._owners[name] = asyncio.create_task(self._hold_connection(name, client))
+        self._waiter = asyncio.create_task(self._wait_all())
+        logger.info(f"MCP warm-up started for {len(self.servers)} server(s)")
+
+    async def wait(self) -> Dict[str, ServerReadiness]:
+        """Wait until every server is ready, failed or timed out"""
+        if self._waiter:
+            await asyncio.shield(self._waiter)
+        return self.servers
+
+    @property
+    def done(self) -> bool:
+        return self._waiter is not None and self._waiter.done()
+
+    async def _wait_all(self) -> None:
+        await asyncio.gather(*(self._wait_one(name) for name in self.servers))
+        if self.elapsed_ms is None:
+            self.elapsed_ms = (time.perf_counter() - self.started_at) * 1000
+
+    async def _wait_one(self, name: str) -> None:
+        state = self.servers[name]
+        try:
+            await asyncio.wait_for(state.ready.wait(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.elapsed_ms = (time.perf_counter() - self.started_at) * 1000
+            state.status = "timeout"
+            state.error = f"not ready after {self.timeout:g}s"
+            logger.warning(f"MCP server {name} warm-up timed out, it will connect on first use")
+            # The transport must be fully torn down before anyone can connect lazily again,
+            # otherwise the new connection would share the half-closed exit stack
+            owner = self._owners.pop(name)
+            owner.cancel()
+            await asyncio.gather(owner, return_exceptions=True)
+
+    async def _hold_connection(self, name: str, client) -> None:
+        """Own the connection of one server for its whole lifetime"""
+        state = self.servers[name]
+        start = time.perf_counter()
+        try:
+            await client.init_client()
+            state.connect_ms = (time.perf_counter() - start) * 1000
+
+            prefetch_start = time.perf_counter()
+            tools, resources, prompts = await asyncio.gather(
+                client.list_tools(),
+                client.list_resources(),
+                client.list_prompts(),
+                return_exceptions=True,
+            )
+            state.prefetch_ms = (time.perf_counter() - prefetch_start) * 1000
+            # Servers may not implement every capability, keep what succeeded
+            state.tools = None if isinstance(tools, BaseException) else tools
+            state.resources = None if isinstance(resources, BaseException) else resources
+            state.prompts = None if isinstance(prompts, BaseException) else prompts
+            state.status = "ready"
+            logger.info(
+                f"MCP server {name} ready: connect {state.connect_ms:.0f}ms, "
+                f"prefetch {state.prefetch_ms:.0f}ms"
+            )
+        except asyncio.CancelledError:
+            await client.cleanup()
+            raise
+        except Exception as e:
+            state.status = "failed"
+            state.error = str(e) or type(e).__name__
+            logger.error(f"MCP server {name} warm-up failed: {e}")
+        finally:
+            state.ready.set()
+
+        if self.supervisor:
+            # The owner task keeps the connection alive, reconnecting it whenever it drops
+            await self.supervisor.supervise(
+                name, client, self._stop, connected=state.status == "ready"
+            )
+        elif state.status == "ready":
+            await self._stop.wait()
+        else:
+            return
+        await client.cleanup()
+
+    async def shutdown(self) -> None:
+        """Close every connection opened by the warm-up, from its owner task"""
+        self._stop.set()
+        if self._waiter and not self._waiter.done():
+            self._waiter.cancel()
+        owners = list(self._owners.values())
+        self._owners.clear()
+        if owners:
+            await asyncio.gather(*owners, return_exceptions=True)
+
+    def print_report(self) -> None:
+        """Print per-server readiness and latency table"""
+        table = Table(
+            title="🚀 MCP Server Warm-up",
+            caption=(
+                f"Total {self.elapsed_ms:.0f} ms, timeout {self.timeout:g}s per server"
+                if self.elapsed_ms is not None
+                else None
+            ),
+            caption_style="dim",
+            title_style=TABLE_STYLE["table.title"],
+            box=TABLE_STYLE["box"],
+            header_style=TABLE_STYLE["table.header"],
+            border_style=TABLE_STYLE["table.border"],
+        )
+        table.add_column("Server", style=TABLE_STYLE["green"])
+        table.add_column("Status")
+        table.add_column("Connect (ms)", justify="right")
+        table.add_column("Prefetch (ms)", justify="right")
+        table.add_column("Tools", justify="right")
+        table.add_column("Resources", justify="right")
+        table.add_column("Prompts", justify="right")
+        table.add_column("Error", style=TABLE_STYLE["red"], max_width=40)
+
+        status_styles = {
+            "ready": TABLE_STYLE["green"],
+            "timeout": TABLE_STYLE["yellow"],
+            "failed": TABLE_STYLE["red"],
+        }
+        for state in self.servers.values():
+            table.add_row(
+                state.name,
+                f"[{status_styles.get(state.status, 'dim')}]{state.status}[/]",
+                _format_ms(state.connect_ms),
+                _format_ms(state.prefetch_ms),
+                _format_count(state.tools),
+                _format_count(state.resources),
+                _format_count(state.prompts),
+                state.error,
+            )
+
+        console.print("\n")
+        console.print(table)
+
+
+def _format_ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.0f}"
+
+
+def _format_count(items: Optional[List[Any]]) -> str:
+    return "-" if items is None else str(len(items))
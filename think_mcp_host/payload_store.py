@@ -0,0 +1,219 @@
+import hashlib
+import mmap
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from think_llm_client.utils.logger import logging
+
+from think_mcp_host.utils.settings import HOST_DIR
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+DEFAULT_SPILL_DIR = HOST_DIR / "payloads"
+
+POLICIES = ("head", "head_tail", "spread")
+
+# Characters written per slice, so a payload is never encoded to bytes all at once
+_WRITE_SLICE = 1024 * 1024
+
+# Long runs of base64 characters without whitespace are treated as binary data
+_BASE64_SAMPLE = re.compile(r"[A-Za-z0-9+/=]{4096}")
+
+# Start of the text that replaces a spilled payload
+_REFERENCE = re.compile(r"\[payload ([0-9a-f]{12}): ")
+
+
+class PayloadStore:
+    """Keep large MCP payloads out of messages, history and memory
+
+    Content above the threshold is streamed to a content-addressed spill file. The message
+    gets a reference line and an excerpt chosen by the policy, read back through mmap, so only
+    the excerpt is ever copied again:
+
+        head: the beginning of the payload
+        head_tail: its beginning and its end, e.g. for logs
+        spread: evenly spaced chunks over the whole payload
+
+    The spill directory is pruned to max_mb, oldest files first.
+    """
+
+    def __init__(
+        self,
+        spill_dir: Optional[Path] = None,
+        threshold_kb: float = 256,
+        policy: str = "head_tail",
+        excerpt_chars: int = 8000,
+        chunks: int = 4,
+        max_mb: float = 1024,
+    ):
+        """Initialize payload store
+
+        Args:
+            spill_dir: Spill file directory, default is ~/.think-mcp-host/payloads
+            threshold_kb: Payloads above this size (UTF-8) are spilled
+            policy: Excerpt policy, one of head, head_tail, spread
+            excerpt_chars: Approximate size of the excerpt sent in the message
+            chunks: Number of chunks of the spread policy
+            max_mb: Total size of the spill directory before old files are deleted
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown payload policy: {policy}, expected one of {POLICIES}")
+        self.spill_dir = Path(spill_dir) if spill_dir else DEFAULT_SPILL_DIR
+        self.threshold_bytes = int(threshold_kb * 1024)
+        self.policy = policy
+        self.excerpt_chars = excerpt_chars
+        self.chunks = max(1, chunks)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        # Payloads spilled by this process: short id -> (path, source, size in bytes)
+        self.spilled: Dict[str, Tuple[Path, str, int]] = {}
+
+    def spill(self, content: Optional[str], source: str) -> Optional[str]:
+        """Replace large content with a reference and an excerpt
+
+        Args:
+            content: Payload text
+            source: Where it came from, shown in the reference, e.g. "resource mem://log on a"
+
+        Returns:
+            Optional[str]: The content itself if small enough, otherwise the reference text
+        """
+        # A character is 1 to 4 bytes, only strings in between are measured
+        if not content or len(content) * 4 <= self.threshold_bytes:
+            return content
+        if (
+            len(content) <= self.threshold_bytes
+            and len(content.encode("utf-8")) <= self.threshold_bytes
+        ):
+            return content
+
+        start = time.perf_counter()
+        path, size = self._write(content)
+        payload_id = path.stem[:12]
+        self.spilled[payload_id] = (path, source, size)
+        binary = _BASE64_SAMPLE.match(content[:4096]) is not None
+        total_chars = len(content)
+
+        if binary:
+            excerpt = "[binary or base64 data, excerpt omitted]"
+        else:
+            excerpt = self.excerpt(path)
+        logger.info(
+            f"Spilled {size / 1024 / 1024:.1f} MB from {source} to {path} "
+            f"in {(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+        return (
+            f"[payload {payload_id}: {total_chars} characters ({size / 1024:.0f} KB) from "
+            f"{source}, full content in {path}, {self.policy} excerpt below]\n{excerpt}\n"
+            f"[end of payload {payload_id} excerpt]"
+        )
+
+    def _write(self, content: str) -> Tuple[Path, int]:
+        """Stream the content to a spill file named by its SHA-256
+
+        Returns:
+            Tuple[Path, int]: Spill file and its size in bytes
+        """
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        temp_path = self.spill_dir / f".spill_{os.getpid()}_{time.monotonic_ns()}.tmp"
+        with open(temp_path, "wb") as f:
+            for offset in range(0, len(content), _WRITE_SLICE):
+                data = content[offset : offset + _WRITE_SLICE].encode("utf-8")
+                digest.update(data)
+                f.write(data)
+                size += len(data)
+
+        path = self.spill_dir / f"{digest.hexdigest()}.txt"
+        if path.exists():
+            # Same payload as before, keep the existing file and refresh its age
+            temp_path.unlink()
+            os.utime(path)
+        else:
+            os.replace(temp_path, path)
+            self._prune()
+        return path, size
+
+    def _prune(self) -> None:
+        """Delete the oldest spill files beyond max_mb"""
+        files = sorted(self.spill_dir.glob("*.txt"), key=lambda p: p.stat().st_mtime, reverse=True)
+        total = 0
+        for path in files:
+            total += path.stat().st_size
+            if total > self.max_bytes:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def excerpt(self, path: Path) -> str:
+        """Excerpt of a spill file following the policy, read through mmap"""
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            size = len(data)
+            # Byte budget, most payloads are mostly ASCII
+            budget = self.excerpt_chars
+            if self.policy == "head":
+                ranges = [(0, budget)]
+            elif self.policy == "head_tail":
+                ranges = [(0, budget // 2), (size - budget // 2, size)]
+            else:
+                chunk = budget // self.chunks
+                step = size / self.chunks
+                ranges = [(int(i * step), int(i * step) + chunk) for i in range(self.chunks)]
+
+            pieces: List[str] = []
+            last_end = 0
+            for begin, end in ranges:
+                begin, end = max(begin, last_end), min(end, size)
+                if begin >= end:
+                    continue
+                if begin > last_end:
+                    pieces.append(f"\n[... {begin - last_end} bytes omitted ...]\n")
+                # Cut multi-byte characters at the edges are dropped
+                pieces.append(data[begin:end].decode("utf-8", errors="ignore"))
+                last_end = end
+            if last_end < size:
+                pieces.append(f"\n[... {size - last_end} bytes omitted ...]")
+        return "".join(pieces)
+
+    def read(self, payload_id: str, page: int = 0, page_chars: Optional[int] = None) -> str:
+        """Read one page of a spilled payload through mmap
+
+        Args:
+            payload_id: Short id shown in the reference
+            page: Zero-based page number
+            page_chars: Page size in bytes, default is excerpt_chars
+
+        Raises:
+            LookupError: Unknown id, or the spill file was pruned
+        """
+        path = self.path(payload_id)
+        page_size = page_chars or self.excerpt_chars
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            begin = page * page_size
+            return data[begin : begin + page_size].decode("utf-8", errors="ignore")
+
+    def load(self, content: Optional[str]) -> Optional[str]:
+        """Full payload of a reference returned by spill(), other content is returned as is"""
+        match = _REFERENCE.match(content) if content else None
+        if not match:
+            return content
+        try:
+            return self.path(match.group(1)).read_text(encoding="utf-8")
+        except (LookupError, OSError) as e:
+            logger.warning(f"Spilled payload {match.group(1)} unavailable: {e}")
+            return content
+
+    def path(self, payload_id: str) -> Path:
+        """Spill file of a payload id, also of payloads spilled by earlier sessions"""
+        if payload_id in self.spilled:
+            path = self.spilled[payload_id][0]
+        else:
+            path = next(self.spill_dir.glob(f"{payload_id}*.txt"), None)
+        if not path or not path.exists():
+            raise LookupError(f"Payload not found: {payload_id}")
+        return path
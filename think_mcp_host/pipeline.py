@@ -0,0 +1,467 @@
+import asyncio
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from rich.table import Table
+from rich.text import Text
+from think_llm_client.utils.logger import logging
+from think_llm_client.utils.terminal_config import TABLE_STYLE, console
+
+from think_mcp_host.agent import tool_result_text
+from think_mcp_host.tracing import tracer
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+# ${step} is the step's output text, ${step.key.0} a value of its output parsed as JSON
+REFERENCE_PATTERN = re.compile(r"\$\{([A-Za-z0-9_-]+)((?:\.[^.}]+)*)\}")
+
+STEP_KINDS = ("tool", "resource", "prompt")
+
+STEP_DEFAULTS = {"timeout": 30, "retries": 0, "retry_delay": 1}
+
+
+class PipelineError(Exception):
+    """Invalid pipeline definition"""
+
+
+@dataclass
+class Step:
+    """A node of the pipeline: one MCP tool call, resource read or prompt"""
+
+    id: str
+    server: str
+    kind: str  # tool / resource / prompt
+    name: str  # Tool or prompt name, or resource URI
+    args: Any = field(default_factory=dict)
+    needs: List[str] = field(default_factory=list)
+    timeout: float = 30
+    retries: int = 0
+    retry_delay: float = 1
+    # Run state
+    status: str = "pending"  # pending / running / ok / failed / skipped
+    output: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    start_ms: Optional[float] = None
+    end_ms: Optional[float] = None
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.start_ms is None or self.end_ms is None:
+            return None
+        return self.end_ms - self.start_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "server": self.server,
+            "kind": self.kind,
+            "name": self.name,
+            "needs": self.needs,
+            "status": self.status,
+            "attempts": self.attempts,
+            "start_ms": self.start_ms,
+            "end_ms": self.end_ms,
+            "duration_ms": self.duration_ms,
+            "error": self.error,
+            "output": self.output,
+        }
+
+
+def _references(value: Any) -> List[str]:
+    """Step ids referenced by ${...} anywhere in an argument value"""
+    if isinstance(value, str):
+        return [match.group(1) for match in REFERENCE_PATTERN.finditer(value)]
+    if isinstance(value, dict):
+        return [ref for item in value.values() for ref in _references(item)]
+    if isinstance(value, list):
+        return [ref for item in value for ref in _references(item)]
+    return []
+
+
+def load_pipeline(path: Path) -> Dict[str, Step]:
+    """Load and validate a pipeline file (YAML or JSON)
+
+    Format:
+        name: optional name
+        defaults: {timeout: 30, retries: 0, retry_delay: 1}
+        steps:
+          <id>:
+            server: <MCP server>
+            tool: <tool name>  # or resource: <uri>, or prompt: <name>
+            args: {key: value, other: "${<id>}", nested: "${<id>.items.0.title}"}
+            needs: [<id>, ...]  # optional, references in args are dependencies already
+            timeout: 10
+            retries: 2
+
+    Args:
+        path: Pipeline file, .yaml/.yml files need PyYAML
+
+    Returns:
+        Dict[str, Step]: Steps by id, in the order of the file
+
+    Raises:
+        PipelineError: Invalid definition, unknown dependency or dependency cycle
+    """
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise PipelineError(
+                "YAML pipelines require optional dependencies: "
+                "pip install 'think-mcp-host[pipeline]' (or use a JSON file)"
+            )
+        data = yaml.safe_load(text)
+    else:
+        data = json.loads(text)
+
+    if not isinstance(data, dict) or not isinstance(data.get("steps"), dict) or not data["steps"]:
+        raise PipelineError("A pipeline needs a 'steps' mapping of step id to step")
+    defaults = {**STEP_DEFAULTS, **(data.get("defaults") or {})}
+
+    steps: Dict[str, Step] = {}
+    for step_id, spec in data["steps"].items():
+        step_id = str(step_id)
+        if not isinstance(spec, dict) or "server" not in spec:
+            raise PipelineError(f"Step {step_id}: a step needs a 'server'")
+        kinds = [kind for kind in STEP_KINDS if kind in spec]
+        if len(kinds) != 1:
+            raise PipelineError(f"Step {step_id}: exactly one of tool, resource or prompt")
+        kind = kinds[0]
+        args = spec.get("args") or {}
+        needs = list(dict.fromkeys([*(spec.get("needs") or []), *_references(args)]))
+        if kind == "resource":
+            needs = list(dict.fromkeys([*needs, *_references(spec[kind])]))
+        steps[step_id] = Step(
+            id=step_id,
+            server=str(spec["server"]),
+            kind=kind,
+            name=str(spec[kind]),
+            args=args,
+            needs=[str(need) for need in needs],
+            timeout=float(spec.get("timeout", defaults["timeout"])),
+            retries=int(spec.get("retries", defaults["retries"])),
+            retry_delay=float(spec.get("retry_delay", defaults["retry_delay"])),
+        )
+
+    for step in steps.values():
+        unknown = [need for need in step.needs if need not in steps]
+        if unknown:
+            raise PipelineError(f"Step {step.id} depends on unknown step(s): {', '.join(unknown)}")
+    _check_acyclic(steps)
+    return steps
+
+
+def _check_acyclic(steps: Dict[str, Step]) -> None:
+    """Raise PipelineError if the dependencies contain a cycle (Kahn's algorithm)"""
+    remaining = {step_id: set(step.needs) for step_id, step in steps.items()}
+    while remaining:
+        ready = [step_id for step_id, needs in remaining.items() if not needs]
+        if not ready:
+            raise PipelineError(f"Dependency cycle between steps: {', '.join(remaining)}")
+        for step_id in ready:
+            del remaining[step_id]
+        for needs in remaining.values():
+            needs.difference_update(ready)
+
+
+class PipelineRunner:
+    """Run a pipeline of MCP calls as a DAG
+
+    Every step starts as soon as all steps it needs have succeeded, so independent branches
+    run concurrently across servers (bounded per server). Failed attempts are retried with
+    exponential backoff, each attempt has its own timeout. Steps after a failed step are
+    skipped.
+    """
+
+    def __init__(self, mcp_manager, supervisor=None, max_concurrency_per_server: int = 4):
+        """Initialize pipeline runner
+
+        Args:
+            mcp_manager: MCP client manager used to look up clients by server name
+            supervisor: Optional MCPSupervisor, calls to supervised servers wait out reconnects
+            max_concurrency_per_server: Maximum steps in flight per server
+        """
+        self.mcp_manager = mcp_manager
+        self.supervisor = supervisor
+        self.max_concurrency_per_server = max_concurrency_per_server
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._start = 0.0
+
+    def _semaphore(self, server: str) -> asyncio.Semaphore:
+        if server not in self._semaphores:
+            self._semaphores[server] = asyncio.Semaphore(self.max_concurrency_per_server)
+        return self._semaphores[server]
+
+    def _elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    async def run(self, steps: Dict[str, Step]) -> Dict[str, Any]:
+        """Run all steps
+
+        Returns:
+            Dict[str, Any]: Summary with counts, total time and the critical path
+        """
+        self._start = time.perf_counter()
+        done: Dict[str, asyncio.Future] = {
+            step_id: asyncio.get_running_loop().create_future() for step_id in steps
+        }
+
+        async def run_node(step: Step) -> None:
+            try:
+                await asyncio.gather(*(done[need] for need in step.needs))
+                failed = [need for need in step.needs if steps[need].status != "ok"]
+                if failed:
+                    step.status = "skipped"
+                    step.error = f"Needs failed step(s): {', '.join(failed)}"
+                else:
+                    await self._run_step(step, steps)
+            finally:
+                done[step.id].set_result(None)
+            self._print_step(step)
+
+        with tracer.span("pipeline", category="pipeline", steps=len(steps)):
+            await asyncio.gather(*(run_node(step) for step in steps.values()))
+
+        summary = {status: 0 for status in ("ok", "failed", "skipped")}
+        for step in steps.values():
+            summary[step.status] += 1
+        summary["elapsed_ms"] = self._elapsed_ms()
+        summary["critical_path"] = critical_path(steps)
+        return summary
+
+    async def _run_step(self, step: Step, steps: Dict[str, Step]) -> None:
+        """Run a step with retries, the outcome is recorded on the step"""
+        with tracer.span(
+            "pipeline.step", category="pipeline", step=step.id, server=step.server
+        ) as span:
+            step.start_ms = self._elapsed_ms()
+            step.status = "running"
+            try:
+                args = resolve_references(step.args, steps)
+                name = resolve_references(step.name, steps)
+            except Exception as e:
+                step.status, step.error = "failed", f"Invalid reference: {e}"
+                step.end_ms = self._elapsed_ms()
+                return
+
+            for attempt in range(step.retries + 1):
+                step.attempts = attempt + 1
+                try:
+                    step.output = await self._call(step, name, args)
+                    step.status, step.error = "ok", None
+                    break
+                except asyncio.TimeoutError:
+                    step.error = f"Timed out after {step.timeout:g}s"
+                except Exception as e:
+                    step.error = str(e) or type(e).__name__
+                logger.warning(
+                    f"Pipeline step {step.id} attempt {attempt + 1} failed: {step.error}"
+                )
+                if attempt < step.retries:
+                    await asyncio.sleep(step.retry_delay * 2**attempt)
+            else:
+                step.status = "failed"
+            step.end_ms = self._elapsed_ms()
+            span.set(status=step.status, attempts=step.attempts)
+
+    async def _call(self, step: Step, name: str, args: Any) -> str:
+        """One attempt of a step"""
+        client = self.mcp_manager.get_client(step.server)
+        if not client:
+            raise LookupError(f"MCP client not found: {step.server}")
+        supervised = self.supervisor and self.supervisor.supervises(step.server)
+        if not supervised and not client.session:
+            raise LookupError(f"MCP server not connected: {step.server}")
+
+        async def request():
+            if step.kind == "resource":
+                return str(await client.read_resource(name))
+            if step.kind == "prompt":
+                return str(await client.get_prompt(name, {k: str(v) for k, v in args.items()}))
+            result = await client.call_tool(name, args)
+            text = tool_result_text(result)
+            if getattr(result, "isError", False):
+                raise RuntimeError(text)
+            return text
+
+        async with self._semaphore(step.server):
+            if supervised:
+                call = self.supervisor.call(
+                    step.server,
+                    request,
+                    idempotent=self.supervisor.is_idempotent(step.server, step.kind, name),
+                )
+            else:
+                call = request()
+            return await asyncio.wait_for(call, timeout=step.timeout)
+
+    def _print_step(self, step: Step) -> None:
+        style = {"ok": "green", "failed": "red", "skipped": "yellow"}.get(step.status, "white")
+        timing = f" in {step.duration_ms:.0f} ms" if step.duration_ms is not None else ""
+        retries = f" after {step.attempts} attempts" if step.attempts > 1 else ""
+        error = f": {step.error}" if step.error else ""
+        console.print(
+            f"{step.id}: {step.status}{timing}{retries}{error}",
+            style=TABLE_STYLE[style],
+            markup=False,
+        )
+
+
+def resolve_references(value: Any, steps: Dict[str, Step]) -> Any:
+    """Replace ${step} references with step outputs
+
+    A string that is a single reference takes the referenced value as is (e.g. a list from
+    ${step.items}), references inside longer strings are formatted into them.
+    """
+    if isinstance(value, dict):
+        return {key: resolve_references(item, steps) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_references(item, steps) for item in value]
+    if not isinstance(value, str):
+        return value
+
+    def lookup(match: re.Match) -> Any:
+        output = steps[match.group(1)].output
+        if not match.group(2):
+            return output
+        data = json.loads(output)
+        for key in match.group(2)[1:].split("."):
+            data = data[int(key)] if isinstance(data, list) else data[key]
+        return data
+
+    whole = REFERENCE_PATTERN.fullmatch(value)
+    if whole:
+        return lookup(whole)
+
+    def substitute(match: re.Match) -> str:
+        data = lookup(match)
+        return data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+
+    return REFERENCE_PATTERN.sub(substitute, value)
+
+
+def critical_path(steps: Dict[str, Step]) -> List[str]:
+    """Chain of steps that determined the end of the run
+
+    Starts at the step that finished last and walks back through the need that finished
+    last, i.e. the one each step had to wait for.
+    """
+    finished = [step for step in steps.values() if step.end_ms is not None]
+    if not finished:
+        return []
+    step = max(finished, key=lambda s: s.end_ms)
+    path = [step.id]
+    while step.needs:
+        step = max((steps[need] for need in step.needs), key=lambda s: s.end_ms or 0)
+        path.append(step.id)
+    return path[::-1]
+
+
+def print_report(steps: Dict[str, Step], summary: Dict[str, Any], width: int = 30) -> None:
+    """Print per-step timings with a timeline bar, and the critical path"""
+    total_ms = max(summary["elapsed_ms"], 1)
+    critical = set(summary["critical_path"])
+    table = Table(
+        title="Pipeline Report",
+        box=TABLE_STYLE["box"],
+        title_style=TABLE_STYLE["table.title"],
+        header_style=TABLE_STYLE["table.header"],
+        border_style=TABLE_STYLE["table.border"],
+        caption=f"Critical path: {' → '.join(summary['critical_path']) or '-'}",
+    )
+    table.add_column("Step", style="cyan")
+    table.add_column("Server", style="yellow")
+    table.add_column("Status")
+    table.add_column("Start", justify="right")
+    table.add_column("Duration", justify="right")
+    table.add_column("Attempts", justify="right")
+    table.add_column("Timeline")
+
+    for step in steps.values():
+        bar = Text(" " * width)
+        if step.duration_ms is not None:
+            begin = int(step.start_ms / total_ms * width)
+            length = max(1, round(step.duration_ms / total_ms * width))
+            bar = Text(" " * begin) + Text(
+                "█" * min(length, width - begin), style="red" if step.id in critical else "green"
+            )
+        status_style = {"ok": "green", "failed": "red", "skipped": "yellow"}.get(step.status)
+        table.add_row(
+            f"{step.id} *" if step.id in critical else step.id,
+            step.server,
+            Text(step.status, style=status_style or ""),
+            f"{step.start_ms:.0f} ms" if step.start_ms is not None else "-",
+            f"{step.duration_ms:.0f} ms" if step.duration_ms is not None else "-",
+            str(step.attempts),
+            bar,
+        )
+    console.print(table)
+
+    path_ms = sum(steps[step_id].duration_ms or 0 for step_id in summary["critical_path"])
+    console.print(
+        f"\n{summary['ok']} ok, {summary['failed']} failed, {summary['skipped']} skipped in "
+        f"{summary['elapsed_ms']:.0f} ms, critical path {path_ms:.0f} ms",
+        style=TABLE_STYLE["green" if not summary["failed"] else "red"],
+    )
+
+
+async def run_pipeline(host, args) -> bool:
+    """Initialize the host and run the pipeline file given on the command line"""
+    pipeline_path = Path(args.pipeline)
+    try:
+        steps = load_pipeline(pipeline_path)
+    except Exception as e:
+        console.print(f"\n❌ Failed to load pipeline: {e}", style=TABLE_STYLE["error"])
+        return False
+
+    # Steps run concurrently, so connections are owned by warm-up tasks as in batch mode
+    host.warmup_enabled = True
+    if not await host.init_clients():
+        console.print("\n❌ Failed to initialize clients", style=TABLE_STYLE["error"])
+        return False
+
+    try:
+        await host.wait_for_mcp()
+        unknown = {step.server for step in steps.values()} - set(host.mcp_manager.get_all_clients())
+        if unknown:
+            console.print(
+                f"\n❌ Unknown MCP server(s): {', '.join(sorted(unknown))}",
+                style=TABLE_STYLE["error"],
+            )
+            return False
+
+        console.print(
+            f"\nRunning pipeline {pipeline_path.name} ({len(steps)} step(s))",
+            style=TABLE_STYLE["cyan"],
+        )
+        runner = PipelineRunner(
+            host.mcp_manager,
+            supervisor=host.mcp_supervisor,
+            max_concurrency_per_server=host.settings["placeholders"]["max_concurrency_per_server"],
+        )
+        summary = await runner.run(steps)
+    except Exception as e:
+        console.print(f"\n❌ Pipeline failed: {e}", style=TABLE_STYLE["error"])
+        logger.error(f"Pipeline failed: {e}")
+        return False
+    finally:
+        await host.cleanup_resources()
+
+    print_report(steps, summary)
+    if args.output:
+        report = {
+            "pipeline": str(pipeline_path),
+            "summary": summary,
+            "steps": [step.to_dict() for step in steps.values()],
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        console.print(f"Report written to {args.output}", style=TABLE_STYLE["info"])
+    return summary["failed"] == 0 and summary["skipped"] == 0
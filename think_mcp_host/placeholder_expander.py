@@ -0,0 +1,462 @@
+import asyncio
+import fnmatch
+import re
+import time
+import urllib.parse
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from think_llm_client.utils.logger import logging
+from think_llm_client.utils.terminal_config import TABLE_STYLE, console
+
+from think_mcp_host.agent import tool_result_text
+from think_mcp_host.result_cache import result_key
+from think_mcp_host.tracing import tracer
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+# Same placeholder syntax as MCPProcessor.process_text
+PLACEHOLDER_PATTERNS = {
+    "resource": re.compile(r"->mcp_resources\s*\[([^\]]+)\]\s*:\s*(\S+)"),
+    "prompt": re.compile(r"->mcp_prompts\s*\[([^\]]+)\]\s*:\s*(\S+)(?:\s*\{([^}]+)\})?"),
+    "tool": re.compile(r"->mcp_tools\s*\[([^\]]+)\]\s*:\s*(\S+)(?:\s*\{([^}]+)\})?"),
+    # Retrieval over resources: only the chunks relevant to the message are inserted
+    "rag": re.compile(r"->mcp_rag\s*\[([^\]]+)\]\s*:\s*(\S+)"),
+}
+
+# Characters URIs keep when written into a placeholder, so decoded_name gives them back
+URI_SAFE_CHARS = ":/?&=#@+,;~*'()[]!$"
+
+# A standalone ->mcp means the message is still being composed
+STANDALONE_MCP_PATTERN = re.compile(r"(?<=\s)->mcp(?=\s)")
+
+
+class ToolCallError(Exception):
+    """A tool call completed but the tool reported an error (isError)"""
+
+
+@dataclass(frozen=True)
+class Placeholder:
+    """A parsed ->mcp_* placeholder, identical placeholders compare equal"""
+
+    kind: str  # resource / prompt / tool / rag
+    server: str
+    name: str  # Name or URI as written (may be URL-encoded)
+    params: Tuple[Tuple[str, str], ...] = ()
+
+    @property
+    def decoded_name(self) -> str:
+        return urllib.parse.unquote(self.name)
+
+
+def parse_parameters(params_str: Optional[str]) -> Dict[str, str]:
+    """Parse "{key:value,key2:value2}" into a dict, same format as MCPProcessor"""
+    if not params_str:
+        return {}
+    params_str = params_str.strip("{ }")
+    params = {}
+    for pair in params_str.split(","):
+        if ":" not in pair:
+            continue
+        key, value = pair.split(":", 1)
+        params[key.strip()] = value.strip()
+    return params
+
+
+def parse_placeholders(text: str) -> List[Tuple[int, int, Placeholder]]:
+    """Find all placeholders in the text
+
+    Args:
+        text: Input text
+
+    Returns:
+        List[Tuple[int, int, Placeholder]]: (start, end, placeholder) sorted by position,
+        overlapping matches are dropped in favour of the earliest one
+    """
+    matches = []
+    for kind, pattern in PLACEHOLDER_PATTERNS.items():
+        for match in pattern.finditer(text):
+            server, full_name = match.group(1), match.group(2)
+            name, params = full_name, {}
+            if "{" in full_name:
+                name = full_name[: full_name.index("{")]
+                params = parse_parameters(full_name[full_name.index("{") :])
+            # Parameters may also be separated from the name by whitespace
+            if pattern.groups >= 3 and match.group(3):
+                params.update(parse_parameters(match.group(3)))
+            placeholder = Placeholder(kind, server, name, tuple(sorted(params.items())))
+            matches.append((match.start(), match.end(), placeholder))
+
+    matches.sort(key=lambda item: item[0])
+    placeholders = []
+    last_end = -1
+    for start, end, placeholder in matches:
+        if start >= last_end:
+            placeholders.append((start, end, placeholder))
+            last_end = end
+    return placeholders
+
+
+class PlaceholderExpander:
+    """Resolve all placeholders of a message concurrently
+
+    Placeholders are parsed up front and deduplicated, resolved in parallel with a
+    concurrency limit and a timeout per server, then spliced back in their original order.
+    """
+
+    def __init__(
+        self,
+        mcp_manager,
+        max_concurrency_per_server: int = 4,
+        timeout: float = 30,
+        result_cache=None,
+    ):
+        """Initialize placeholder expander
+
+        Args:
+            mcp_manager: MCP client manager used to look up clients by server name
+            max_concurrency_per_server: Maximum requests in flight per server
+            timeout: Timeout in seconds of a single placeholder
+            result_cache: Optional ResultCache for idempotent reads and tool calls
+        """
+        self.mcp_manager = mcp_manager
+        self.result_cache = result_cache
+        self.max_concurrency_per_server = max_concurrency_per_server
+        self.timeout = timeout
+        # Refuse servers without a live session instead of connecting them lazily, for hosts
+        # where connections are owned by warm-up tasks (batch, serve)
+        self.require_connected = False
+        # Optional MCPSupervisor, requests to supervised servers wait out reconnects
+        self.supervisor = None
+        # Optional PayloadStore, large contents are replaced by a reference and an excerpt
+        self.payload_store = None
+        # Optional ResourceIndex, required by ->mcp_rag placeholders
+        self.resource_index = None
+        # Resources read for one ->mcp_rag glob at most
+        self.rag_max_resources = 50
+        # Optional PlaceholderPrefetcher, its fetches started while typing are used first
+        self.prefetcher = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._connect_locks: Dict[str, asyncio.Lock] = {}
+        self._connect_errors: Dict[str, str] = {}
+        # Servers connected by connect(), their connections are nested in the caller's task
+        self.connected: List[str] = []
+
+    def _semaphore(self, server: str) -> asyncio.Semaphore:
+        if server not in self._semaphores:
+            self._semaphores[server] = asyncio.Semaphore(self.max_concurrency_per_server)
+        return self._semaphores[server]
+
+    async def expand(self, text: str, *, preview: bool = True) -> str:
+        """Replace all placeholders in the text with their content
+
+        Args:
+            text: Input text
+            preview: Whether to print the processed content when it changed
+
+        Returns:
+            str: Text with placeholders resolved, unresolved placeholders are kept as is
+        """
+        if STANDALONE_MCP_PATTERN.search(text):
+            return text
+
+        placeholders = parse_placeholders(text)
+        if not placeholders:
+            return text
+
+        unique = list(dict.fromkeys(placeholder for _, _, placeholder in placeholders))
+        await self.connect(dict.fromkeys(placeholder.server for placeholder in unique))
+        # Retrieval placeholders search for the rest of the message
+        query = " ".join(
+            text[previous_end:match_start]
+            for previous_end, match_start in zip(
+                [0] + [end for _, end, _ in placeholders],
+                [start for start, _, _ in placeholders] + [len(text)],
+            )
+        )
+        start = time.perf_counter()
+        with tracer.span("expand", category="mcp", placeholders=len(unique)):
+            contents = await asyncio.gather(
+                *(self.resolve(placeholder, query=query) for placeholder in unique)
+            )
+        resolved = dict(zip(unique, contents))
+        logger.info(
+            f"Resolved {len(unique)} unique placeholder(s) of {len(placeholders)} "
+            f"in {(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+
+        pieces = []
+        position = 0
+        for match_start, match_end, placeholder in placeholders:
+            content = resolved[placeholder]
+            pieces.append(text[position:match_start])
+            pieces.append(content if content else text[match_start:match_end])
+            position = match_end
+        pieces.append(text[position:])
+        result = "".join(pieces)
+
+        if preview and result != text:
+            console.print("\nProcessed content preview:", style="bold green")
+            console.print(result, markup=False)
+        return result
+
+    async def connect(self, servers) -> None:
+        """Connect the servers that aren't connected yet, one after another in this task
+
+        A stdio connection has to be closed by the task that opened it, so servers are
+        connected here rather than lazily from the short-lived tasks placeholders are
+        resolved in. Failures are reported when their placeholders are resolved.
+        """
+        for server in servers:
+            client = self.mcp_manager.get_client(server)
+            if not client or client.session or self.require_connected:
+                continue
+            if self.supervisor and self.supervisor.supervises(server):
+                continue
+            # Concurrent expansions wait for the same connection
+            async with self._connect_locks.setdefault(server, asyncio.Lock()):
+                if client.session:
+                    continue
+                try:
+                    await asyncio.wait_for(client.init_client(), timeout=self.timeout)
+                    self._connect_errors.pop(server, None)
+                    if server in self.connected:
+                        self.connected.remove(server)
+                    self.connected.append(server)
+                except Exception as e:
+                    self._connect_errors[server] = str(e) or type(e).__name__
+                    logger.error(f"Failed to connect MCP server {server}: {e}")
+
+    async def close(self) -> None:
+        """Close the connections opened by connect(), the newest first as their nesting requires"""
+        while self.connected:
+            client = self.mcp_manager.get_client(self.connected.pop())
+            if client and client.session:
+                await client.cleanup()
+
+    async def resolve(self, placeholder: Placeholder, query: str = "") -> Optional[str]:
+        """Resolve a single placeholder, errors are reported on the console
+
+        Args:
+            placeholder: Placeholder to resolve
+            query: Text that ->mcp_rag placeholders retrieve chunks for
+
+        Returns:
+            Optional[str]: The content, or None if it could not be resolved
+        """
+        try:
+            if placeholder.kind == "rag":
+                return await self.retrieve(placeholder, query)
+            prefetched = self.prefetcher.take(placeholder) if self.prefetcher else None
+            if prefetched is not None:
+                return await prefetched
+            return await self.fetch(placeholder)
+        except asyncio.TimeoutError:
+            console.print(
+                f"Timed out after {self.timeout:g}s resolving {placeholder.kind} "
+                f"{placeholder.decoded_name} on {placeholder.server}",
+                style=TABLE_STYLE["error"],
+            )
+            logger.error(f"Placeholder timed out: {placeholder}")
+        except Exception as e:
+            console.print(
+                f"Error occurred while resolving MCP placeholder: {e}", style=TABLE_STYLE["error"]
+            )
+            logger.error(f"Error resolving placeholder {placeholder}: {e}")
+        return None
+
+    async def fetch(self, placeholder: Placeholder) -> Optional[str]:
+        """Resolve a single placeholder through the result cache, per-server limit and timeout
+
+        Raises:
+            LookupError: Unknown server, prompt or tool
+            ToolCallError: The tool reported an error
+            asyncio.TimeoutError: The server didn't answer in time
+        """
+        with tracer.span(
+            "mcp.fetch",
+            category="mcp",
+            server=placeholder.server,
+            kind=placeholder.kind,
+            target=placeholder.decoded_name,
+        ) as span:
+            return await self._fetch_traced(placeholder, span)
+
+    async def _fetch_traced(self, placeholder: Placeholder, span) -> Optional[str]:
+        client = self.mcp_manager.get_client(placeholder.server)
+        if not client:
+            raise LookupError(f"MCP client not found: {placeholder.server}")
+        supervised = self._check_connected(placeholder.server, client)
+
+        cache_key, ttl = None, None
+        if self.result_cache:
+            ttl = self.result_cache.policy.ttl(
+                placeholder.server, placeholder.kind, placeholder.decoded_name
+            )
+        if ttl is not None:
+            cache_key = result_key(
+                placeholder.server,
+                placeholder.kind,
+                placeholder.decoded_name,
+                dict(placeholder.params),
+                self.result_cache.policy.config_hash(placeholder.server),
+            )
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Result cache hit: {placeholder}")
+                span.set(cache="hit")
+                return cached
+            span.set(cache="miss")
+
+        start = time.perf_counter()
+        async with self._semaphore(placeholder.server):
+            if supervised:
+                request = self.supervisor.call(
+                    placeholder.server,
+                    lambda: self._fetch(client, placeholder),
+                    idempotent=self.supervisor.is_idempotent(
+                        placeholder.server, placeholder.kind, placeholder.decoded_name
+                    ),
+                )
+            else:
+                request = self._fetch(client, placeholder)
+            content = await asyncio.wait_for(request, timeout=self.timeout)
+        if self.payload_store and content:
+            content = await asyncio.to_thread(
+                self.payload_store.spill,
+                content,
+                f"{placeholder.kind} {placeholder.decoded_name} on {placeholder.server}",
+            )
+        if cache_key and content:
+            self.result_cache.put(
+                cache_key,
+                placeholder.server,
+                placeholder.kind,
+                placeholder.decoded_name,
+                content,
+                ttl,
+                fetch_ms=(time.perf_counter() - start) * 1000,
+            )
+        return content
+
+    def _check_connected(self, server: str, client) -> bool:
+        """Whether the server is supervised, requests never connect a server lazily
+
+        Raises:
+            LookupError: The server isn't supervised and wasn't connected by connect()
+        """
+        if self.supervisor and self.supervisor.supervises(server):
+            return True
+        if not client.session:
+            error = self._connect_errors.get(server)
+            raise LookupError(
+                f"MCP server not connected: {server}" + (f" ({error})" if error else "")
+            )
+        return False
+
+    async def retrieve(self, placeholder: Placeholder, query: str) -> Optional[str]:
+        """Resolve a ->mcp_rag placeholder: the chunks of its resources most relevant to query
+
+        The resources (a URI or a glob over the server's resource URIs) are read like
+        ->mcp_resources placeholders, through the result cache, and re-indexed when their
+        content changed.
+
+        Raises:
+            LookupError: Retrieval disabled, unknown server, or no resource matches
+        """
+        if not self.resource_index:
+            raise LookupError("Resource retrieval is disabled (rag.enabled in settings)")
+        client = self.mcp_manager.get_client(placeholder.server)
+        if not client:
+            raise LookupError(f"MCP client not found: {placeholder.server}")
+        supervised = self._check_connected(placeholder.server, client)
+
+        with tracer.span(
+            "mcp.retrieve",
+            category="mcp",
+            server=placeholder.server,
+            target=placeholder.decoded_name,
+        ) as span:
+            pattern = placeholder.decoded_name
+            if any(char in pattern for char in "*?["):
+                if supervised:
+                    request = self.supervisor.call(
+                        placeholder.server, client.list_resources, idempotent=True
+                    )
+                else:
+                    request = client.list_resources()
+                resources = await asyncio.wait_for(request, timeout=self.timeout)
+                uris = [r.uri for r in resources if fnmatch.fnmatchcase(r.uri, pattern)]
+                if len(uris) > self.rag_max_resources:
+                    logger.warning(
+                        f"{len(uris)} resources match {pattern}, "
+                        f"only the first {self.rag_max_resources} are searched"
+                    )
+                    uris = uris[: self.rag_max_resources]
+            else:
+                uris = [pattern]
+            if not uris:
+                raise LookupError(f"No resource matches {pattern} on {placeholder.server}")
+
+            contents = await asyncio.gather(
+                *(
+                    self.resolve(
+                        Placeholder(
+                            "resource",
+                            placeholder.server,
+                            urllib.parse.quote(uri, safe=URI_SAFE_CHARS),
+                        )
+                    )
+                    for uri in uris
+                )
+            )
+            documents = {uri: content for uri, content in zip(uris, contents) if content}
+            if not documents:
+                return None
+
+            def index_and_search():
+                for uri, content in documents.items():
+                    if self.payload_store:
+                        content = self.payload_store.load(content)
+                    self.resource_index.update(placeholder.server, uri, content)
+                return self.resource_index.search(placeholder.server, list(documents), query)
+
+            chunks = await asyncio.to_thread(index_and_search)
+            span.set(resources=len(documents), chunks=len(chunks))
+
+        sections = [
+            f"--- {chunk.uri} (chunk {chunk.ordinal + 1}/{chunk.chunks}) ---\n{chunk.text}"
+            for chunk in chunks
+        ]
+        return (
+            f"[{len(chunks)} relevant chunk(s) of {len(documents)} resource(s) "
+            f"on {placeholder.server}]\n" + "\n\n".join(sections)
+        )
+
+    async def _fetch(self, client, placeholder: Placeholder) -> Optional[str]:
+        """Fetch the content of a placeholder from its server"""
+        name = placeholder.decoded_name
+        params = dict(placeholder.params)
+
+        if placeholder.kind == "resource":
+            content = await client.read_resource(name)
+            return str(content) if content else None
+
+        if placeholder.kind == "prompt":
+            prompts = await client.list_prompts()
+            if not any(p.name in (name, placeholder.name) for p in prompts):
+                raise LookupError(f"Prompt not found: {name}")
+            content = await client.get_prompt(name, params)
+            return str(content) if content else None
+
+        tools = await client.list_tools()
+        if not any(t.name in (name, placeholder.name) for t in tools):
+            raise LookupError(f"Tool not found: {name}")
+        tool_result = await client.call_tool(name, params)
+        if not tool_result:
+            return None
+        text = tool_result_text(tool_result)
+        if getattr(tool_result, "isError", False):
+            raise ToolCallError(f"Tool {name} failed: {text}")
+        return text
@@ -0,0 +1,137 @@
+import asyncio
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from think_llm_client.utils.logger import logging
+
+from think_mcp_host.placeholder_expander import Placeholder, parse_placeholders
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+
+class PlaceholderPrefetcher:
+    """Resolve placeholders of the message being typed before it is sent
+
+    Watches the prompt buffer and, once typing pauses, starts fetching the complete
+    ->mcp_resources placeholders and the ->mcp_tools placeholders of read-only tools (the
+    tools the MCP config allows to cache). The expander takes the fetches on submit instead
+    of starting its own. Fetches of placeholders removed from the text are cancelled, and
+    results older than max_age are discarded. Only servers that are already connected are
+    fetched from, typing never opens connections.
+    """
+
+    def __init__(
+        self,
+        expander,
+        policy=None,
+        delay: float = 0.3,
+        max_age: float = 60,
+        max_pending: int = 8,
+    ):
+        """Initialize placeholder prefetcher
+
+        Args:
+            expander: PlaceholderExpander that fetches and later takes the results
+            policy: Optional CachePolicy, tools it allows to cache are prefetched
+            delay: Seconds without typing before placeholders are fetched
+            max_age: Seconds after which a prefetched result is no longer used
+            max_pending: Maximum prefetches kept at once
+        """
+        self.expander = expander
+        self.policy = policy
+        self.delay = delay
+        self.max_age = max_age
+        self.max_pending = max_pending
+        self.started = 0
+        self.used = 0
+        self._prefetches: Dict[Placeholder, Tuple[asyncio.Task, float]] = {}
+        self._session = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def attach(self, session) -> None:
+        """Watch the default buffer of a PromptSession"""
+        self._session = session
+        session.default_buffer.on_text_changed += self._on_change
+        session.default_buffer.on_cursor_position_changed += self._on_change
+
+    def _on_change(self, buffer) -> None:
+        if self._timer:
+            self._timer.cancel()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._timer = loop.call_later(self.delay, self._update, buffer)
+
+    def _update(self, buffer) -> None:
+        """Match the prefetches to the placeholders currently in the buffer"""
+        self._timer = None
+        # The message was sent in the meantime, the expander resolves it
+        if not self._session or not self._session.app.is_running:
+            return
+        document = buffer.document
+        present: Set[Placeholder] = set()
+        wanted = []
+        for start, end, placeholder in parse_placeholders(document.text):
+            present.add(placeholder)
+            # Still being typed
+            if start <= document.cursor_position <= end:
+                continue
+            if placeholder not in self._prefetches and self._eligible(placeholder):
+                wanted.append(placeholder)
+
+        for placeholder in [p for p in self._prefetches if p not in present]:
+            task, _ = self._prefetches.pop(placeholder)
+            task.cancel()
+        for placeholder in wanted:
+            if len(self._prefetches) >= self.max_pending:
+                break
+            task = asyncio.create_task(self.expander.fetch(placeholder))
+            # Errors surface when the result is taken, or not at all
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._prefetches[placeholder] = (task, time.monotonic())
+            self.started += 1
+            logger.info(f"Prefetching {placeholder}")
+
+    def _eligible(self, placeholder: Placeholder) -> bool:
+        """Resource reads and read-only tool calls of connected servers"""
+        if placeholder.kind == "tool":
+            if self.policy is None:
+                return False
+            if self.policy.ttl(placeholder.server, "tool", placeholder.decoded_name) is None:
+                return False
+        elif placeholder.kind != "resource":
+            return False
+        client = self.expander.mcp_manager.get_client(placeholder.server)
+        return bool(client and client.session)
+
+    def take(self, placeholder: Placeholder) -> Optional[asyncio.Task]:
+        """The prefetch of a placeholder, None if there is no usable one
+
+        Failed and expired prefetches are dropped so the placeholder is fetched again.
+        """
+        entry = self._prefetches.pop(placeholder, None)
+        if entry is None:
+            return None
+        task, started = entry
+        failed = task.done() and (task.cancelled() or task.exception() is not None)
+        if failed or time.monotonic() - started > self.max_age:
+            task.cancel()
+            return None
+        self.used += 1
+        logger.info(
+            f"Using prefetched {placeholder} "
+            f"({'ready' if task.done() else 'in flight'}, "
+            f"started {time.monotonic() - started:.1f}s before submit)"
+        )
+        return task
+
+    def clear(self) -> None:
+        """Cancel all prefetches"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        for task, _ in self._prefetches.values():
+            task.cancel()
+        self._prefetches.clear()
@@ -0,0 +1,287 @@
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from think_llm_client.utils.logger import logging
+
+from think_mcp_host.utils.settings import HOST_DIR
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    server TEXT NOT NULL,
+    uri TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    chunks INTEGER NOT NULL,
+    used_at REAL NOT NULL,
+    UNIQUE (server, uri)
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    document_id INTEGER NOT NULL,
+    ordinal INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_document ON chunks (document_id);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    text, content = 'chunks', content_rowid = 'id', tokenize = 'unicode61'
+);
+"""
+
+# Query terms used from a message, the longest are kept
+MAX_QUERY_TERMS = 32
+
+# BM25 parameters of the fallback ranking, same as FTS5's bm25()
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD = re.compile(r"\w+")
+
+
+@dataclass
+class Chunk:
+    """A retrieved piece of a resource"""
+
+    uri: str
+    ordinal: int
+    chunks: int  # Number of chunks of the resource
+    text: str
+    score: float
+
+
+def chunk_text(text: str, chunk_chars: int) -> List[str]:
+    """Split text into chunks of about chunk_chars, on paragraph boundaries when possible"""
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if size and size + len(paragraph) > chunk_chars:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        # Paragraphs longer than a chunk are cut at the last whitespace before the limit
+        while len(paragraph) > chunk_chars:
+            cut = paragraph.rfind(" ", chunk_chars // 2, chunk_chars)
+            cut = cut if cut > 0 else chunk_chars
+            chunks.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        current.append(paragraph)
+        size += len(paragraph) + 2
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def query_terms(text: str) -> List[str]:
+    """Distinct words of a message, short ones dropped"""
+    words = dict.fromkeys(word for word in _WORD.findall(text.lower()) if len(word) > 1)
+    return sorted(words, key=len, reverse=True)[:MAX_QUERY_TERMS]
+
+
+class ResourceIndex:
+    """Persistent BM25 index of MCP resource chunks
+
+    Resources are split into chunks stored in SQLite with an FTS5 index, ranked with its
+    bm25() function. A resource is only re-chunked when the hash of its content changed, and
+    the least recently used resources are dropped beyond max_documents. Without FTS5 the
+    chunks of the requested resources are ranked with BM25 in Python.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        chunk_chars: int = 1500,
+        top_k: int = 5,
+        max_documents: int = 1000,
+    ):
+        """Initialize resource index
+
+        Args:
+            db_path: SQLite file, default is ~/.think-mcp-host/cache/resources.sqlite3
+            chunk_chars: Approximate size of a chunk
+            top_k: Number of chunks returned by search
+            max_documents: Number of resources kept in the index
+        """
+        self.db_path = db_path or HOST_DIR / "cache" / "resources.sqlite3"
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.chunk_chars = chunk_chars
+        self.top_k = top_k
+        self.max_documents = max_documents
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        try:
+            self._conn.executescript(_FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 unavailable, resource chunks are ranked in Python: {e}")
+            self.fts = False
+        self._conn.commit()
+
+    def update(self, server: str, uri: str, content: str) -> bool:
+        """Index the content of a resource unless it is unchanged
+
+        Returns:
+            bool: Whether the resource was (re)chunked
+        """
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, hash FROM documents WHERE server = ? AND uri = ?", (server, uri)
+            ).fetchone()
+            if row and row[1] == digest:
+                self._conn.execute("UPDATE documents SET used_at = ? WHERE id = ?", (now, row[0]))
+                self._conn.commit()
+                return False
+
+            start = time.perf_counter()
+            chunks = chunk_text(content, self.chunk_chars)
+            if row:
+                self._delete_chunks(row[0])
+                document_id = row[0]
+                self._conn.execute(
+                    "UPDATE documents SET hash = ?, chunks = ?, used_at = ? WHERE id = ?",
+                    (digest, len(chunks), now, document_id),
+                )
+            else:
+                document_id = self._conn.execute(
+                    "INSERT INTO documents (server, uri, hash, chunks, used_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (server, uri, digest, len(chunks), now),
+                ).lastrowid
+            for ordinal, text in enumerate(chunks):
+                chunk_id = self._conn.execute(
+                    "INSERT INTO chunks (document_id, ordinal, text) VALUES (?, ?, ?)",
+                    (document_id, ordinal, text),
+                ).lastrowid
+                if self.fts:
+                    self._conn.execute(
+                        "INSERT INTO chunks_fts (rowid, text) VALUES (?, ?)", (chunk_id, text)
+                    )
+            self._prune()
+            self._conn.commit()
+        logger.info(
+            f"Indexed {len(chunks)} chunk(s) of {uri} on {server} "
+            f"in {(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+        return True
+
+    def _delete_chunks(self, document_id: int) -> None:
+        if self.fts:
+            # External content tables are told which rows and texts go away
+            self._conn.execute(
+                "INSERT INTO chunks_fts (chunks_fts, rowid, text) "
+                "SELECT 'delete', id, text FROM chunks WHERE document_id = ?",
+                (document_id,),
+            )
+        self._conn.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+
+    def _prune(self) -> None:
+        """Drop the least recently used resources beyond max_documents"""
+        rows = self._conn.execute(
+            "SELECT id FROM documents ORDER BY used_at DESC LIMIT -1 OFFSET ?",
+            (self.max_documents,),
+        ).fetchall()
+        for (document_id,) in rows:
+            self._delete_chunks(document_id)
+            self._conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+
+    def search(
+        self, server: str, uris: List[str], query: str, top_k: Optional[int] = None
+    ) -> List[Chunk]:
+        """Chunks of the given resources most relevant to the query
+
+        Args:
+            server: Server name
+            uris: Resources to search, they must have been indexed with update()
+            query: Free text, usually the user's message
+            top_k: Number of chunks, default is the index's top_k
+
+        Returns:
+            List[Chunk]: Best chunks in resource and chunk order, the first chunks of the
+            resources when no term of the query matches
+        """
+        top_k = top_k or self.top_k
+        terms = query_terms(query)
+        placeholders = ",".join("?" * len(uris))
+        with self._lock:
+            chunks: List[Chunk] = []
+            if terms and self.fts:
+                rows = self._conn.execute(
+                    "SELECT d.uri, c.ordinal, d.chunks, c.text, bm25(chunks_fts) AS score "
+                    "FROM chunks_fts JOIN chunks c ON c.id = chunks_fts.rowid "
+                    "JOIN documents d ON d.id = c.document_id "
+                    f"WHERE chunks_fts MATCH ? AND d.server = ? AND d.uri IN ({placeholders}) "
+                    "ORDER BY score LIMIT ?",
+                    (" OR ".join(f'"{term}"' for term in terms), server, *uris, top_k),
+                ).fetchall()
+                # bm25() is negative, lower is better
+                chunks = [Chunk(*row[:4], score=-row[4]) for row in rows]
+            elif terms:
+                rows = self._conn.execute(
+                    "SELECT d.uri, c.ordinal, d.chunks, c.text FROM chunks c "
+                    "JOIN documents d ON d.id = c.document_id "
+                    f"WHERE d.server = ? AND d.uri IN ({placeholders})",
+                    (server, *uris),
+                ).fetchall()
+                chunks = _bm25([Chunk(*row, score=0.0) for row in rows], terms)[:top_k]
+            if not chunks:
+                rows = self._conn.execute(
+                    "SELECT d.uri, c.ordinal, d.chunks, c.text FROM chunks c "
+                    "JOIN documents d ON d.id = c.document_id "
+                    f"WHERE d.server = ? AND d.uri IN ({placeholders}) "
+                    "ORDER BY d.uri, c.ordinal LIMIT ?",
+                    (server, *uris, top_k),
+                ).fetchall()
+                chunks = [Chunk(*row, score=0.0) for row in rows]
+        return sorted(chunks, key=lambda chunk: (uris.index(chunk.uri), chunk.ordinal))
+
+    def stats(self) -> dict:
+        with self._lock:
+            documents, chunks = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(chunks), 0) FROM documents"
+            ).fetchone()
+        return {"documents": documents, "chunks": chunks, "fts": self.fts}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _bm25(chunks: List[Chunk], terms: List[str]) -> List[Chunk]:
+    """Rank chunks with BM25, chunks without any of the terms are dropped"""
+    if not chunks:
+        return []
+    counts = [Counter(_WORD.findall(chunk.text.lower())) for chunk in chunks]
+    lengths = [sum(count.values()) for count in counts]
+    average = sum(lengths) / len(lengths) or 1
+    frequencies = {term: sum(1 for count in counts if term in count) for term in terms}
+    for chunk, count, length in zip(chunks, counts, lengths):
+        chunk.score = 0.0
+        for term in terms:
+            tf = count.get(term, 0)
+            if not tf:
+                continue
+            idf = math.log(1 + (len(chunks) - frequencies[term] + 0.5) / (frequencies[term] + 0.5))
+            chunk.score += (
+                idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / average))
+            )
+    return sorted((chunk for chunk in chunks if chunk.score > 0), key=lambda c: -c.score)
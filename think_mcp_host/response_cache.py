@@ -0,0 +1,218 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from think_llm_client.utils.logger import logging
+
+from think_mcp_host.utils.settings import HOST_DIR
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+DEFAULT_DB_PATH = HOST_DIR / "cache" / "responses.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    reasoning TEXT,
+    content TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    latency_ms REAL NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access);
+"""
+
+
+@dataclass
+class CachedResponse:
+    reasoning: Optional[str]
+    content: str
+    latency_ms: float  # How long the original request took
+
+
+def _file_digest(path: str) -> str:
+    try:
+        with open(path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    except OSError:
+        return f"missing:{path}"
+
+
+class ResponseCache:
+    """Opt-in cache of LLM replies for replays and regression runs
+
+    A reply is keyed by a hash of everything the provider receives: provider, endpoint,
+    model, parameters, system prompt, the message history and the new message (images by
+    content). Replies are stored in a local SQLite file bounded by size, least recently
+    used first out. By default only models configured with temperature 0 are cached,
+    their replies are the ones expected to repeat. Stays inactive until start() is called.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.deterministic_only = True
+        self.db_path: Optional[Path] = None
+        self.max_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def start(
+        self, db_path: Optional[Path] = None, max_mb: float = 256, deterministic_only: bool = True
+    ) -> None:
+        """Open the cache
+
+        Args:
+            db_path: SQLite file, default is ~/.think-mcp-host/cache/responses.sqlite3
+            max_mb: Maximum total size of cached replies in megabytes
+            deterministic_only: Only cache models configured with temperature 0
+        """
+        if self.enabled:
+            return
+        self.db_path = Path(db_path) if db_path else DEFAULT_DB_PATH
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.deterministic_only = deterministic_only
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self.enabled = True
+
+    def key(self, llm_client, message: str, images: Optional[List[str]] = None) -> Optional[str]:
+        """Cache key of the request chat_stream would send, None if it isn't cacheable"""
+        if not self.enabled:
+            return None
+        try:
+            model_type = llm_client.current_model_type
+            provider_key = llm_client.current_provider
+            model = llm_client.current_model
+            provider = llm_client.model_types[model_type].providers[provider_key]
+            model_config = provider.model[model]
+        except (AttributeError, KeyError):
+            return None
+        temperature = model_config.temperature
+        # Anthropic reasoning models always run at temperature 1
+        if provider_key.lower() == "anthropic" and model_type == "reasoning":
+            temperature = 1.0
+        if self.deterministic_only and temperature != 0:
+            return None
+
+        request = {
+            "provider": provider_key,
+            "api_url": getattr(provider, "api_url", None),
+            "model_type": model_type,
+            "model": model,
+            "max_completion_tokens": model_config.max_completion_tokens,
+            "temperature": temperature,
+            "system_prompt": llm_client.system_prompt or None,
+            # reasoning_content is never sent back to the provider
+            "messages": [
+                {k: v for k, v in m.items() if k != "reasoning_content"}
+                for m in llm_client.messages
+            ],
+            "message": message,
+            "images": [_file_digest(path) for path in images or []],
+        }
+        payload = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Get a cached reply, or None if missing"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT reasoning, content, latency_ms FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ?, hits = hits + 1 WHERE key = ?",
+                (time.time(), key),
+            )
+            self._conn.commit()
+            self.hits += 1
+            self.saved_ms += row[2]
+        return CachedResponse(*row)
+
+    def put(
+        self, key: str, model: str, reasoning: Optional[str], content: str, latency_ms: float
+    ) -> None:
+        """Store a reply and evict the least recently used ones beyond the size limit"""
+        size = len(content.encode("utf-8")) + len((reasoning or "").encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, reasoning, content, size, latency_ms, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, reasoning, content, size, latency_ms, now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        ).fetchall():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> int:
+        """Remove all cached replies
+
+        Returns:
+            int: Number of removed replies
+        """
+        if not self.enabled:
+            return 0
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM responses").rowcount
+            self._conn.commit()
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "saved_ms": self.saved_ms,
+            "deterministic_only": self.deterministic_only,
+            "path": str(self.db_path),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+            self._conn = None
+            self.enabled = False
+
+
+# Global response cache, started by the host when enabled
+response_cache = ResponseCache()
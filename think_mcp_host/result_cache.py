@@ -0,0 +1,235 @@
+import fnmatch
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from think_llm_client.utils.logger import logging
+
+from think_mcp_host.capability_cache import server_config_hash
+from think_mcp_host.utils.settings import HOST_DIR
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    server TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    fetch_ms REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_results_last_access ON results (last_access);
+"""
+
+
+def result_key(
+    server: str,
+    kind: str,
+    name: str,
+    args: Optional[Dict[str, Any]] = None,
+    config_hash: str = "",
+) -> str:
+    """Content address of a request: (server, kind, name, canonicalized args, server config)
+
+    The hash of the server's config keeps results of a server whose command, args or env
+    changed from being served for the new one.
+    """
+    payload = json.dumps(
+        [server, kind, name, args or {}, config_hash], sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachePolicy:
+    """Per-server cacheability allowlist, read from the "cache" field of each MCP server config
+
+    Example:
+        "fs": {"command": "...", "cache": {"resources": true, "prompts": false,
+                                          "tools": ["search*", "list_*"], "ttl": 600}}
+
+    Nothing is cached for servers without a "cache" field: only the user knows which
+    resources are static and which tools are read-only.
+    """
+
+    def __init__(self, servers_config: Dict[str, Any], default_ttl: float):
+        self.default_ttl = default_ttl
+        self.config_hashes = {
+            name: server_config_hash(config) for name, config in servers_config.items()
+        }
+        self.rules = {
+            name: config.get("cache", {})
+            for name, config in servers_config.items()
+            if isinstance(config.get("cache"), dict)
+        }
+
+    @classmethod
+    def from_mcp_config(cls, config_path: Path, default_ttl: float) -> "CachePolicy":
+        try:
+            with open(config_path, "r", encoding="utf-8") as f:
+                servers_config = json.load(f).get("mcpServers", {})
+        except Exception as e:
+            logger.error(f"Failed to read MCP config for result cache policy: {e}")
+            servers_config = {}
+        return cls(servers_config, default_ttl)
+
+    def config_hash(self, server: str) -> str:
+        """Hash of a server's config, part of the key of its results"""
+        return self.config_hashes.get(server, "")
+
+    def ttl(self, server: str, kind: str, name: str) -> Optional[float]:
+        """TTL in seconds if the request is cacheable, otherwise None"""
+        rule = self.rules.get(server)
+        if not rule:
+            return None
+        allowed = rule.get(f"{kind}s", False)
+        if isinstance(allowed, list):
+            allowed = any(fnmatch.fnmatchcase(name, pattern) for pattern in allowed)
+        if not allowed:
+            return None
+        return float(rule.get("ttl", self.default_ttl))
+
+
+class ResultCache:
+    """Content-addressed cache of MCP resource reads, prompts and tool results
+
+    Persisted to a local SQLite file, bounded by TTL and by total size with
+    least-recently-used eviction.
+    """
+
+    def __init__(self, policy: CachePolicy, db_path: Optional[Path] = None, max_mb: float = 64):
+        """Initialize result cache
+
+        Args:
+            policy: Which requests may be cached and for how long
+            db_path: SQLite file, default is ~/.think-mcp-host/cache/results.sqlite3
+            max_mb: Maximum total size of cached values in megabytes
+        """
+        self.policy = policy
+        self.db_path = db_path or HOST_DIR / "cache" / "results.sqlite3"
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached value, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, fetch_ms FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+            # A hit saves the time the original request took
+            self.saved_ms += row[2]
+            self._conn.execute(
+                "UPDATE results SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(
+        self,
+        key: str,
+        server: str,
+        kind: str,
+        name: str,
+        value: str,
+        ttl: float,
+        fetch_ms: float = 0,
+    ) -> None:
+        """Store a value and evict entries beyond the TTL or size limit
+
+        Args:
+            key: Content address from result_key()
+            server: MCP server name
+            kind: resource / prompt / tool
+            name: Resource URI, prompt or tool name
+            value: Resolved content
+            ttl: Seconds before the entry expires
+            fetch_ms: How long the request took, counted as saved on every hit
+        """
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results "
+                "(key, server, kind, name, value, size, fetch_ms, created_at, expires_at, "
+                "last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, server, kind, name, value, size, fetch_ms, now, now + ttl, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until the cache fits again
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM results ORDER BY last_access"
+        ).fetchall():
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> int:
+        """Remove all cached results
+
+        Returns:
+            int: Number of removed entries
+        """
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM results").rowcount
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results WHERE expires_at > ?",
+                (time.time(),),
+            ).fetchone()
+            by_server = dict(
+                self._conn.execute(
+                    "SELECT server, COUNT(*) FROM results GROUP BY server ORDER BY server"
+                ).fetchall()
+            )
+        return {
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "saved_ms": self.saved_ms,
+            "by_server": by_server,
+            "path": str(self.db_path),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
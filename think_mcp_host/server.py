@@ -0,0 +1,522 @@
+import asyncio
+import json
+import secrets
+import time
+import uuid
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+from think_llm_client import LLMClient
+from think_llm_client.utils.logger import logging
+from think_llm_client.utils.terminal_config import TABLE_STYLE, console
+
+from think_mcp_host.batch import resolve_model
+from think_mcp_host.context_manager import ContextManager
+from think_mcp_host.llm_scheduler import llm_scheduler
+from think_mcp_host.mcp_supervisor import ConnectionLostError
+from think_mcp_host.placeholder_expander import Placeholder, ToolCallError
+from think_mcp_host.utils.llm_stream import stream_chat
+from think_mcp_host.utils.tokens import estimate_tokens
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+# Names a local server is reached by, other Host headers point at DNS rebinding
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+WILDCARD_HOSTS = ("0.0.0.0", "::", "")
+
+
+class APIError(Exception):
+    """Error returned to the API client with an HTTP status"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class ChatSession:
+    """Isolated conversation of one API client"""
+
+    id: str
+    llm_client: Any
+    context_manager: Optional[ContextManager]
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    created_at: float = field(default_factory=time.time)
+    last_active: float = field(default_factory=time.time)
+    turns: int = 0
+
+    def info(self) -> Dict[str, Any]:
+        llm = self.llm_client
+        return {
+            "id": self.id,
+            "model": f"{llm.current_model_type}/{llm.current_provider}/{llm.current_model}",
+            "system_prompt": llm.system_prompt,
+            "messages": len(llm.messages),
+            "turns": self.turns,
+            "busy": self.lock.locked(),
+            "created_at": self.created_at,
+            "last_active": self.last_active,
+        }
+
+
+class HostServer:
+    """Headless chat and tool API over one shared MCP client pool
+
+    Every session owns its LLM client, history, system prompt and model. All sessions
+    share the host's MCP connections, which are opened by the warm-up owner tasks and
+    used through the placeholder expander, so per-server concurrency limits, timeouts
+    and the result cache apply across sessions.
+    """
+
+    def __init__(
+        self,
+        host,
+        token: Optional[str] = None,
+        max_sessions: int = 100,
+        session_ttl: float = 3600,
+        bind_host: str = "127.0.0.1",
+        allowed_hosts: Iterable[str] = (),
+    ):
+        """Initialize host server
+
+        Args:
+            host: DestinyHost with clients initialized and MCP warm-up started
+            token: Bearer token required on every request, a random one is generated if None
+            max_sessions: Maximum concurrent sessions
+            session_ttl: Seconds of inactivity before a session is dropped
+            bind_host: Address the server is bound to, accepted in Host and Origin headers
+            allowed_hosts: Further host names accepted in Host and Origin headers
+        """
+        self.host = host
+        self.token_generated = not token
+        self.token = token or secrets.token_urlsafe(32)
+        self.allowed_hosts = {name.lower().strip("[]") for name in allowed_hosts}
+        if bind_host not in WILDCARD_HOSTS:
+            self.allowed_hosts.update(LOCAL_HOSTS)
+            self.allowed_hosts.add(bind_host.lower().strip("[]"))
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.sessions: Dict[str, ChatSession] = {}
+        self._reaper: Optional[asyncio.Task] = None
+
+    # Sessions
+
+    def create_session(
+        self, model: Optional[str] = None, system_prompt: Optional[str] = None
+    ) -> ChatSession:
+        if len(self.sessions) >= self.max_sessions:
+            raise APIError(429, f"Too many sessions (max {self.max_sessions})")
+        llm_client = LLMClient(config_path=self.host.llm_config_path)
+        self._set_model(llm_client, model)
+        llm_client.system_prompt = system_prompt
+
+        context_manager = None
+        context_settings = self.host.settings["context"]
+        if context_settings["enabled"]:
+            context_manager = ContextManager(
+                llm_config_path=self.host.llm_config_path,
+                default_budget=context_settings["default_budget"],
+                budgets=context_settings["budgets"],
+                max_message_tokens=context_settings["max_message_tokens"],
+                summarize=context_settings["summarize"],
+                summary_tokens=context_settings["summary_tokens"],
+            )
+        session = ChatSession(uuid.uuid4().hex, llm_client, context_manager)
+        self.sessions[session.id] = session
+        logger.info(f"Session created: {session.id} ({session.info()['model']})")
+        return session
+
+    def _set_model(self, llm_client, model: Optional[str]) -> None:
+        try:
+            llm_client.set_model(*resolve_model(llm_client, model))
+        except ValueError as e:
+            raise APIError(400, str(e))
+
+    def get_session(self, session_id: str) -> ChatSession:
+        session = self.sessions.get(session_id)
+        if not session:
+            raise APIError(404, f"Session not found: {session_id}")
+        return session
+
+    def close_session(self, session_id: str) -> None:
+        session = self.sessions.pop(session_id, None)
+        if session and session.context_manager:
+            session.context_manager.reset()
+        logger.info(f"Session closed: {session_id}")
+
+    async def _reap_idle_sessions(self) -> None:
+        while True:
+            await asyncio.sleep(min(60, self.session_ttl))
+            now = time.time()
+            for session_id, session in list(self.sessions.items()):
+                if not session.lock.locked() and now - session.last_active > self.session_ttl:
+                    self.close_session(session_id)
+
+    # Chat and tools
+
+    async def chat(self, session: ChatSession, message: str) -> AsyncIterator[Dict[str, Any]]:
+        """Run one turn of a session, yielding chunks and a final "done" or "error" event"""
+        if session.lock.locked():
+            raise APIError(409, "Session is busy with another turn")
+        async with session.lock:
+            session.last_active = time.time()
+            start = time.perf_counter()
+            expanded = await self.host.expand_placeholders(message, preview=False)
+            expand_ms = (time.perf_counter() - start) * 1000
+
+            llm_client = session.llm_client
+            ttft_ms = None
+            content_chunks, reasoning_chunks = [], []
+            llm_start = time.perf_counter()
+            if session.context_manager:
+                window = session.context_manager.window(llm_client, expanded)
+            else:
+                window = nullcontext({})
+            async with window as report:
+                async for chunk_type, chunk in stream_chat(llm_client, expanded):
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - llm_start) * 1000
+                    (reasoning_chunks if chunk_type == "reasoning" else content_chunks).append(
+                        chunk
+                    )
+                    yield {"type": chunk_type, "text": chunk}
+
+            session.last_active = time.time()
+            response = "".join(content_chunks)
+            if not response:
+                yield {
+                    "type": "error",
+                    "error": "Empty response from the model, see log for details",
+                }
+                return
+            session.turns += 1
+            yield {
+                "type": "done",
+                "expand_ms": expand_ms,
+                "ttft_ms": ttft_ms,
+                "latency_ms": (time.perf_counter() - start) * 1000,
+                "prompt_tokens": report.get("prompt_tokens"),
+                "completion_tokens": estimate_tokens("".join(reasoning_chunks))
+                + estimate_tokens(response),
+            }
+
+    async def list_capabilities(self) -> Dict[str, Any]:
+        """Tools, resources and prompts of every connected server"""
+        servers = {}
+        for name, client in self.host.mcp_manager.get_all_clients().items():
+            if not client.session:
+                servers[name] = {"status": "disconnected"}
+                continue
+            tools, resources, prompts = await asyncio.gather(
+                client.list_tools(),
+                client.list_resources(),
+                client.list_prompts(),
+                return_exceptions=True,
+            )
+            servers[name] = {
+                "status": "ready",
+                "tools": _describe(
+                    tools,
+                    lambda t: {
+                        "name": t.name,
+                        "description": t.description,
+                        "input_schema": t.input_schema,
+                    },
+                ),
+                "resources": _describe(resources, lambda r: {"uri": str(r.uri), "name": r.name}),
+                "prompts": _describe(
+                    prompts, lambda p: {"name": p.name, "description": p.description}
+                ),
+            }
+        return servers
+
+    async def fetch(self, kind: str, server: str, name: str, arguments: Dict[str, Any]) -> str:
+        """Read a resource, get a prompt or call a tool through the shared pool"""
+        placeholder = Placeholder(kind, server, name, tuple(sorted(arguments.items())))
+        try:
+            content = await self.host.placeholder_expander.fetch(placeholder)
+        except LookupError as e:
+            raise APIError(404, str(e))
+        except ToolCallError as e:
+            raise APIError(502, str(e))
+        except asyncio.TimeoutError:
+            raise APIError(504, f"Timed out calling {kind} {name} on {server}")
+        except ConnectionLostError as e:
+            raise APIError(503, str(e))
+        except Exception as e:
+            raise APIError(502, f"MCP error: {e}")
+        return content or ""
+
+    # HTTP API
+
+    def _allowed_host(self, value: Optional[str]) -> bool:
+        """Whether a Host header or Origin host names this server
+
+        A server bound to all interfaces can't tell its names, it only checks the
+        allowed_hosts setting when one is given.
+        """
+        if not self.allowed_hosts:
+            return True
+        if not value:
+            return False
+        try:
+            hostname = urlsplit(f"//{value}").hostname
+        except ValueError:
+            return False
+        return hostname in self.allowed_hosts
+
+    def _reject(self, headers) -> Optional[APIError]:
+        """Check the token and the Host and Origin headers of a request"""
+        if not secrets.compare_digest(headers.get("authorization", ""), f"Bearer {self.token}"):
+            return APIError(401, "Unauthorized")
+        if not self._allowed_host(headers.get("host")):
+            return APIError(421, "Unknown host")
+        # Browsers send the Origin of cross-site requests, other clients usually send none
+        origin = headers.get("origin")
+        if origin is not None and not (
+            origin != "null" and self._allowed_host(urlsplit(origin).netloc)
+        ):
+            return APIError(403, "Cross-origin requests are not allowed")
+        return None
+
+    def create_app(self):
+        """Create the Starlette application"""
+        from starlette.applications import Starlette
+        from starlette.responses import JSONResponse, StreamingResponse
+        from starlette.routing import Route, WebSocketRoute
+
+        def endpoint(handler):
+            async def wrapped(request):
+                rejected = self._reject(request.headers)
+                if rejected:
+                    return JSONResponse({"error": str(rejected)}, status_code=rejected.status)
+                try:
+                    return await handler(request)
+                except APIError as e:
+                    return JSONResponse({"error": str(e)}, status_code=e.status)
+                except json.JSONDecodeError:
+                    return JSONResponse({"error": "Invalid JSON body"}, status_code=400)
+
+            return wrapped
+
+        async def body(request) -> Dict[str, Any]:
+            # Only JSON, a form post of a cross-site page never gets this far
+            content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+            if content_type != "application/json":
+                raise APIError(415, "Expected Content-Type: application/json")
+            raw = await request.body()
+            data = json.loads(raw) if raw else {}
+            if not isinstance(data, dict):
+                raise APIError(400, "Expected a JSON object")
+            return data
+
+        async def health(request):
+            warmup = self.host.mcp_warmup
+            servers = (
+                {name: {"status": state.status} for name, state in warmup.servers.items()}
+                if warmup
+                else {}
+            )
+            supervisor = self.host.mcp_supervisor
+            if supervisor:
+                for name, health in supervisor.servers.items():
+                    servers.setdefault(name, {})["health"] = health.to_dict()
+            return JSONResponse(
+                {
+                    "status": "ok",
+                    "sessions": len(self.sessions),
+                    "servers": servers,
+                    "llm": llm_scheduler.metrics(),
+                }
+            )
+
+        async def models(request):
+            return JSONResponse(["/".join(m) for m in self.host.llm_client.get_available_models()])
+
+        async def list_sessions(request):
+            return JSONResponse([session.info() for session in self.sessions.values()])
+
+        async def create_session(request):
+            data = await body(request)
+            session = self.create_session(data.get("model"), data.get("system_prompt"))
+            return JSONResponse(session.info(), status_code=201)
+
+        async def session_detail(request):
+            session = self.get_session(request.path_params["session_id"])
+            if request.method == "DELETE":
+                self.close_session(session.id)
+                return JSONResponse({"id": session.id, "closed": True})
+            if request.method == "PATCH":
+                data = await body(request)
+                if session.lock.locked():
+                    raise APIError(409, "Session is busy with another turn")
+                if "model" in data:
+                    self._set_model(session.llm_client, data["model"])
+                if "system_prompt" in data:
+                    session.llm_client.system_prompt = data["system_prompt"]
+            info = session.info()
+            if request.query_params.get("messages"):
+                info["history"] = session.llm_client.messages
+            return JSONResponse(info)
+
+        async def chat(request):
+            session = self.get_session(request.path_params["session_id"])
+            data = await body(request)
+            message = data.get("message")
+            if not isinstance(message, str) or not message.strip():
+                raise APIError(400, "'message' is required")
+            if session.lock.locked():
+                raise APIError(409, "Session is busy with another turn")
+
+            if data.get("stream"):
+
+                async def lines():
+                    async for event in self.chat(session, message):
+                        yield json.dumps(event, ensure_ascii=False) + "\n"
+
+                return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+            reasoning, content, final = [], [], {}
+            async for event in self.chat(session, message):
+                if event["type"] == "reasoning":
+                    reasoning.append(event["text"])
+                elif event["type"] == "content":
+                    content.append(event["text"])
+                else:
+                    final = event
+            if final.get("type") == "error":
+                return JSONResponse(final, status_code=502)
+            final.update({"reasoning": "".join(reasoning) or None, "response": "".join(content)})
+            return JSONResponse(final)
+
+        async def capabilities(request):
+            return JSONResponse(await self.list_capabilities())
+
+        async def call_tool(request):
+            data = await body(request)
+            arguments = data.get("arguments") or {}
+            if not isinstance(arguments, dict):
+                raise APIError(400, "'arguments' must be an object")
+            content = await self.fetch(
+                "tool", request.path_params["server"], request.path_params["name"], arguments
+            )
+            return JSONResponse({"content": content})
+
+        async def read_resource(request):
+            data = await body(request)
+            if not data.get("uri"):
+                raise APIError(400, "'uri' is required")
+            content = await self.fetch("resource", request.path_params["server"], data["uri"], {})
+            return JSONResponse({"content": content})
+
+        async def chat_socket(websocket):
+            """Send {"message": ...}, receive chunk events and a final done/error event per turn"""
+            rejected = self._reject(websocket.headers)
+            if rejected:
+                await websocket.close(code=4000 + rejected.status)
+                return
+            session = self.sessions.get(websocket.path_params["session_id"])
+            if not session:
+                await websocket.close(code=4404)
+                return
+            await websocket.accept()
+            try:
+                while True:
+                    data = await websocket.receive_json()
+                    message = data.get("message") if isinstance(data, dict) else None
+                    if not message:
+                        await websocket.send_json(
+                            {"type": "error", "error": "'message' is required"}
+                        )
+                        continue
+                    try:
+                        async for event in self.chat(session, message):
+                            await websocket.send_json(event)
+                    except APIError as e:
+                        await websocket.send_json({"type": "error", "error": str(e)})
+            except Exception as e:
+                if type(e).__name__ != "WebSocketDisconnect":
+                    logger.error(f"WebSocket session {session.id} failed: {e}")
+
+        async def startup():
+            self._reaper = asyncio.create_task(self._reap_idle_sessions())
+
+        async def shutdown():
+            if self._reaper:
+                self._reaper.cancel()
+
+        routes = [
+            Route("/health", endpoint(health)),
+            Route("/models", endpoint(models)),
+            Route("/sessions", endpoint(list_sessions), methods=["GET"]),
+            Route("/sessions", endpoint(create_session), methods=["POST"]),
+            Route(
+                "/sessions/{session_id}",
+                endpoint(session_detail),
+                methods=["GET", "PATCH", "DELETE"],
+            ),
+            Route("/sessions/{session_id}/chat", endpoint(chat), methods=["POST"]),
+            WebSocketRoute("/sessions/{session_id}/ws", chat_socket),
+            Route("/capabilities", endpoint(capabilities)),
+            Route("/tools/{server}/{name}", endpoint(call_tool), methods=["POST"]),
+            Route("/resources/{server}", endpoint(read_resource), methods=["POST"]),
+        ]
+        return Starlette(routes=routes, on_startup=[startup], on_shutdown=[shutdown])
+
+
+def _describe(items, describe) -> Any:
+    if isinstance(items, BaseException):
+        return {"error": str(items)}
+    return [describe(item) for item in items or []]
+
+
+async def run_serve(host, args) -> bool:
+    """Initialize the host and serve the HTTP API until interrupted"""
+    try:
+        import uvicorn
+    except ImportError:
+        console.print(
+            "\n❌ Serve mode requires optional dependencies: pip install 'think-mcp-host[serve]'",
+            style=TABLE_STYLE["error"],
+        )
+        return False
+
+    # Connections are opened and closed by warm-up owner tasks, never by request handlers
+    host.warmup_enabled = True
+    if not await host.init_clients():
+        console.print("\n❌ Failed to initialize clients", style=TABLE_STYLE["error"])
+        return False
+    host.placeholder_expander.require_connected = True
+
+    serve_settings = host.settings["serve"]
+    bind_host = args.host or serve_settings["host"]
+    server = HostServer(
+        host,
+        token=args.token or serve_settings["token"],
+        max_sessions=serve_settings["max_sessions"],
+        session_ttl=serve_settings["session_ttl"],
+        bind_host=bind_host,
+        allowed_hosts=serve_settings["allowed_hosts"],
+    )
+    config = uvicorn.Config(
+        server.create_app(),
+        host=bind_host,
+        port=args.port or serve_settings["port"],
+        log_level="info",
+    )
+    try:
+        await host.wait_for_mcp()
+        console.print(
+            f"\n✨ Serving on http://{config.host}:{config.port}", style=TABLE_STYLE["green"]
+        )
+        if server.token_generated:
+            console.print(
+                f"🔑 Bearer token for this run: {server.token}", style=TABLE_STYLE["yellow"]
+            )
+        await uvicorn.Server(config).serve()
+    finally:
+        await host.cleanup_resources()
+    return True
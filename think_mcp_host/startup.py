@@ -0,0 +1,236 @@
+"""Startup-optimized entry point
+
+Only the standard library is imported at module level: argument parsing, -v/--version
+and the cached banner must not pay for rich, prompt_toolkit or the LLM/MCP clients.
+"""
+
+import argparse
+import importlib
+import os
+import platform
+import shutil
+import sys
+import threading
+import time
+from importlib.metadata import version
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Heavy modules preloaded in the background while the banner is displayed
+PRELOAD_MODULES = (
+    "rich",
+    "prompt_toolkit",
+    "think_llm_client.cli",
+    "think_mcp_client",
+)
+
+BANNER_CACHE_DIR = Path.home() / ".think-mcp-host" / "cache" / "banner"
+
+
+def get_version():
+    """Get package version"""
+    try:
+        return version("think-mcp-host")
+    except Exception:
+        return "0.2.1"  # Default version
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser"""
+    parser = argparse.ArgumentParser(description="Think MCP Host")
+    parser.add_argument("--llm_config", type=str, help="Custom LLM configuration file path")
+    parser.add_argument("--mcp_config", type=str, help="Custom MCP server configuration file path")
+    parser.add_argument("--host_config", type=str, help="Custom host settings file path")
+    parser.add_argument(
+        "--warmup",
+        action="store_true",
+        help="Connect all MCP servers concurrently at startup and prefetch their capabilities",
+    )
+    parser.add_argument(
+        "--warmup-timeout",
+        type=float,
+        default=10.0,
+        help="Per-server timeout in seconds for the MCP warm-up (default: 10)",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Record per-turn tracing spans to a Chrome trace file (open it in Perfetto)",
+    )
+    parser.add_argument(
+        "--response-cache",
+        action="store_true",
+        help="Replay identical LLM requests from the local response cache (for re-runs)",
+    )
+    parser.add_argument(
+        "--broker",
+        action="store_true",
+        help="Share MCP servers across launches through the background MCP broker",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Print an import-time and startup phase breakdown before the first prompt",
+    )
+    parser.add_argument("-v", "--version", action="version", version=f"%(prog)s {get_version()}")
+
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    batch_parser = subparsers.add_parser(
+        "batch", help="Run a JSONL file of prompts non-interactively"
+    )
+    batch_parser.add_argument("--input", required=True, help="JSONL file of prompts")
+    batch_parser.add_argument(
+        "--output", help="JSONL results file (default: <input>.results.jsonl next to the input)"
+    )
+    batch_parser.add_argument(
+        "--concurrency", type=int, default=4, help="Maximum LLM calls in flight (default: 4)"
+    )
+    batch_parser.add_argument(
+        "--model", help="model_type/provider/model to use (default: first configured model)"
+    )
+
+    pipeline_parser = subparsers.add_parser(
+        "run-pipeline", help="Run a YAML/JSON pipeline of MCP tool calls as a DAG"
+    )
+    pipeline_parser.add_argument("pipeline", help="Pipeline file (.yaml, .yml or .json)")
+    pipeline_parser.add_argument("--output", help="Write a JSON report with outputs and timings")
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="Serve chat and tool execution over a local HTTP/WebSocket API"
+    )
+    serve_parser.add_argument("--host", help="Address to bind (default: 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, help="Port to bind (default: 8765)")
+    serve_parser.add_argument(
+        "--token", help="Bearer token required on every request (default: generated per run)"
+    )
+
+    broker_parser = subparsers.add_parser(
+        "broker", help="Run the MCP broker in the foreground, or show or stop the running one"
+    )
+    broker_action = broker_parser.add_mutually_exclusive_group()
+    broker_action.add_argument(
+        "--status", action="store_true", help="Show the servers of the running broker"
+    )
+    broker_action.add_argument("--stop", action="store_true", help="Stop the running broker")
+    broker_parser.add_argument(
+        "--socket", help="Unix socket (default: ~/.think-mcp-host/broker.sock)"
+    )
+    broker_parser.add_argument(
+        "--idle-timeout", type=float, help="Seconds an unused server is kept alive (default: 600)"
+    )
+    return parser
+
+
+class StartupProfiler:
+    """Record startup phases and background import times"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self._last = self.start
+        self.phases: List[Tuple[str, float]] = []
+        self.imports: Dict[str, float] = {}
+        self.reported = False
+
+    def mark(self, name: str) -> None:
+        """Close the current phase under the given name"""
+        now = time.perf_counter()
+        self.phases.append((name, (now - self._last) * 1000))
+        self._last = now
+
+    def report(self) -> None:
+        """Print the breakdown once, when the first prompt is reached"""
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        total = (time.perf_counter() - self.start) * 1000
+
+        lines = ["", "Startup profile (ms)", "  Phases:"]
+        lines += [f"    {ms:9.1f}  {name}" for name, ms in self.phases]
+        if self.imports:
+            lines.append("  Background imports:")
+            lines += [f"    {ms:9.1f}  {name}" for name, ms in self.imports.items()]
+        lines.append(f"  Time to first prompt: {total:.1f}")
+        print("\n".join(lines))
+
+
+def preload_modules(profiler: StartupProfiler) -> threading.Thread:
+    """Import heavy modules in a background thread
+
+    The main thread imports the same modules right after; Python's per-module import
+    locks make it wait for (not repeat) whatever the thread is still importing.
+    """
+
+    def _preload():
+        for name in PRELOAD_MODULES:
+            start = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except Exception:
+                continue
+            profiler.imports[name] = (time.perf_counter() - start) * 1000
+
+    thread = threading.Thread(target=_preload, name="think-mcp-host-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+def banner_cache_path(host_version: str, width: int) -> Path:
+    """Banner cache file, keyed by version and terminal width"""
+    return BANNER_CACHE_DIR / f"banner-{host_version}-{width}.ansi"
+
+
+def load_cached_banner(host_version: str, width: int) -> Optional[str]:
+    """Load the rendered banner, or None on a cache miss"""
+    try:
+        return banner_cache_path(host_version, width).read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+
+def save_cached_banner(host_version: str, width: int, banner: str) -> None:
+    """Store the rendered banner"""
+    try:
+        path = banner_cache_path(host_version, width)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(banner, encoding="utf-8")
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def terminal_width() -> int:
+    return shutil.get_terminal_size().columns
+
+
+def show_cached_banner() -> bool:
+    """Clear the screen and write the cached banner without importing rich
+
+    Returns:
+        bool: Whether the banner was displayed
+    """
+    banner = load_cached_banner(get_version(), terminal_width())
+    if banner is None:
+        return False
+    os.system("cls" if platform.system() == "Windows" else "clear")
+    sys.stdout.write(banner)
+    sys.stdout.flush()
+    return True
+
+
+def main():
+    profiler = StartupProfiler()
+    args = build_parser().parse_args()
+    profiler.enabled = args.profile_startup
+    profiler.mark("parse arguments")
+
+    preload_modules(profiler)
+    # Non-interactive commands don't show the banner
+    banner_shown = show_cached_banner() if args.command is None else False
+    profiler.mark("cached banner" if banner_shown else "banner cache miss")
+
+    from think_mcp_host.destiny_host import run_host
+
+    profiler.mark("import destiny_host")
+    run_host(args, profiler=profiler, banner_shown=banner_shown)
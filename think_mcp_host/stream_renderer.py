@@ -0,0 +1,221 @@
+import time
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+from rich.console import Group
+from rich.live import Live
+from rich.markdown import Markdown
+from rich.text import Text
+from think_llm_client.utils.logger import logging
+from think_llm_client.utils.terminal_config import TABLE_STYLE, console
+
+from think_mcp_host.tracing import tracer
+from think_mcp_host.utils.llm_stream import stream_chat
+from think_mcp_host.utils.tokens import estimate_tokens
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+
+class _Section:
+    """Text of one output section (reasoning or answer)
+
+    Chunks are appended to a list and only joined for the uncommitted tail. Finished blocks
+    are committed once: printed above the live region and never rendered again.
+    """
+
+    def __init__(self, title: str, style: str, markdown: bool):
+        self.title = title
+        self.style = style
+        self.markdown = markdown
+        self.committed: List[str] = []
+        self.tail_chunks: List[str] = []
+
+    @property
+    def text(self) -> str:
+        return "".join(self.committed) + "".join(self.tail_chunks)
+
+    def append(self, chunk: str) -> None:
+        self.tail_chunks.append(chunk)
+
+    def split_finished(self) -> Optional[str]:
+        """Take the finished blocks off the tail
+
+        Markdown blocks end at a blank line outside a code block, plain text at a newline.
+
+        Returns:
+            Optional[str]: Finished text, or None if the tail has no finished block yet
+        """
+        tail = "".join(self.tail_chunks)
+        cut = -1
+        if self.markdown:
+            # A blank line is only a block boundary outside code blocks, and the cut is
+            # always outside one, so the committed text never ends inside a code block
+            in_fence = False
+            position = 0
+            for line in tail.splitlines(keepends=True):
+                position += len(line)
+                if not line.endswith("\n"):
+                    break
+                if line.lstrip().startswith(("```", "~~~")):
+                    in_fence = not in_fence
+                elif not in_fence and not line.strip():
+                    cut = position
+        else:
+            cut = tail.rfind("\n") + 1
+
+        if cut <= 0:
+            self.tail_chunks = [tail] if tail else []
+            return None
+        finished, rest = tail[:cut], tail[cut:]
+        self.committed.append(finished)
+        self.tail_chunks = [rest] if rest else []
+        return finished
+
+    def flush(self) -> Optional[str]:
+        """Commit whatever is left in the tail"""
+        tail = "".join(self.tail_chunks)
+        self.tail_chunks = []
+        if not tail:
+            return None
+        self.committed.append(tail)
+        return tail
+
+    def render(self, text: str):
+        if self.markdown:
+            return Markdown(text)
+        return Text(text, style=self.style)
+
+
+class StreamRenderer:
+    """Render a streaming LLM reply with a bounded redraw rate
+
+    Only the unfinished tail of the reply lives in a rich Live region, redrawn at most
+    max_fps times per second however fast tokens arrive. Finished markdown blocks are
+    printed once above it, so the cost of a frame doesn't grow with the response length.
+    """
+
+    def __init__(self, max_fps: float = 20):
+        """Initialize stream renderer
+
+        Args:
+            max_fps: Maximum redraws of the live region per second
+        """
+        self.frame_interval = 1 / max_fps if max_fps > 0 else 0
+        self.ttft_ms: Optional[float] = None
+        self.elapsed_ms: Optional[float] = None
+        self.completion_tokens = 0
+        self.frames = 0
+        # Response cache outcome of the turn, filled by stream_chat
+        self.cache_status: dict = {}
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Output speed after the first token"""
+        if self.ttft_ms is None or self.elapsed_ms is None:
+            return None
+        generation_s = (self.elapsed_ms - self.ttft_ms) / 1000
+        return self.completion_tokens / generation_s if generation_s > 0 else None
+
+    def stats_text(self) -> str:
+        """Short TTFT and speed summary, e.g. for the prompt's rprompt"""
+        if self.ttft_ms is None:
+            return ""
+        if self.cache_status.get("cache") == "hit":
+            return f"cached · saved {self.cache_status['saved_ms']:.0f} ms"
+        speed = self.tokens_per_second
+        speed_text = f" · {speed:.1f} tok/s" if speed else ""
+        cache_text = " · cache miss" if self.cache_status.get("cache") == "miss" else ""
+        return f"TTFT {self.ttft_ms:.0f} ms{speed_text}{cache_text}"
+
+    def _status_line(self, start: float) -> Text:
+        if self.ttft_ms is None:
+            return Text("⏳ Waiting for first token...", style="dim")
+        generation_s = (time.perf_counter() - start) - self.ttft_ms / 1000
+        speed = self.completion_tokens / generation_s if generation_s > 0 else 0
+        return Text(
+            f"TTFT {self.ttft_ms:.0f} ms · {self.completion_tokens} tokens · {speed:.1f} tok/s",
+            style="dim",
+        )
+
+    async def run(
+        self,
+        llm_client,
+        message: str,
+        images: Optional[List[str]] = None,
+        chunks: Optional[AsyncIterator[Tuple[str, str]]] = None,
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Stream a chat turn to the terminal
+
+        Args:
+            llm_client: LLM client with the model already set, its history is updated as usual
+            message: User message
+            images: Optional image paths for VLM models
+            chunks: Optional (chunk_type, chunk) stream to render instead of the client's,
+                e.g. the winner of a fan-out race
+
+        Returns:
+            Tuple[Optional[str], Optional[str]]: (reasoning_content, content)
+        """
+        sections = {
+            "reasoning": _Section("🌈 Reasoning", TABLE_STYLE["highlight"], markdown=False),
+            "content": _Section("✨ Answer", TABLE_STYLE["green"], markdown=True),
+        }
+        active: Optional[_Section] = None
+        start = time.perf_counter()
+        last_frame = 0.0
+
+        def tail_view():
+            if active is None:
+                return self._status_line(start)
+            tail = "".join(active.tail_chunks)
+            return Group(active.render(tail), self._status_line(start))
+
+        with Live(
+            tail_view(), console=console, auto_refresh=False, transient=True, redirect_stdout=False
+        ) as live:
+
+            def commit(section: _Section, text: Optional[str]):
+                if text:
+                    live.console.print(section.render(text))
+
+            if chunks is None:
+                chunks = stream_chat(llm_client, message, images, status=self.cache_status)
+            async for chunk_type, chunk in chunks:
+                now = time.perf_counter()
+                if self.ttft_ms is None:
+                    self.ttft_ms = (now - start) * 1000
+                section = sections.get(chunk_type, sections["content"])
+                if section is not active:
+                    if active is not None:
+                        commit(active, active.flush())
+                    active = section
+                    current_time = datetime.now().strftime("%H:%M:%S")
+                    live.console.print(
+                        f"\n{section.title} [{current_time}]:",
+                        style=f"bold {section.style}",
+                        markup=False,
+                    )
+                section.append(chunk)
+                self.completion_tokens += estimate_tokens(chunk)
+
+                # Bounded redraw rate: skip frames while tokens arrive faster than max_fps
+                if now - last_frame >= self.frame_interval:
+                    with tracer.span("render.frame", category="render"):
+                        commit(active, active.split_finished())
+                        live.update(tail_view(), refresh=True)
+                    self.frames += 1
+                    last_frame = now
+
+            if active is not None:
+                commit(active, active.flush())
+
+        self.elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(
+            f"Streamed {self.completion_tokens} tokens in {self.elapsed_ms:.0f} ms "
+            f"({self.frames} frames), {self.stats_text()}"
+        )
+
+        reasoning = sections["reasoning"].text
+        content = sections["content"].text
+        return reasoning or None, content or None
@@ -0,0 +1,306 @@
+import asyncio
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+import weakref
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from think_llm_client.utils.logger import logging
+
+from think_mcp_host.utils.settings import HOST_DIR
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+DEFAULT_TRACE_DIR = HOST_DIR / "traces"
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("think_mcp_host_span", default=None)
+
+_STOP = object()
+
+
+def _now_us() -> float:
+    """Timestamp in the trace's unit (microseconds)"""
+    return time.perf_counter_ns() / 1000
+
+
+class Span:
+    """A timed operation, nested under the span that was current when it started"""
+
+    __slots__ = ("_tracer", "name", "category", "args", "id", "parent_id", "start_us", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, category: str, args: Dict[str, Any]):
+        self._tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.id = next(tracer._span_ids)
+        self.parent_id: Optional[int] = None
+        self.start_us = 0.0
+        self._token = None
+
+    def __enter__(self) -> "Span":
+        parent = _current_span.get()
+        self.parent_id = parent.id if parent else None
+        self._token = _current_span.set(self)
+        self.start_us = _now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        end_us = _now_us()
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Exited from another context, e.g. a generator closed by the garbage collector
+            pass
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self._tracer._complete(self, end_us)
+        return False
+
+    def set(self, **args) -> None:
+        """Attach attributes to the span"""
+        self.args.update(args)
+
+
+class _NoopSpan:
+    """Returned while tracing is off, so instrumented code costs a method call"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+    def set(self, **args) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _TraceWriter(threading.Thread):
+    """Write trace events to size-rotated files in the Chrome trace event format
+
+    Each file is a JSON array with one event per line. The closing bracket is written
+    on close, but Perfetto and chrome://tracing also load files cut short by a crash.
+    """
+
+    def __init__(self, trace_dir: Path, max_bytes: int, keep: int):
+        super().__init__(name="think-mcp-host-trace-writer", daemon=True)
+        self.trace_dir = trace_dir
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.events: queue.SimpleQueue = queue.SimpleQueue()
+        self.path: Optional[Path] = None
+        self._file = None
+        self._size = 0
+        # Metadata events (process and lane names) are repeated in every rotated file
+        self._metadata: List[str] = []
+
+    def run(self) -> None:
+        self._open()
+        while True:
+            event = self.events.get()
+            if event is _STOP:
+                break
+            try:
+                line = json.dumps(event, ensure_ascii=False, default=str)
+                if event.get("ph") == "M":
+                    self._metadata.append(line)
+                self._write(line)
+            except Exception as e:
+                logger.error(f"Failed to write trace event: {e}")
+        self._close()
+
+    def _open(self) -> None:
+        self.trace_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self.path = self.trace_dir / f"trace_{timestamp}_{os.getpid()}.json"
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write("[\n")
+        self._size = 2
+        for line in self._metadata:
+            self._write(line)
+        self._prune()
+
+    def _write(self, line: str) -> None:
+        self._file.write(line + ",\n")
+        self._size += len(line) + 2
+        if self._size >= self.max_bytes:
+            self._close()
+            self._open()
+
+    def _close(self) -> None:
+        # A last metadata event keeps the array valid JSON without a trailing comma
+        process = {"name": "process_name", "ph": "M", "pid": os.getpid(), "tid": 0}
+        process["args"] = {"name": "think-mcp-host"}
+        self._file.write(json.dumps(process) + "\n]\n")
+        self._file.close()
+        self._file = None
+
+    def _prune(self) -> None:
+        """Delete the oldest trace files beyond keep"""
+        traces = sorted(self.trace_dir.glob("trace_*.json"), key=lambda p: p.stat().st_mtime)
+        for path in traces[: max(len(traces) - self.keep, 0)]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+class Tracer:
+    """Structured tracing of a turn: prompt wait, placeholder expansion, LLM, rendering and
+    persistence
+
+    Spans nest through a context variable, so children started in other tasks (one per MCP
+    server call) link to their parent. Every asyncio task gets its own track, since spans
+    of concurrent tasks overlap. Events are serialized and written by a background thread.
+    While tracing is off, span() returns a shared no-op object.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._writer: Optional[_TraceWriter] = None
+        self._span_ids = itertools.count(1)
+        self._lane_ids = itertools.count(1)
+        self._lanes: "weakref.WeakKeyDictionary[Any, int]" = weakref.WeakKeyDictionary()
+        self._pid = os.getpid()
+
+    @property
+    def path(self) -> Optional[Path]:
+        """Current trace file"""
+        return self._writer.path if self._writer else None
+
+    def start(self, trace_dir: Optional[Path] = None, max_mb: float = 50, keep: int = 10) -> None:
+        """Start recording
+
+        Args:
+            trace_dir: Trace directory, default is ~/.think-mcp-host/traces
+            max_mb: Size of a trace file before a new one is started
+            keep: Number of trace files kept, older ones are deleted
+        """
+        if self.enabled:
+            return
+        self._writer = _TraceWriter(
+            Path(trace_dir) if trace_dir else DEFAULT_TRACE_DIR, int(max_mb * 1024 * 1024), keep
+        )
+        self._writer.start()
+        self.enabled = True
+        self._emit(
+            {"name": "process_name", "ph": "M", "tid": 0, "args": {"name": "think-mcp-host"}}
+        )
+        logger.info(f"Tracing to: {self._writer.trace_dir}")
+
+    def stop(self) -> Optional[Path]:
+        """Flush and close the trace file
+
+        Returns:
+            Optional[Path]: Last trace file, None if tracing was off
+        """
+        if not self.enabled:
+            return None
+        self.enabled = False
+        self._writer.events.put(_STOP)
+        self._writer.join(timeout=5)
+        path = self._writer.path
+        self._writer = None
+        logger.info(f"Trace written to: {path}")
+        return path
+
+    def span(self, name: str, category: str = "host", **args) -> Span:
+        """Context manager timing a block
+
+        Args:
+            name: Span name, e.g. "mcp.fetch"
+            category: Trace category, used for filtering in the viewer
+            **args: Attributes shown with the span
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, category, args)
+
+    @staticmethod
+    def now() -> float:
+        """Timestamp for complete()"""
+        return _now_us()
+
+    def complete(
+        self, name: str, start_us: float, end_us: Optional[float] = None, category="host", **args
+    ) -> None:
+        """Record a span measured by the caller, e.g. across the yields of a generator
+
+        Args:
+            name: Span name
+            start_us: Start timestamp from now()
+            end_us: End timestamp from now(), default is now
+            category: Trace category
+            **args: Attributes shown with the span
+        """
+        if not self.enabled:
+            return
+        parent = _current_span.get()
+        span = Span(self, name, category, args)
+        span.parent_id = parent.id if parent else None
+        span.start_us = start_us
+        self._complete(span, end_us if end_us is not None else _now_us())
+
+    def instant(self, name: str, category: str = "host", **args) -> None:
+        """Record a point in time, e.g. the first token of a reply"""
+        if not self.enabled:
+            return
+        self._emit(
+            {"name": name, "cat": category, "ph": "i", "s": "t", "ts": _now_us(), "args": args}
+        )
+
+    def _complete(self, span: Span, end_us: float) -> None:
+        args = span.args
+        args["span_id"] = span.id
+        if span.parent_id is not None:
+            args["parent_id"] = span.parent_id
+        self._emit(
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": span.start_us,
+                "dur": end_us - span.start_us,
+                "args": args,
+            }
+        )
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        event["pid"] = self._pid
+        if "tid" not in event:
+            event["tid"] = self._lane()
+        writer = self._writer
+        if writer:
+            writer.events.put(event)
+
+    def _lane(self) -> int:
+        """Track of the current asyncio task, or of the current thread outside of a loop"""
+        try:
+            owner = asyncio.current_task()
+        except RuntimeError:
+            owner = None
+        if owner is None:
+            owner = threading.current_thread()
+        lane = self._lanes.get(owner)
+        if lane is None:
+            lane = next(self._lane_ids)
+            self._lanes[owner] = lane
+            name = owner.get_name() if isinstance(owner, asyncio.Task) else owner.name
+            self._emit({"name": "thread_name", "ph": "M", "tid": lane, "args": {"name": name}})
+        return lane
+
+
+# Process-wide tracer, started by the --trace flag
+tracer = Tracer()
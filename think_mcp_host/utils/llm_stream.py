@@ -0,0 +1,185 @@
+import asyncio
+import contextvars
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from think_llm_client.utils.logger import logging
+
+from think_mcp_host.llm_scheduler import llm_scheduler, prompt_tokens
+from think_mcp_host.response_cache import response_cache
+from think_mcp_host.tracing import tracer
+from think_mcp_host.utils.tokens import estimate_tokens
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+_DONE = object()
+
+
+async def stream_chat(
+    llm_client,
+    message: str,
+    images: Optional[List[str]] = None,
+    status: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[Tuple[str, str]]:
+    """Stream a chat turn without blocking the event loop
+
+    LLMClient.chat_stream iterates the provider's synchronous stream inside the event
+    loop, so concurrent turns would run one after another. The stream is consumed on a
+    worker thread with its own loop and the chunks are handed back through a queue.
+    Breaking out of the iteration stops the worker at the next chunk.
+
+    When the response cache is started, a cached reply to the same request is replayed
+    instead, and complete replies to cacheable requests are stored. Requests wait for a
+    slot of the LLM scheduler, and throttled or transiently failed ones are retried
+    after its backoff.
+
+    Args:
+        llm_client: LLM client with the model already set, its history is updated as usual
+        message: User message
+        images: Optional image paths for VLM models
+        status: Optional dict that receives "cache" (hit, miss or None when not cached)
+            and "saved_ms" (latency of the original request on a hit)
+
+    Yields:
+        Tuple[str, str]: (chunk_type, chunk), chunk_type is "reasoning" or "content"
+    """
+    status = status if status is not None else {}
+    status.update(cache=None, saved_ms=0.0)
+    cache_key = response_cache.key(llm_client, message, images)
+    if cache_key:
+        cached = response_cache.get(cache_key)
+        status["cache"] = "miss" if cached is None else "hit"
+        if cached is not None:
+            status["saved_ms"] = cached.latency_ms
+            tracer.instant("llm.cache_hit", category="llm", saved_ms=cached.latency_ms)
+            _append_history(llm_client, message, cached.reasoning, cached.content)
+            if cached.reasoning:
+                yield "reasoning", cached.reasoning
+            yield "content", cached.content
+            return
+
+    # Recorded with explicit timestamps, a span can't stay current across the yields
+    start_us = tracer.now()
+    start = time.perf_counter()
+    chunks = 0
+    # Chunks are kept to estimate the completion tokens and store the reply in the cache
+    reasoning_chunks: List[str] = []
+    content_chunks: List[str] = []
+    attempt = 0
+    try:
+        while True:
+            request = None
+            tokens = prompt_tokens(llm_client, message)
+            async with llm_scheduler.slot(llm_client, tokens) as request:
+                async for item in _stream_on_thread(llm_client, message, images):
+                    if chunks == 0:
+                        tracer.complete("llm.ttft", start_us, category="llm")
+                        if request:
+                            request.first_chunk()
+                    chunks += 1
+                    (reasoning_chunks if item[0] == "reasoning" else content_chunks).append(item[1])
+                    yield item
+                if request:
+                    request.completion_tokens = estimate_tokens(
+                        "".join(reasoning_chunks)
+                    ) + estimate_tokens("".join(content_chunks))
+            # A throttled or transiently failed request fails before its first chunk, it is
+            # sent again once the scheduler's backoff is over
+            if chunks or not await llm_scheduler.should_retry(llm_client, request, attempt):
+                break
+            attempt += 1
+            history = getattr(llm_client, "messages", None)
+            if history and history[-1] == {"role": "user", "content": message}:
+                history.pop()
+
+        # chat_stream swallows provider errors, only a reply it added to the history is complete
+        content = "".join(content_chunks)
+        history = getattr(llm_client, "messages", None) or [{}]
+        if cache_key and content and history[-1].get("content") == content:
+            response_cache.put(
+                cache_key,
+                getattr(llm_client, "current_model", ""),
+                "".join(reasoning_chunks) or None,
+                content,
+                (time.perf_counter() - start) * 1000,
+            )
+    finally:
+        tracer.complete(
+            "llm",
+            start_us,
+            category="llm",
+            model=getattr(llm_client, "current_model", None),
+            chunks=chunks,
+            retries=attempt,
+        )
+
+
+async def _stream_on_thread(
+    llm_client, message: str, images: Optional[List[str]]
+) -> AsyncIterator[Tuple[str, str]]:
+    """Iterate chat_stream on a worker thread with its own loop"""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def put(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # The consumer's loop is already closed
+            stop.set()
+
+    async def consume():
+        chunks = llm_client.chat_stream(message, images)
+        try:
+            async for chunk_type, chunk, _ in chunks:
+                if stop.is_set():
+                    break
+                put((chunk_type, chunk))
+        finally:
+            await chunks.aclose()
+
+    def worker():
+        try:
+            asyncio.run(consume())
+        except BaseException as e:
+            logger.error(f"LLM stream worker failed: {e}")
+            put(e)
+        finally:
+            put(_DONE)
+
+    # The worker runs in a copy of the context, the LLM scheduler's request included
+    threading.Thread(
+        target=contextvars.copy_context().run,
+        args=(worker,),
+        name="think-mcp-host-llm-stream",
+        daemon=True,
+    ).start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def _append_history(llm_client, message: str, reasoning: Optional[str], content: str) -> None:
+    """Update the client's history the way chat_stream does after a reply"""
+    llm_client.messages.append({"role": "user", "content": message})
+    llm_client.messages.append(
+        {
+            "role": "assistant",
+            "content": content,
+            "reasoning_content": (
+                reasoning
+                if getattr(llm_client, "current_model_type", None) == "reasoning"
+                else None
+            ),
+        }
+    )
@@ -109,8 +109,16 @@ class PoetryDisplay:
         )
 
 
-# Create singleton instance
-poetry_display = PoetryDisplay()
+# Singleton instance, created on first use to keep it off the import path
+_poetry_display: Optional[PoetryDisplay] = None
+
+
+def get_poetry_display() -> PoetryDisplay:
+    """Get the shared PoetryDisplay instance"""
+    global _poetry_display
+    if _poetry_display is None:
+        _poetry_display = PoetryDisplay()
+    return _poetry_display
 
 
 def display_random_poetry(
@@ -122,6 +130,7 @@ def display_random_poetry(
         poetry_type: Optional poetry type, if not specified, a random type will be chosen
         language: Optional language selection, if not specified, current language setting will be used
     """
+    poetry_display = get_poetry_display()
     if language is not None:
         poetry_display.set_language(language)
     poetry_display.display_random_poetry(poetry_type)
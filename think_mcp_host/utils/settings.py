@@ -0,0 +1,170 @@
+import copy
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from think_llm_client.utils.logger import logging
+
+# Get project-specific logger
+logger = logging.getLogger("think-mcp-host")
+
+# Root directory for all host data (history, caches, logs...)
+HOST_DIR = Path.home() / ".think-mcp-host"
+DEFAULT_SETTINGS_PATH = HOST_DIR / "config" / "host_config.json"
+
+# Default host settings, values in the user's host_config.json override these
+DEFAULT_SETTINGS: Dict[str, Any] = {
+    "capability_cache": {
+        "enabled": True,
+        "ttl": 600,  # Seconds before a cached tools/resources/prompts list is refetched
+        "max_entries": 64,  # Servers kept in the in-memory LRU
+    },
+    "placeholders": {
+        "max_concurrency_per_server": 4,  # Placeholder requests in flight per MCP server
+        "timeout": 30,  # Seconds before a single placeholder is given up
+    },
+    "prefetch": {
+        "enabled": True,  # Fetch resources and read-only tools of the message while it is typed
+        "delay": 0.3,  # Seconds without typing before placeholders are fetched
+        "max_age": 60,  # Seconds a prefetched result may wait for the message to be sent
+        "max_pending": 8,  # Prefetches kept at once
+    },
+    "completion": {
+        "enabled": True,  # Complete ->mcp_resources/prompts/tools[server]:name while typing
+        "max_results": 50,  # Items listed per completion menu
+    },
+    "broker": {
+        "enabled": False,  # Attach to a shared MCP server broker instead of spawning (--broker)
+        "socket": None,  # Unix socket of the broker, default is ~/.think-mcp-host/broker.sock
+        "autostart": True,  # Start the broker in the background when none is running
+        "idle_timeout": 600,  # Seconds an unused server (and an empty broker) is kept alive
+    },
+    "supervisor": {
+        "enabled": True,  # Health-check and reconnect warm-up connections (--warmup, batch, serve)
+        "ping_interval": 15,  # Seconds between pings of a healthy server
+        "ping_timeout": 5,  # Seconds before a ping counts as missed
+        "max_missed_pings": 3,  # Missed pings in a row before the server is reconnected
+        "degraded_ms": 1000,  # Ping RTT above which a server is reported as degraded
+        "backoff_base": 0.5,  # First reconnect delay in seconds, doubled on every failure
+        "backoff_max": 30,  # Maximum reconnect delay in seconds
+        "max_reconnect_attempts": 10,  # Failed reconnects before a server is given up, 0 = never
+        "wait_timeout": 5,  # Seconds a request waits for a reconnecting server
+    },
+    "result_cache": {
+        "enabled": True,
+        "ttl": 300,  # Default TTL of cacheable results, servers may override it
+        "max_mb": 64,  # Total size of cached results before LRU eviction
+    },
+    "payloads": {
+        "enabled": True,  # Spill large MCP contents to disk, messages get an excerpt
+        "threshold_kb": 256,  # Contents above this are spilled
+        "policy": "head_tail",  # Excerpt sent to the LLM: head, head_tail or spread
+        "excerpt_chars": 8000,  # Approximate size of the excerpt
+        "chunks": 4,  # Chunks of the spread policy
+        "max_mb": 1024,  # Size of the spill directory before the oldest files are deleted
+    },
+    "rag": {
+        "enabled": True,  # ->mcp_rag[server]:uri-or-glob inserts only the relevant chunks
+        "top_k": 5,  # Chunks inserted per placeholder
+        "chunk_chars": 1500,  # Approximate chunk size
+        "max_resources": 50,  # Resources searched per glob
+        "max_documents": 1000,  # Resources kept in the local index
+    },
+    "context": {
+        "enabled": True,
+        "default_budget": 32000,  # Prompt tokens per turn of models without their own budget
+        "budgets": {},  # Budgets by "provider/model" or "model", e.g. {"gpt-4o": 100000}
+        "max_message_tokens": 4000,  # Older messages above this are truncated when over budget
+        "summarize": False,  # Summarize turns that no longer fit, costs extra LLM requests
+        "summary_tokens": 500,  # Target length of the summary
+    },
+    "history": {
+        "journal": True,  # Append every turn to a journal instead of saving only at exit
+        "compact_every": 20,  # Turns between journal compactions into the history file
+        "index": True,  # Keep a searchable index of saved conversations
+        "page_size": 10,  # Conversations per page of the history picker
+    },
+    "serve": {
+        "host": "127.0.0.1",
+        "port": 8765,
+        "token": None,  # Bearer token required on every request, generated per run if None
+        "allowed_hosts": [],  # Host names accepted besides the bound address and localhost
+        "max_sessions": 100,
+        "session_ttl": 3600,  # Seconds of inactivity before a session is dropped
+    },
+    "response_cache": {
+        "enabled": False,  # Replay identical LLM requests from a local cache (--response-cache)
+        "max_mb": 256,  # Size of the cache before the least recently used replies are evicted
+        "deterministic_only": True,  # Only cache models configured with temperature 0
+    },
+    "llm_scheduler": {
+        "enabled": True,
+        "initial_concurrency": 4,  # Requests in flight per provider/model to start with
+        "min_concurrency": 1,
+        "max_concurrency": 8,
+        "latency_tolerance": 2.0,  # TTFT above this times the best one shrinks the limit
+        "max_retries": 3,  # Retries of a throttled (429/529) or transiently failed (5xx) request
+        "backoff_base": 1.0,  # Seconds of the first backoff without a Retry-After header
+        "backoff_max": 60,
+        "limits": {},  # By "provider/model" or "provider", e.g. {"openai": {"rpm": 500, "tpm": 30000}}
+    },
+    "tracing": {
+        "dir": None,  # Trace directory of --trace, default is ~/.think-mcp-host/traces
+        "max_mb": 50,  # Size of a trace file before a new one is started
+        "keep": 10,  # Trace files kept, older ones are deleted
+    },
+    "agent": {
+        "max_steps": 8,  # Model steps per turn of /agent mode before an answer is forced
+        "tool_timeout": 30,  # Seconds before a single tool call is given up
+        "deadline": 300,  # Seconds a whole agent turn may take
+        "max_result_chars": 20000,  # Tool results are truncated to this before the next step
+    },
+    "fanout": {
+        "policy": "race",  # Default policy when several models are selected: race or compare
+    },
+    "logging": {
+        "json": True,  # Structured JSON lines instead of plain text
+        "max_mb": 10,  # Size of the log file before it is rotated
+        "backups": 5,  # Rotated log files kept
+        "payload_max_chars": 2000,  # Long messages and arguments are truncated to this
+        "sample_rate": 1.0,  # Fraction of repeated debug/info records kept, warnings always are
+        "queue_size": 10000,  # Records waiting for the writer thread before new ones are dropped
+    },
+    "rendering": {
+        "max_fps": 20,  # Maximum redraws per second of a streaming reply
+    },
+}
+
+
+def _deep_merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """Recursively merge override into a copy of base"""
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def load_settings(config_path: Optional[str] = None) -> Dict[str, Any]:
+    """Load host settings
+
+    Args:
+        config_path: Custom settings file path, default is ~/.think-mcp-host/config/host_config.json
+
+    Returns:
+        Dict[str, Any]: Default settings merged with the user's settings
+    """
+    path = Path(config_path) if config_path else DEFAULT_SETTINGS_PATH
+    if not path.exists():
+        return copy.deepcopy(DEFAULT_SETTINGS)
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            user_settings = json.load(f)
+        logger.info(f"Loaded host settings from: {path}")
+        return _deep_merge(DEFAULT_SETTINGS, user_settings)
+    except Exception as e:
+        logger.error(f"Failed to load host settings from {path}, using defaults: {e}")
+        return copy.deepcopy(DEFAULT_SETTINGS)
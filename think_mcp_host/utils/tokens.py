@@ -0,0 +1,29 @@
+import re
+from typing import Any
+
+# CJK ideographs, kana and hangul are roughly one token per character
+_CJK_PATTERN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]")
+
+# Per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: Any) -> int:
+    """Estimate the number of tokens of a text without a tokenizer
+
+    The providers don't report usage through the streaming API used here, so counts are
+    estimated: one token per CJK character and about four characters per token otherwise.
+
+    Args:
+        text: Text to measure, lists of content parts (VLM messages) are measured by their text
+
+    Returns:
+        int: Estimated token count
+    """
+    if not text:
+        return 0
+    if isinstance(text, list):
+        return sum(estimate_tokens(part.get("text", "")) for part in text if isinstance(part, dict))
+    text = str(text)
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4